@@ -5,7 +5,20 @@ import psycopg2 as psql
 from aqpy.common.env import env_int
 
 
+_connection_factory = None
+
+
+def set_connection_factory(factory):
+    # Lets harnesses route every connect_db call elsewhere; pass None to restore the default.
+    global _connection_factory
+    previous = _connection_factory
+    _connection_factory = factory
+    return previous
+
+
 def connect_db(database):
+    if _connection_factory is not None:
+        return _connection_factory(database)
     return psql.connect(
         dbname=database,
         user=os.getenv("AQPY_DB_USER", "pi"),
@@ -13,3 +26,40 @@ def connect_db(database):
         host=os.getenv("AQPY_DB_HOST", "localhost"),
         port=env_int("AQPY_DB_PORT", 5432),
     )
+
+
+# (database, schema name) -> result of the ensure call that verified or created it in this process.
+_verified_schemas = {}
+
+
+def _database_key(conn):
+    info = getattr(conn, "info", None)
+    if info is None:
+        return id(conn)
+    return (info.host, info.port, info.dbname)
+
+
+def missing_relations(conn, relations):
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT array_agg(n) FROM unnest(%s::text[]) AS n WHERE to_regclass(n) IS NULL",
+            (list(relations),),
+        )
+        return cur.fetchone()[0] or []
+
+
+def ensure_schema(conn, name, relations, create):
+    # Hot paths call this on every run: the first call per process and database checks the catalog
+    # once and only runs create(conn) (DDL + commit) if one of the relations is missing. Later
+    # calls return the cached result without a round trip. Returns True when nothing was missing.
+    key = (_database_key(conn), name)
+    if key not in _verified_schemas:
+        if missing_relations(conn, relations):
+            _verified_schemas[key] = create(conn)
+        else:
+            _verified_schemas[key] = True
+    return _verified_schemas[key]
+
+
+def reset_schema_cache():
+    _verified_schemas.clear()
@@ -6,3 +6,10 @@ def env_int(name, default):
         return int(os.getenv(name, str(default)))
     except ValueError:
         return default
+
+
+def env_flag(name, default=False):
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
@@ -1,11 +1,14 @@
 import numpy as np
 
 from aqpy.forecast.features import build_ar_single_feature
+from aqpy.forecast.model import horizon_response
 
 
-def init_state(input_dim, delta=100.0):
+def init_state(input_dim, delta=100.0, n_outputs=None):
+    # n_outputs gives theta one column per direct horizon step; P is shared by all of them.
+    theta_shape = input_dim if n_outputs is None else (input_dim, n_outputs)
     return {
-        "theta": np.zeros(input_dim, dtype=float),
+        "theta": np.zeros(theta_shape, dtype=float),
         "P": np.eye(input_dim, dtype=float) * float(delta),
     }
 
@@ -17,9 +20,13 @@ def fit_recursive_least_squares(
     delta=100.0,
     init=None,
 ):
+    # RLS stays in float64 whatever the forecast precision; P is badly conditioned in float32.
+    X_train = np.asarray(X_train, dtype=float)
+    y_train = np.asarray(y_train, dtype=float)
     n_features = X_train.shape[1]
     if init is None:
-        state = init_state(n_features, delta=delta)
+        n_outputs = y_train.shape[1] if y_train.ndim == 2 else None
+        state = init_state(n_features, delta=delta, n_outputs=n_outputs)
     else:
         state = {
             "theta": np.array(init["theta"], dtype=float),
@@ -31,12 +38,10 @@ def fit_recursive_least_squares(
     lam = float(forgetting_factor)
     for i in range(len(X_train)):
         x = X_train[i].reshape(-1, 1)
-        y = float(y_train[i])
         denom = lam + float((x.T @ P @ x).item())
         k = (P @ x) / denom
-        pred = float(theta @ x[:, 0])
-        err = y - pred
-        theta = theta + (k[:, 0] * err)
+        err = y_train[i] - x[:, 0] @ theta
+        theta = theta + np.multiply.outer(k[:, 0], err)
         P = (P - k @ x.T @ P) / lam
 
     return {
@@ -44,6 +49,7 @@ def fit_recursive_least_squares(
         "P": P.tolist(),
         "forgetting_factor": forgetting_factor,
         "delta": delta,
+        "precision": "float64",
     }
 
 
@@ -52,13 +58,26 @@ def predict_batch(model, X):
     return X @ theta
 
 
+def direct_predict(model, values, lags, horizon_steps):
+    feat = build_ar_single_feature(values, lags)
+    preds = feat @ np.array(model["theta"], dtype=float)
+    return [float(v) for v in preds[:horizon_steps]]
+
+
+def horizon_response_matrix(model, lags, horizon_steps):
+    # R with preds = window @ R for a window of the last max(lags) values, oldest first.
+    coefs = np.zeros(max(lags))
+    for lag, weight in zip(lags, model["theta"]):
+        coefs[lag - 1] += weight
+    R, _ = horizon_response(coefs, 0.0, horizon_steps)
+    return R
+
+
+def recursive_predict_batch(model, windows, lags, horizon_steps):
+    # windows: (n_origins, max(lags)); every origin's forecast comes from one matmul.
+    return np.asarray(windows, dtype=float) @ horizon_response_matrix(model, lags, horizon_steps)
+
+
 def recursive_predict(model, values, lags, horizon_steps):
-    theta = np.array(model["theta"], dtype=float)
-    history = list(values)
-    preds = []
-    for _ in range(horizon_steps):
-        feat = build_ar_single_feature(history, lags)
-        pred = float(feat @ theta)
-        history.append(pred)
-        preds.append(pred)
-    return preds
+    window = np.asarray(values[-max(lags) :], dtype=float)
+    return recursive_predict_batch(model, window[None, :], lags, horizon_steps)[0].tolist()
@@ -0,0 +1,88 @@
+import glob
+import json
+import os
+import pathlib
+import re
+import time
+
+from aqpy.common.env import env_int
+
+
+DEFAULT_KEEP_VERSIONS = 3
+# Temp files older than this are leftovers from a crashed writer.
+STALE_TEMP_SECONDS = 3600
+_VERSION_SAFE_RE = re.compile(r"[^A-Za-z0-9._+-]")
+
+
+def artifact_version_path(path, version):
+    path = pathlib.Path(path)
+    return path.with_name(f"{path.name}.{_VERSION_SAFE_RE.sub('_', str(version))}")
+
+
+def _fsync_dir(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_artifact(path, payload, version=None, keep_versions=None):
+    # Writes name.<version> via temp file + fsync + rename, then atomically repoints the symlink at
+    # `path` (the current version) to it. Readers opening `path` always get a complete file, and an
+    # open reader keeps its version even if pruning removes it. Returns the version file.
+    path = pathlib.Path(path)
+    version = version or payload.get("model_version") or time.strftime("%Y%m%dT%H%M%S")
+    if keep_versions is None:
+        keep_versions = env_int("AQPY_ARTIFACT_KEEP_VERSIONS", DEFAULT_KEEP_VERSIONS)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    target = artifact_version_path(path, version)
+    tmp = target.with_name(f"{target.name}.tmp{os.getpid()}")
+    with open(tmp, "w") as fh:
+        fh.write(json.dumps(payload, indent=2))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, target)
+
+    if path.exists() and not path.is_symlink():
+        # Pre-versioning artifact: keep it reachable under a version name before the swap.
+        legacy = artifact_version_path(path, "legacy")
+        if not legacy.exists():
+            os.link(path, legacy)
+    link = path.with_name(f"{path.name}.link{os.getpid()}")
+    if link.is_symlink():
+        link.unlink()
+    os.symlink(target.name, link)
+    os.replace(link, path)
+    _fsync_dir(path.parent)
+    prune_artifact_versions(path, keep_versions)
+    return target
+
+
+def list_artifact_versions(path):
+    # Version files of `path`, newest first. Temp files and in-flight links are excluded.
+    path = pathlib.Path(path)
+    versions = [p for p in path.parent.glob(f"{glob.escape(path.name)}.*") if not _is_temp(path, p)]
+    return sorted(versions, key=lambda p: p.stat().st_mtime, reverse=True)
+
+
+def _is_temp(path, candidate):
+    suffix = candidate.name[len(path.name) :]
+    return ".tmp" in suffix or ".link" in suffix
+
+
+def prune_artifact_versions(path, keep_versions):
+    # Keeps the newest keep_versions version files plus whatever `path` points at. 0 keeps everything.
+    path = pathlib.Path(path)
+    removed = []
+    if keep_versions and keep_versions > 0:
+        current = path.resolve() if path.is_symlink() else None
+        for old in list_artifact_versions(path)[keep_versions:]:
+            if old.resolve() != current:
+                old.unlink(missing_ok=True)
+                removed.append(old.name)
+    now = time.time()
+    for tmp in path.parent.glob(f"{glob.escape(path.name)}.*"):
+        if _is_temp(path, tmp) and now - tmp.lstat().st_mtime > STALE_TEMP_SECONDS:
+            tmp.unlink(missing_ok=True)
+    return removed
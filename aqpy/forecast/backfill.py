@@ -8,6 +8,7 @@ from aqpy.common.db import connect_db
 from aqpy.forecast.adaptive_ar import predict_batch as ar_predict_batch
 from aqpy.forecast.features import build_ar_single_feature, build_single_feature
 from aqpy.forecast.nn_model import predict_batch as nn_predict_batch
+from aqpy.forecast.nn_multi import predict_batch as multi_predict_batch
 from aqpy.forecast.repository import (
     delete_predictions_window,
     ensure_predictions_table,
@@ -15,6 +16,7 @@ from aqpy.forecast.repository import (
     validate_identifier,
 )
 from aqpy.forecast.rnn_lite import predict_batch as rnn_predict_batch
+from aqpy.forecast.timing import StageTimer
 
 
 def _fetch_series_for_window(conn, table, time_col, target_col, start_ts, end_ts):
@@ -38,6 +40,43 @@ def _fetch_series_for_window(conn, table, time_col, target_col, start_ts, end_ts
     return timestamps, values, start_idx
 
 
+def _fetch_multi_series_for_window(conn, table, time_col, target_cols, start_ts, end_ts):
+    not_null = " AND ".join(f"{col} IS NOT NULL" for col in target_cols)
+    query = f"""
+    SELECT {time_col}, {", ".join(target_cols)}
+    FROM {table}
+    WHERE {time_col} <= %s
+      AND {not_null}
+    ORDER BY {time_col} ASC
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, (end_ts,))
+        rows = cur.fetchall()
+    timestamps = [r[0] for r in rows]
+    values_by_target = [[float(r[i + 1]) for r in rows] for i in range(len(target_cols))]
+    start_idx = 0
+    for i, ts in enumerate(timestamps):
+        if ts >= start_ts:
+            start_idx = i
+            break
+    return timestamps, values_by_target, start_idx
+
+
+def _build_backfill_rows_multi(model, timestamps, values_by_target, start_idx):
+    lags = [int(v) for v in model["lags"]]
+    first = max(max(lags), start_idx)
+    pred_times = timestamps[first:]
+    if not pred_times:
+        return [], np.zeros((len(values_by_target), 0), dtype=float)
+    X = np.stack(
+        [
+            np.array([build_single_feature(values[:i], lags) for i in range(first, len(values))])
+            for values in values_by_target
+        ]
+    )
+    return pred_times, multi_predict_batch(model, X)
+
+
 def _build_backfill_rows_nn_ar(model, timestamps, values, start_idx):
     model_type = model.get("model_type", "nn_mlp")
     lags = [int(v) for v in model["lags"]]
@@ -60,6 +99,7 @@ def _build_backfill_rows_nn_ar(model, timestamps, values, start_idx):
     if not feature_rows:
         return [], np.array([], dtype=float)
 
+    # Direct multi-horizon models return one column per step from this same product.
     X = np.array(feature_rows, dtype=float)
     if use_nn:
         preds = nn_predict_batch(model, X)
@@ -93,71 +133,118 @@ def run_backfill(
     if not model_file.exists():
         return {"status": "skipped", "reason": f"model not found: {model_file}"}
 
-    model = json.loads(model_file.read_text())
+    timer = StageTimer("backfill")
+    with timer.stage("load_artifact"):
+        model = json.loads(model_file.read_text())
     database = database_override or model["database"]
     table = validate_identifier(model["table"])
     time_col = validate_identifier(model["time_col"])
-    target = validate_identifier(model["target"])
     model_name = model["model_name"]
     model_version = model["model_version"]
     model_type = model.get("model_type", "nn_mlp")
+    if model_type == "nn_mlp_multi":
+        targets = [validate_identifier(t) for t in model["targets"]]
+    else:
+        targets = [validate_identifier(model["target"])]
+    n_steps = int(model.get("direct_horizon_steps") or 0) or 1
 
     end_ts = dt.datetime.now(dt.timezone.utc)
     start_ts = end_ts - dt.timedelta(hours=int(backfill_hours))
 
+    timer.context.update(
+        model_name=model_name,
+        model_type=model_type,
+        source_database=database,
+        source_table=table,
+    )
+
     conn = connect_db(database)
     try:
-        ensure_predictions_table(conn)
-        timestamps, values, start_idx = _fetch_series_for_window(
-            conn, table, time_col, target, start_ts, end_ts
-        )
-        if len(values) < 5:
-            return {"status": "skipped", "reason": f"not enough source rows ({len(values)})"}
+        with timer.stage("fetch"):
+            keyed = ensure_predictions_table(conn)
+            if model_type == "nn_mlp_multi":
+                timestamps, values_by_target, start_idx = _fetch_multi_series_for_window(
+                    conn, table, time_col, targets, start_ts, end_ts
+                )
+            else:
+                timestamps, values, start_idx = _fetch_series_for_window(
+                    conn, table, time_col, targets[0], start_ts, end_ts
+                )
+        timer.set_rows("fetch", len(timestamps))
+        if len(timestamps) < 5:
+            return timer.finish(
+                conn, {"status": "skipped", "reason": f"not enough source rows ({len(timestamps)})"}
+            )
 
-        if model_type == "rnn_lite_gru":
-            pred_times, preds = _build_backfill_rows_rnn(model, timestamps, values, start_idx)
-        else:
-            pred_times, preds = _build_backfill_rows_nn_ar(model, timestamps, values, start_idx)
+        with timer.stage("predict"):
+            if model_type == "nn_mlp_multi":
+                pred_times, preds_by_target = _build_backfill_rows_multi(
+                    model, timestamps, values_by_target, start_idx
+                )
+            elif model_type == "rnn_lite_gru":
+                pred_times, preds = _build_backfill_rows_rnn(model, timestamps, values, start_idx)
+                preds_by_target = [preds]
+            else:
+                pred_times, preds = _build_backfill_rows_nn_ar(model, timestamps, values, start_idx)
+                preds_by_target = [preds]
+        timer.set_rows("predict", len(pred_times) * len(targets))
 
         if len(pred_times) == 0:
-            return {"status": "skipped", "reason": "no eligible rows in backfill window"}
+            return timer.finish(
+                conn, {"status": "skipped", "reason": "no eligible rows in backfill window"}
+            )
 
         deleted = 0
         if replace_existing:
-            deleted = delete_predictions_window(
-                conn=conn,
-                model_name=model_name,
-                model_version=model_version,
-                source_database=database,
-                source_table=table,
-                target=target,
-                start_ts=start_ts,
-                end_ts=end_ts,
-                horizon_step=1,
-            )
+            with timer.stage("delete"):
+                for target in targets:
+                    for step in range(1, n_steps + 1):
+                        deleted += delete_predictions_window(
+                            conn=conn,
+                            model_name=model_name,
+                            model_version=model_version,
+                            source_database=database,
+                            source_table=table,
+                            target=target,
+                            start_ts=start_ts,
+                            end_ts=end_ts,
+                            horizon_step=step,
+                        )
+            timer.set_rows("delete", deleted)
 
         rows = []
-        for pred_for, yhat in zip(pred_times, preds):
-            rows.append(
-                (
-                    pred_for,
-                    database,
-                    table,
-                    target,
-                    model_name,
-                    model_version,
-                    1,
-                    float(yhat),
-                )
-            )
-        insert_predictions(conn, rows)
-        return {
-            "status": "ok",
-            "inserted": int(len(rows)),
-            "deleted_existing": int(deleted),
-            "model_name": model_name,
-            "target": target,
-            "window_hours": int(backfill_hours),
-        }
+        for target, preds in zip(targets, preds_by_target):
+            preds = np.asarray(preds).reshape(len(pred_times), n_steps)
+            for step in range(1, n_steps + 1):
+                # pred_times are consecutive source rows, so step h from origin r lands on row r + h - 1.
+                for pred_for, yhat in zip(pred_times[step - 1 :], preds[:, step - 1]):
+                    rows.append(
+                        (
+                            pred_for,
+                            database,
+                            table,
+                            target,
+                            model_name,
+                            model_version,
+                            step,
+                            float(yhat),
+                        )
+                    )
+        with timer.stage("write", rows=len(rows)):
+            insert_predictions(conn, rows, upsert=keyed)
+        return timer.finish(
+            conn,
+            {
+                "status": "ok",
+                "inserted": int(len(rows)),
+                "deleted_existing": int(deleted),
+                "model_name": model_name,
+                "target": ",".join(targets),
+                "window_hours": int(backfill_hours),
+            },
+        )
+    except Exception as exc:
+        timer.fail(conn, exc)
+        raise
     finally:
         conn.close()
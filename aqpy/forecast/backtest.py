@@ -0,0 +1,208 @@
+import json
+import math
+import pathlib
+
+import numpy as np
+
+from aqpy.common.db import connect_db
+from aqpy.forecast.adaptive_ar import (
+    predict_batch as ar_predict_batch,
+    recursive_predict_batch as ar_recursive_predict_batch,
+)
+from aqpy.forecast.features import build_ar_feature_rows, build_feature_rows
+from aqpy.forecast.model import (
+    predict as linear_predict,
+    recursive_predict_batch as linear_recursive_predict_batch,
+)
+from aqpy.forecast.nn_model import predict_batch as nn_predict_batch
+from aqpy.forecast.nn_multi import predict_batch as multi_predict_batch
+from aqpy.forecast.online_repository import ensure_backtest_table, insert_backtest_metrics
+from aqpy.forecast.repository import fetch_multi_series, fetch_series, validate_identifier
+from aqpy.forecast.rnn_lite import predict_batch as rnn_predict_batch
+from aqpy.forecast.timing import StageTimer
+
+
+def context_rows(model):
+    # History each origin needs before its first forecast.
+    model_type = model.get("model_type", "linear_lag")
+    if model_type == "rnn_lite_gru":
+        return int(model["seq_len"])
+    lags = [int(v) for v in model["lags"]]
+    if model_type == "adaptive_ar":
+        return max(lags)
+    return max(max(lags), 12)
+
+
+def select_origins(n_values, context, horizon_steps, max_origins):
+    # Origin i forecasts values[i:i + H] from values[:i]. Evenly spaced, anchored at the newest.
+    first, last = context, n_values - horizon_steps
+    if last < first:
+        return np.array([], dtype=int)
+    stride = max(1, math.ceil((last - first + 1) / max(1, int(max_origins))))
+    return np.arange(last, first - 1, -stride)[::-1]
+
+
+def forecast_origins(model, values, origins, horizon_steps):
+    # Every origin in one batch: (n_origins, H), or (n_targets, n_origins, H) for nn_mlp_multi.
+    model_type = model.get("model_type", "linear_lag")
+    values = np.asarray(values, dtype=float)
+    width = context_rows(model)
+    if len(origins) and int(np.min(origins)) < width:
+        raise ValueError(f"Origins need at least {width} rows of history.")
+    windows = values[..., np.asarray(origins)[:, None] + np.arange(-width, 0)]
+    lags = [int(v) for v in model.get("lags", [])]
+
+    direct_steps = int(model.get("direct_horizon_steps") or 0)
+    if direct_steps:
+        if horizon_steps > direct_steps:
+            raise ValueError(f"Model forecasts {direct_steps} direct steps; requested {horizon_steps}.")
+        if model_type == "nn_mlp":
+            preds = nn_predict_batch(model, build_feature_rows(windows, lags))
+        elif model_type == "adaptive_ar":
+            preds = ar_predict_batch(model, build_ar_feature_rows(windows, lags))
+        else:
+            preds = linear_predict(model["intercept"], model["weights"], build_feature_rows(windows, lags))
+        return np.asarray(preds)[:, :horizon_steps]
+
+    if model_type == "adaptive_ar":
+        return ar_recursive_predict_batch(model, windows, lags, horizon_steps)
+    if model_type == "linear_lag":
+        return linear_recursive_predict_batch(
+            windows, lags, model["intercept"], model["weights"], horizon_steps
+        )
+
+    # Nonlinear models: feed predictions back for all origins together, one batch per step.
+    if model_type == "rnn_lite_gru":
+        step = lambda hist: rnn_predict_batch(model, hist)
+    elif model_type == "nn_mlp_multi":
+        step = lambda hist: multi_predict_batch(model, build_feature_rows(hist, lags))
+    else:
+        step = lambda hist: nn_predict_batch(model, build_feature_rows(hist, lags))
+    preds = np.empty(windows.shape[:-1] + (horizon_steps,))
+    hist = windows
+    for h in range(horizon_steps):
+        preds[..., h] = step(hist)
+        hist = np.concatenate([hist[..., 1:], preds[..., h : h + 1]], axis=-1)
+    return preds
+
+
+def horizon_metrics(values, origins, preds):
+    # Per-step MAE/RMSE over origins, against persistence of the last value seen at each origin.
+    values = np.asarray(values, dtype=float)
+    origins = np.asarray(origins)
+    actual = values[..., origins[:, None] + np.arange(preds.shape[-1])]
+    persistence = values[..., origins - 1][..., None]
+    err = preds - actual
+    base = persistence - actual
+    mae = np.mean(np.abs(err), axis=-2)
+    baseline_mae = np.mean(np.abs(base), axis=-2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        improvement = np.where(baseline_mae > 0, (baseline_mae - mae) / baseline_mae * 100.0, 0.0)
+    return {
+        "mae": mae,
+        "rmse": np.sqrt(np.mean(err**2, axis=-2)),
+        "baseline_mae": baseline_mae,
+        "baseline_rmse": np.sqrt(np.mean(base**2, axis=-2)),
+        "mae_improvement_pct": improvement,
+    }
+
+
+def run_backtest(
+    model_path,
+    window_hours=24,
+    horizon_steps=12,
+    max_origins=500,
+    database_override=None,
+    write=True,
+):
+    model_file = pathlib.Path(model_path)
+    if not model_file.exists():
+        return {"status": "skipped", "reason": f"model not found: {model_file}"}
+
+    timer = StageTimer("backtest")
+    with timer.stage("load_artifact"):
+        model = json.loads(model_file.read_text())
+    database = database_override or model["database"]
+    table = validate_identifier(model["table"])
+    time_col = validate_identifier(model["time_col"])
+    model_type = model.get("model_type", "linear_lag")
+    if model_type == "nn_mlp_multi":
+        targets = [validate_identifier(t) for t in model["targets"]]
+    else:
+        targets = [validate_identifier(model["target"])]
+
+    timer.context.update(
+        model_name=model["model_name"],
+        model_type=model_type,
+        source_database=database,
+        source_table=table,
+    )
+
+    conn = connect_db(database)
+    try:
+        with timer.stage("fetch"):
+            if model_type == "nn_mlp_multi":
+                timestamps, values = fetch_multi_series(conn, table, time_col, targets, window_hours)
+            else:
+                timestamps, values = fetch_series(conn, table, time_col, targets[0], window_hours)
+                values = np.asarray(values, dtype=float)[None, :]
+        timer.set_rows("fetch", len(timestamps))
+
+        origins = select_origins(len(timestamps), context_rows(model), horizon_steps, max_origins)
+        if len(origins) == 0:
+            return timer.finish(
+                conn, {"status": "skipped", "reason": f"not enough source rows ({len(timestamps)})"}
+            )
+
+        with timer.stage("predict", rows=len(origins) * horizon_steps * len(targets)):
+            if model_type == "nn_mlp_multi":
+                preds = forecast_origins(model, values, origins, horizon_steps)
+            else:
+                preds = forecast_origins(model, values[0], origins, horizon_steps)[None, :, :]
+            metrics = horizon_metrics(values, origins, preds)
+
+        rows = []
+        for i, target in enumerate(targets):
+            for h in range(horizon_steps):
+                rows.append(
+                    {
+                        "model_name": model["model_name"],
+                        "model_version": model["model_version"],
+                        "model_type": model_type,
+                        "source_database": database,
+                        "source_table": table,
+                        "target": target,
+                        "horizon_step": h + 1,
+                        "n_origins": int(len(origins)),
+                        "origin_start_ts": timestamps[origins[0] - 1],
+                        "origin_end_ts": timestamps[origins[-1] - 1],
+                        **{key: float(metrics[key][i, h]) for key in metrics},
+                    }
+                )
+        if write:
+            with timer.stage("write", rows=len(rows)):
+                ensure_backtest_table(conn)
+                insert_backtest_metrics(conn, rows)
+
+        return timer.finish(
+            conn,
+            {
+                "status": "ok",
+                "model_name": model["model_name"],
+                "n_origins": int(len(origins)),
+                "horizon_steps": int(horizon_steps),
+                "targets": {
+                    target: {
+                        "mae": metrics["mae"][i].tolist(),
+                        "baseline_mae": metrics["baseline_mae"][i].tolist(),
+                    }
+                    for i, target in enumerate(targets)
+                },
+                "written": len(rows) if write else 0,
+            },
+        )
+    except Exception as exc:
+        timer.fail(conn, exc)
+        raise
+    finally:
+        conn.close()
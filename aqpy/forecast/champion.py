@@ -0,0 +1,83 @@
+import datetime as dt
+
+from aqpy.common.db import connect_db
+from aqpy.forecast.online_repository import (
+    ensure_job_runs_table,
+    ensure_online_tables,
+    fetch_last_job_runs,
+    fetch_recent_improvements,
+)
+from aqpy.forecast.specs import spec_targets
+
+# Timers fire every N minutes with some jitter; a challenger due "now" should not slip a whole cycle.
+DUE_GRACE_SECONDS = 60
+
+
+def select_champions(specs, scores):
+    # Best recent mae_improvement_pct per (database, table, target). Groups without any score are absent.
+    best = {}
+    for spec in specs:
+        for target in spec_targets(spec):
+            score = scores.get((spec["model_name"], target))
+            if score is None:
+                continue
+            key = (spec["database"], spec["table"], target)
+            if key not in best or score > best[key][1]:
+                best[key] = (spec["model_name"], score)
+    return {key: name for key, (name, _) in best.items()}
+
+
+def assign_roles(specs, scores):
+    # A spec is a champion if it wins any of its targets, or if nothing for its targets has been scored yet.
+    # Ensembles are not ranked.
+    ranked = [spec for spec in specs if spec.get("model_type") != "ensemble"]
+    champions = select_champions(ranked, scores)
+    roles = {spec["model_name"]: "ensemble" for spec in specs if spec.get("model_type") == "ensemble"}
+    for spec in ranked:
+        keys = [(spec["database"], spec["table"], t) for t in spec_targets(spec)]
+        wins = [champions.get(key) in (None, spec["model_name"]) for key in keys]
+        roles[spec["model_name"]] = "champion" if any(wins) else "challenger"
+    return roles
+
+
+def challenger_due(last_run, now, interval_minutes):
+    if last_run is None:
+        return True
+    elapsed = (now - last_run).total_seconds()
+    return elapsed >= interval_minutes * 60 - DUE_GRACE_SECONDS
+
+
+def plan_forecasts(specs, challenger_interval_minutes, n_recent=6, now=None):
+    # {model_name: {"role", "due", "score"}} from each database's training metrics and job_runs.
+    now = now or dt.datetime.now(dt.timezone.utc)
+    since = now - dt.timedelta(minutes=challenger_interval_minutes)
+    by_database = {}
+    for spec in specs:
+        by_database.setdefault(spec["database"], []).append(spec)
+
+    plan = {}
+    for database, db_specs in by_database.items():
+        names = [spec["model_name"] for spec in db_specs]
+        conn = connect_db(database)
+        try:
+            ensure_online_tables(conn)
+            ensure_job_runs_table(conn)
+            scores = fetch_recent_improvements(conn, names, n_recent=n_recent)
+            last_runs = fetch_last_job_runs(conn, "inference", names, since)
+        finally:
+            conn.close()
+        roles = assign_roles(db_specs, scores)
+        # An ensemble blends its members' forecasts from the same run, so they never wait.
+        members = {m for spec in db_specs if spec.get("model_type") == "ensemble" for m in spec["members"]}
+        for spec in db_specs:
+            name = spec["model_name"]
+            target_scores = [scores.get((name, t)) for t in spec_targets(spec)]
+            target_scores = [s for s in target_scores if s is not None]
+            plan[name] = {
+                "role": roles[name],
+                "due": roles[name] != "challenger"
+                or name in members
+                or challenger_due(last_runs.get(name), now, challenger_interval_minutes),
+                "score": max(target_scores) if target_scores else None,
+            }
+    return plan
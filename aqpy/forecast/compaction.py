@@ -0,0 +1,64 @@
+import datetime as dt
+
+from aqpy.common.db import connect_db
+from aqpy.forecast.repository import (
+    add_prediction_key,
+    delete_duplicate_predictions,
+    ensure_predictions_table,
+    fetch_prediction_series_keys,
+)
+from aqpy.forecast.timing import StageTimer
+
+
+def compaction_windows(start_ts, end_ts, chunk_hours):
+    # Half-open [start, end) windows covering start_ts..end_ts inclusive.
+    step = dt.timedelta(hours=chunk_hours)
+    windows = []
+    cursor = start_ts
+    while cursor <= end_ts:
+        windows.append((cursor, min(cursor + step, end_ts + dt.timedelta(microseconds=1))))
+        cursor += step
+    return windows
+
+
+def run_compaction(database, chunk_hours=24, keep_history=False):
+    timer = StageTimer("compaction", source_database=database, source_table="predictions")
+    conn = connect_db(database)
+    try:
+        with timer.stage("scan"):
+            keyed = ensure_predictions_table(conn)
+            series = [] if keyed else fetch_prediction_series_keys(conn)
+        if keyed:
+            return timer.finish(conn, {"status": "skipped", "reason": "predictions already keyed"})
+
+        deleted = archived = batches = 0
+        since_id = max((row[4] for row in series), default=0)
+        with timer.stage("dedupe"):
+            for target, model_name, start_ts, end_ts, _ in series:
+                for lo, hi in compaction_windows(start_ts, end_ts, chunk_hours):
+                    d, a = delete_duplicate_predictions(
+                        conn, target, model_name, lo, hi, keep_history=keep_history
+                    )
+                    deleted += d
+                    archived += a
+                    batches += 1
+        timer.set_rows("dedupe", deleted)
+
+        with timer.stage("add_key"):
+            d, a = add_prediction_key(conn, since_id, keep_history=keep_history)
+        timer.set_rows("add_key", d)
+
+        return timer.finish(
+            conn,
+            {
+                "status": "ok",
+                "batches": batches,
+                "rows_deleted": deleted + d,
+                "rows_archived": archived + a,
+            },
+        )
+    except Exception as exc:
+        timer.fail(conn, exc)
+        raise
+    finally:
+        conn.close()
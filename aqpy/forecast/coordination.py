@@ -0,0 +1,100 @@
+import time
+
+from aqpy.common.db import connect_db
+from aqpy.common.env import env_int
+
+
+# Advisory lock keys (two-int form): (MODEL_LOCK_CLASS, hashtext(model_name)) per model and
+# FORECAST_GATE while a forecast batch runs against the database. Advisory locks are per database.
+MODEL_LOCK_CLASS = 0x41510001
+FORECAST_GATE = (0x41510002, 0)
+MODEL_LOCKED_REASON = "model locked by another job"
+FORECAST_ACTIVE_REASON = "deferred while a forecast batch runs"
+# Skip reasons the training batch retries once at the end of the run.
+DEFERRED_REASONS = {MODEL_LOCKED_REASON, FORECAST_ACTIVE_REASON}
+
+
+def try_model_lock(conn, model_name):
+    # Session-level and non-blocking; released by release_model_lock or when the connection closes,
+    # including when the holder crashes.
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s, hashtext(%s))", (MODEL_LOCK_CLASS, model_name))
+        return bool(cur.fetchone()[0])
+
+
+def release_model_lock(conn, model_name):
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_unlock(%s, hashtext(%s))", (MODEL_LOCK_CLASS, model_name))
+
+
+def hold_forecast_gate(conn):
+    # Shared, so overlapping forecast batches do not exclude each other. Held until conn closes.
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock_shared(%s, %s)", FORECAST_GATE)
+        held = bool(cur.fetchone()[0])
+    conn.commit()
+    return held
+
+
+def open_forecast_gates(databases):
+    # One connection per database holding the gate for the whole forecast batch; close them to release.
+    gates = []
+    for database in sorted(databases):
+        conn = connect_db(database)
+        try:
+            hold_forecast_gate(conn)
+        except Exception:
+            # Coordination is best effort; a forecast batch never fails because of it.
+            conn.close()
+            continue
+        gates.append(conn)
+    return gates
+
+
+def forecast_active(conn):
+    # Reads pg_locks instead of taking the gate, so training never delays a forecast batch.
+    query = """
+    SELECT EXISTS (
+        SELECT 1
+        FROM pg_locks
+        WHERE locktype = 'advisory'
+          AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+          AND classid = %s
+          AND objid = %s
+          AND granted
+    )
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, FORECAST_GATE)
+        return bool(cur.fetchone()[0])
+
+
+def yield_to_forecast(conn, max_wait_seconds=None, poll_seconds=2.0, sleep=time.sleep):
+    # Waits while a forecast batch is running on conn's database, up to max_wait_seconds
+    # (AQPY_TRAINING_YIELD_SECONDS), then returns anyway. Returns seconds waited. Commits before
+    # each sleep so no transaction stays open; callers must not hold model locks.
+    if max_wait_seconds is None:
+        max_wait_seconds = env_int("AQPY_TRAINING_YIELD_SECONDS", 60)
+    waited = 0.0
+    while waited < max_wait_seconds and forecast_active(conn):
+        conn.commit()
+        step = min(poll_seconds, max_wait_seconds - waited)
+        sleep(step)
+        waited += step
+    conn.commit()
+    return waited
+
+
+def wait_for_forecasts(databases, max_wait_seconds=None, sleep=time.sleep):
+    # One wait for the whole training batch: max_wait_seconds is shared across databases rather
+    # than spent per model. Returns seconds waited.
+    if max_wait_seconds is None:
+        max_wait_seconds = env_int("AQPY_TRAINING_YIELD_SECONDS", 60)
+    waited = 0.0
+    for database in sorted(databases):
+        conn = connect_db(database)
+        try:
+            waited += yield_to_forecast(conn, max_wait_seconds - waited, sleep=sleep)
+        finally:
+            conn.close()
+    return waited
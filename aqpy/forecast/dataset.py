@@ -0,0 +1,173 @@
+import numpy as np
+
+from aqpy.forecast.features import (
+    build_ar_feature_matrix,
+    build_feature_matrix,
+    build_horizon_targets,
+    estimate_cadence_seconds,
+)
+from aqpy.forecast.model import mae, rmse
+from aqpy.forecast.repository import fetch_multi_series, fetch_series
+from aqpy.forecast.rnn_lite import build_sequence_dataset
+
+
+def _readonly(*arrays):
+    # Cached matrices are shared by every model trained from the dataset.
+    for arr in arrays:
+        arr.setflags(write=False)
+    return arrays
+
+
+def split_index(n_samples, holdout_ratio):
+    split_idx = max(1, int(n_samples * (1.0 - holdout_ratio)))
+    if split_idx >= n_samples:
+        split_idx = n_samples - 1
+    return split_idx
+
+
+class TrainingDataset:
+    def __init__(self, timestamps, values):
+        self.timestamps = list(timestamps)
+        self.values = np.array(values, dtype=float)
+        self.values.setflags(write=False)
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def release_matrices(self):
+        # Drops derived matrices and windows but keeps the series itself.
+        self._cache.clear()
+
+    def _cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def window(self, max_rows):
+        if max_rows is None or max_rows <= 0 or len(self.values) <= max_rows:
+            return self
+        return self._cached(
+            ("window", int(max_rows)),
+            lambda: TrainingDataset(self.timestamps[-max_rows:], self.values[-max_rows:]),
+        )
+
+    @property
+    def cadence_seconds(self):
+        return self._cached(("cadence",), lambda: estimate_cadence_seconds(self.timestamps))
+
+    def feature_matrix(self, lags, dtype=np.float64):
+        # One matrix per dtype, built directly in it; float32 runs never cache a float64 copy.
+        lags = tuple(lags)
+        dtype = np.dtype(dtype)
+        return self._cached(
+            ("features", lags, dtype.name),
+            lambda: _readonly(*build_feature_matrix(self.values, list(lags), dtype=dtype)),
+        )
+
+    def ar_feature_matrix(self, lags):
+        # RLS runs in float64; its own lag-only matrix is built unless a float64 MLP matrix exists.
+        lags = tuple(lags)
+        if ("features", lags, "float64") in self._cache:
+            # The MLP matrix starts with the same lag columns.
+            X, y = self._cache[("features", lags, "float64")]
+            return X[:, : len(lags)], y
+        return self._cached(
+            ("ar_features", lags),
+            lambda: _readonly(*build_ar_feature_matrix(self.values, list(lags))),
+        )
+
+    def sequence_dataset(self, seq_len):
+        return self._cached(
+            ("sequences", int(seq_len)),
+            lambda: _readonly(*build_sequence_dataset(self.values, seq_len=int(seq_len))),
+        )
+
+    def horizon_targets(self, offset, horizon_steps, dtype=np.float64):
+        # Direct multi-horizon targets; pair them with the first len(Y) feature rows.
+        dtype = np.dtype(dtype)
+        return self._cached(
+            ("horizon_targets", int(offset), int(horizon_steps), dtype.name),
+            lambda: _readonly(build_horizon_targets(self.values, offset, horizon_steps, dtype=dtype))[0],
+        )
+
+    def horizon_baseline_metrics(self, offset, horizon_steps, holdout_ratio, lag=1):
+        # Persistence over the whole horizon: every step predicts the last value seen at the origin.
+        def build():
+            Y = self.horizon_targets(offset, horizon_steps)
+            pred = self.values[offset - lag : offset - lag + len(Y)][:, None]
+            split_idx = split_index(len(Y), holdout_ratio)
+            Y_holdout = Y[split_idx:]
+            pred_holdout = np.broadcast_to(pred[split_idx:], Y_holdout.shape)
+            return {
+                "baseline_mae": mae(Y_holdout, pred_holdout),
+                "baseline_rmse": rmse(Y_holdout, pred_holdout),
+                "baseline_horizon_mae": np.mean(np.abs(Y_holdout - pred_holdout), axis=0).tolist(),
+            }
+
+        return self._cached(
+            ("horizon_baseline", int(offset), int(horizon_steps), float(holdout_ratio), int(lag)), build
+        )
+
+    def baseline_metrics(self, offset, holdout_ratio, lag=1):
+        # Persistence baseline over the holdout of samples whose targets are values[offset:].
+        def build():
+            y = self.values[offset:]
+            pred = self.values[offset - lag : len(self.values) - lag]
+            split_idx = split_index(len(y), holdout_ratio)
+            y_holdout = y[split_idx:]
+            pred_holdout = pred[split_idx:]
+            return {"baseline_mae": mae(y_holdout, pred_holdout), "baseline_rmse": rmse(y_holdout, pred_holdout)}
+
+        return self._cached(("baseline", int(offset), float(holdout_ratio), int(lag)), build)
+
+
+def dataset_key(database, table, time_col, target, history_hours):
+    return ("dataset", database, table, time_col, target, int(history_hours))
+
+
+def load_training_dataset(conn, database, table, time_col, target, history_hours, source_cache=None):
+    key = dataset_key(database, table, time_col, target, history_hours)
+    if source_cache is not None and key in source_cache:
+        return source_cache[key], False
+    timestamps, values = fetch_series(conn, table, time_col, target, history_hours)
+    dataset = TrainingDataset(timestamps, values)
+    if source_cache is not None:
+        source_cache[key] = dataset
+    return dataset, True
+
+
+def load_multi_training_dataset(conn, database, table, time_col, targets, history_hours, source_cache=None):
+    # Timestamps and a (targets x rows) array over the rows where every target is non-null, as
+    # fetch_multi_series returns them. Targets already in the batch cache are reused; with none
+    # cached, one multi-column query is cheaper than a fetch per target. Returns rows fetched too.
+    keys = [dataset_key(database, table, time_col, target, history_hours) for target in targets]
+    if source_cache is None or not any(key in source_cache for key in keys):
+        timestamps, values = fetch_multi_series(conn, table, time_col, targets, history_hours)
+        return timestamps, values, len(timestamps)
+    datasets = []
+    rows_fetched = 0
+    for target in targets:
+        dataset, fetched = load_training_dataset(
+            conn, database, table, time_col, target, history_hours, source_cache=source_cache
+        )
+        datasets.append(dataset)
+        rows_fetched += len(dataset) if fetched else 0
+    timestamps = datasets[0].timestamps
+    if all(ds.timestamps == timestamps for ds in datasets[1:]):
+        return timestamps, np.stack([ds.values for ds in datasets]), rows_fetched
+    common = set(timestamps).intersection(*(ds.timestamps for ds in datasets[1:]))
+    masks = [np.fromiter((ts in common for ts in ds.timestamps), dtype=bool, count=len(ds)) for ds in datasets]
+    timestamps = [ts for ts in timestamps if ts in common]
+    return timestamps, np.stack([ds.values[mask] for ds, mask in zip(datasets, masks)]), rows_fetched
+
+
+def release_dataset_matrices(source_cache):
+    for key, dataset in source_cache.items():
+        if key[0] == "dataset":
+            dataset.release_matrices()
+
+
+def release_datasets(source_cache):
+    for key in [k for k in source_cache if k[0] == "dataset"]:
+        del source_cache[key]
@@ -0,0 +1,252 @@
+import datetime as dt
+import json
+import pathlib
+
+import numpy as np
+
+from aqpy.common.db import connect_db
+from aqpy.forecast.artifacts import write_artifact
+from aqpy.forecast.coordination import MODEL_LOCKED_REASON, try_model_lock
+from aqpy.forecast.repository import (
+    ensure_predictions_table,
+    fetch_realized_predictions,
+    insert_predictions,
+    validate_identifier,
+)
+from aqpy.forecast.timing import StageTimer
+
+
+# Fixed share mixed back in after every update so a member that fell behind can still recover.
+WEIGHT_FLOOR_SHARE = 0.01
+
+
+def _version_stamp():
+    return dt.datetime.now(dt.timezone.utc).isoformat().replace(":", "").replace("-", "")
+
+
+def init_ensemble(spec, horizon_steps):
+    members = list(spec["members"])
+    created_at = dt.datetime.now(dt.timezone.utc).isoformat()
+    return {
+        "model_type": "ensemble",
+        "model_name": spec["model_name"],
+        "model_version": created_at.replace(":", "").replace("-", ""),
+        "trained_at": created_at,
+        "database": spec["database"],
+        "table": spec["table"],
+        "time_col": spec["time_col"],
+        "target": spec["target"],
+        "members": members,
+        "method": spec.get("ensemble_method", "inverse_error"),
+        "forgetting_factor": float(spec.get("forgetting_factor", 0.98)),
+        "learning_rate": float(spec.get("learning_rate", 1.0)),
+        "horizon_steps": int(horizon_steps),
+        "weights": np.full((horizon_steps, len(members)), 1.0 / len(members)).tolist(),
+        "errors": None,
+        "last_update_ts": None,
+        "n_updates": 0,
+    }
+
+
+def pivot_realized(rows, members, horizon_steps):
+    # SQL rows (model, step, actual_ts, yhat, actual) -> complete observations where every member forecast
+    # the same source row at the same step: step index (n,), member forecasts (n, M), actuals (n,).
+    if not rows:
+        return np.zeros(0, dtype=int), np.zeros((0, len(members))), np.zeros(0)
+    col = {name: i for i, name in enumerate(members)}
+    names, steps, stamps, yhat, actual = zip(*rows)
+    steps = np.asarray(steps, dtype=int) - 1
+    stamps = np.asarray([ts.timestamp() for ts in stamps])
+    keys, inverse = np.unique(np.stack([stamps, steps], axis=1), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    preds = np.full((len(keys), len(members)), np.nan)
+    preds[inverse, [col[n] for n in names]] = yhat
+    actuals = np.empty(len(keys))
+    actuals[inverse] = actual
+    complete = ~np.isnan(preds).any(axis=1) & (keys[:, 1] < horizon_steps)
+    # np.unique sorts by timestamp first, so observations stay in time order within each step.
+    return keys[complete, 1].astype(int), preds[complete], actuals[complete]
+
+
+def inverse_error_update(errors, steps, preds, actual, forgetting_factor):
+    # Exponentially weighted MAE per (step, member), folded over every new observation at once.
+    errors = np.asarray(errors, dtype=float)
+    lam = float(forgetting_factor)
+    counts = np.bincount(steps, minlength=errors.shape[0])
+    order = np.argsort(steps, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    age = counts[steps[order]] - 1 - (np.arange(len(order)) - starts[steps[order]])
+    contrib = np.zeros_like(errors)
+    np.add.at(contrib, steps[order], (1 - lam) * lam ** age[:, None] * np.abs(preds[order] - actual[order, None]))
+    decay = lam ** counts[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fresh = contrib / (1 - decay)
+    return np.where(np.isnan(errors), np.where(counts[:, None] > 0, fresh, np.nan), decay * errors + contrib)
+
+
+def inverse_error_weights(errors):
+    errors = np.asarray(errors, dtype=float)
+    inv = 1.0 / np.maximum(errors, 1e-9)
+    weights = inv / inv.sum(axis=1, keepdims=True)
+    # Steps that have not been realized yet stay uniform.
+    return np.where(np.isnan(weights), 1.0 / errors.shape[1], weights)
+
+
+def exp_gradient_update(weights, steps, preds, actual, learning_rate):
+    # Exponentiated-gradient on the blend's squared loss, one observation after another but with the
+    # weights held for the whole batch, so the per-step gradients simply add up. Scaling by the target's
+    # magnitude keeps learning_rate unit-free.
+    weights = np.asarray(weights, dtype=float)
+    blended = np.sum(weights[steps] * preds, axis=1)
+    scale = np.mean(np.abs(actual)) + 1e-9
+    grad = 2.0 * (blended - actual)[:, None] * preds / scale**2
+    total = np.zeros_like(weights)
+    np.add.at(total, steps, grad)
+    exponent = -float(learning_rate) * total
+    exponent -= exponent.max(axis=1, keepdims=True)
+    updated = weights * np.exp(np.maximum(exponent, -50.0))
+    return updated / updated.sum(axis=1, keepdims=True)
+
+
+def update_weights(model, steps, preds, actual):
+    n_members = len(model["members"])
+    if model["method"] == "exp_gradient":
+        weights = exp_gradient_update(model["weights"], steps, preds, actual, model["learning_rate"])
+    else:
+        errors = model["errors"]
+        if errors is None:
+            errors = np.full((model["horizon_steps"], n_members), np.nan)
+        errors = inverse_error_update(errors, steps, preds, actual, model["forgetting_factor"])
+        model["errors"] = np.where(np.isnan(errors), None, errors).tolist()
+        weights = inverse_error_weights(errors)
+    weights = (1 - WEIGHT_FLOOR_SHARE) * weights + WEIGHT_FLOOR_SHARE / n_members
+    model["weights"] = weights.tolist()
+    model["n_updates"] += 1
+    # New weights get a new version, so each artifact file and blend row names the weights it used.
+    model["model_version"] = f"{_version_stamp()}u{model['n_updates']}"
+    return weights
+
+
+def blend(weights, member_preds, available=None):
+    # weights (H, M), member_preds (M, H). Missing members are dropped and the rest renormalized.
+    weights = np.asarray(weights, dtype=float)[: member_preds.shape[1]]
+    if available is not None:
+        weights = weights * np.asarray(available, dtype=float)
+        weights = weights / weights.sum(axis=1, keepdims=True)
+    return np.sum(weights * np.nan_to_num(member_preds.T), axis=1)
+
+
+def run_ensemble(spec, member_forecasts, horizon_steps=12):
+    # member_forecasts: {model_name: {"predicted_for": [...], "yhat": {target: [...]}}} from this batch.
+    if not any(name in member_forecasts for name in spec["members"]):
+        return {"status": "skipped", "reason": "no member forecasts in this batch"}
+    model_file = pathlib.Path(spec["model_path"])
+    database = spec["database"]
+    timer = StageTimer("ensemble")
+    conn = connect_db(database)
+    try:
+        # Held until conn closes, so two overlapping forecast batches never update the same weights.
+        if not try_model_lock(conn, spec["model_name"]):
+            return {"status": "skipped", "reason": MODEL_LOCKED_REASON}
+        with timer.stage("load_artifact"):
+            model = json.loads(model_file.read_text()) if model_file.exists() else None
+        if model is None or model["members"] != list(spec["members"]):
+            model = init_ensemble(spec, int(spec.get("forecast_horizon_steps", horizon_steps)))
+        if horizon_steps > model["horizon_steps"]:
+            raise ValueError(
+                f"Ensemble '{model['model_name']}' keeps weights for {model['horizon_steps']} steps; "
+                f"requested {horizon_steps}."
+            )
+        table = validate_identifier(model["table"])
+        time_col = validate_identifier(model["time_col"])
+        target = validate_identifier(model["target"])
+        members = model["members"]
+
+        timer.context.update(
+            model_name=model["model_name"],
+            model_type="ensemble",
+            source_database=database,
+            source_table=table,
+        )
+
+        fresh = [member_forecasts.get(name) for name in members]
+        available = [f is not None and target in f["yhat"] for f in fresh]
+        if not any(available):
+            return {"status": "skipped", "reason": "no member forecasts in this batch"}
+        latest = max(
+            (f for f, ok in zip(fresh, available) if ok), key=lambda f: f["predicted_for"][0]
+        )
+        # The newest source row the members forecast from; everything up to it can be scored.
+        origin_ts = latest["predicted_for"][0] - dt.timedelta(seconds=latest["cadence_seconds"])
+        tolerance = latest["cadence_seconds"] / 2.0
+        if model["last_update_ts"]:
+            since_ts = dt.datetime.fromisoformat(model["last_update_ts"])
+        else:
+            since_ts = origin_ts - dt.timedelta(hours=int(spec.get("history_hours", 24)))
+        until_ts = origin_ts - dt.timedelta(seconds=tolerance)
+
+        with timer.stage("fetch_realized"):
+            keyed = ensure_predictions_table(conn)
+            rows = fetch_realized_predictions(
+                conn,
+                source_database=database,
+                table=table,
+                time_col=time_col,
+                target_col=target,
+                model_names=members,
+                max_step=model["horizon_steps"],
+                since_ts=since_ts,
+                until_ts=until_ts,
+                tolerance_seconds=tolerance,
+            )
+        timer.set_rows("fetch_realized", len(rows))
+
+        with timer.stage("update"):
+            steps, preds, actual = pivot_realized(rows, members, model["horizon_steps"])
+            if len(steps):
+                update_weights(model, steps, preds, actual)
+            if until_ts > since_ts:
+                model["last_update_ts"] = until_ts.isoformat()
+        timer.set_rows("update", len(steps))
+
+        with timer.stage("predict", rows=horizon_steps):
+            member_preds = np.full((len(members), horizon_steps), np.nan)
+            for i, (f, ok) in enumerate(zip(fresh, available)):
+                if ok:
+                    member_preds[i] = np.asarray(f["yhat"][target], dtype=float)[:horizon_steps]
+            yhat = blend(model["weights"], member_preds, available)
+
+        rows = [
+            (
+                pred_for,
+                database,
+                table,
+                target,
+                model["model_name"],
+                model["model_version"],
+                step,
+                float(value),
+            )
+            for step, (pred_for, value) in enumerate(zip(latest["predicted_for"], yhat), start=1)
+        ]
+        with timer.stage("write", rows=len(rows)):
+            insert_predictions(conn, rows, upsert=keyed)
+            write_artifact(model_file, model)
+
+        return timer.finish(
+            conn,
+            {
+                "inserted": len(rows),
+                "target": target,
+                "model_name": model["model_name"],
+                "model_version": model["model_version"],
+                "realized_rows": int(len(steps)),
+                "members_missing": [n for n, ok in zip(members, available) if not ok],
+                "weights_step1": dict(zip(members, np.round(model["weights"][0], 4).tolist())),
+            },
+        )
+    except Exception as exc:
+        timer.fail(conn, exc)
+        raise
+    finally:
+        conn.close()
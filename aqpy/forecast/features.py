@@ -3,22 +3,39 @@ import statistics
 import numpy as np
 
 
-def build_feature_matrix(values, lags):
+def _trailing_means(values, start, window):
+    # Row i is mean(values[max(0, idx - window):idx]) for idx = start + i, computed in values.dtype.
+    idx = np.arange(start, len(values))
+    out = np.empty(len(idx), dtype=values.dtype)
+    full = idx >= window
+    if full.any():
+        windows = np.lib.stride_tricks.sliding_window_view(values[:-1], window)
+        out[full] = windows[idx[full] - window].mean(axis=1)
+    for i in np.flatnonzero(~full):
+        out[i] = values[: idx[i]].mean()
+    return out
+
+
+def _lag_columns(values, lags, extra_cols=0):
     max_lag = max(lags)
     if len(values) <= max_lag:
         raise ValueError(
             f"Not enough rows ({len(values)}) for max lag {max_lag}. Collect more data."
         )
+    n = len(values) - max_lag
+    X = np.empty((n, len(lags) + extra_cols), dtype=values.dtype)
+    for col, lag in enumerate(lags):
+        X[:, col] = values[max_lag - lag : max_lag - lag + n]
+    return X, values[max_lag:].copy()
 
-    features = []
-    targets = []
-    for idx in range(max_lag, len(values)):
-        row = [values[idx - lag] for lag in lags]
-        row.append(float(np.mean(values[idx - min(3, idx) : idx])))
-        row.append(float(np.mean(values[max(0, idx - 12) : idx])))
-        features.append(row)
-        targets.append(values[idx])
-    return np.array(features, dtype=float), np.array(targets, dtype=float)
+
+def build_feature_matrix(values, lags, dtype=float):
+    # Built directly in `dtype`, so a float32 matrix never has a float64 copy.
+    values = np.asarray(values, dtype=dtype)
+    X, y = _lag_columns(values, lags, extra_cols=2)
+    X[:, -2] = _trailing_means(values, max(lags), 3)
+    X[:, -1] = _trailing_means(values, max(lags), 12)
+    return X, y
 
 
 def build_single_feature(values, lags):
@@ -29,20 +46,33 @@ def build_single_feature(values, lags):
     return np.array(row, dtype=float)
 
 
-def build_ar_feature_matrix(values, lags):
-    max_lag = max(lags)
-    if len(values) <= max_lag:
+def build_feature_rows(histories, lags):
+    # Batched build_single_feature over the last axis of (..., T) histories; needs T >= max(max(lags), 12).
+    histories = np.asarray(histories, dtype=float)
+    cols = [histories[..., -lag] for lag in lags]
+    cols.append(histories[..., -3:].mean(axis=-1))
+    cols.append(histories[..., -12:].mean(axis=-1))
+    return np.stack(cols, axis=-1)
+
+
+def build_ar_feature_rows(histories, lags):
+    histories = np.asarray(histories, dtype=float)
+    return np.stack([histories[..., -lag] for lag in lags], axis=-1)
+
+
+def build_ar_feature_matrix(values, lags, dtype=float):
+    return _lag_columns(np.asarray(values, dtype=dtype), lags)
+
+
+def build_horizon_targets(values, start, horizon_steps, dtype=float):
+    # Row i holds values[start + i : start + i + horizon_steps]: the targets of a direct
+    # multi-horizon model for the feature row built at index start + i.
+    values = np.asarray(values, dtype=float)
+    if len(values) - start < horizon_steps:
         raise ValueError(
-            f"Not enough rows ({len(values)}) for max lag {max_lag}. Collect more data."
+            f"Not enough rows ({len(values)}) for {horizon_steps} horizon steps after index {start}."
         )
-
-    features = []
-    targets = []
-    for idx in range(max_lag, len(values)):
-        row = [values[idx - lag] for lag in lags]
-        features.append(row)
-        targets.append(values[idx])
-    return np.array(features, dtype=float), np.array(targets, dtype=float)
+    return np.lib.stride_tricks.sliding_window_view(values[start:], horizon_steps).astype(dtype)
 
 
 def build_ar_single_feature(values, lags):
@@ -2,96 +2,233 @@ import datetime as dt
 import json
 import pathlib
 
-from aqpy.forecast.adaptive_ar import recursive_predict as ar_recursive_predict
+from aqpy.forecast.adaptive_ar import (
+    direct_predict as ar_direct_predict,
+    recursive_predict as ar_recursive_predict,
+)
 from aqpy.common.db import connect_db
-from aqpy.forecast.model import recursive_predict as linear_recursive_predict
-from aqpy.forecast.nn_model import recursive_predict as nn_recursive_predict
+from aqpy.forecast.model import (
+    direct_predict as linear_direct_predict,
+    recursive_predict as linear_recursive_predict,
+)
+from aqpy.forecast.nn_model import (
+    direct_predict as nn_direct_predict,
+    recursive_predict as nn_recursive_predict,
+)
+from aqpy.forecast.nn_multi import recursive_predict as multi_recursive_predict
+from aqpy.forecast.online_repository import fetch_latest_ts
 from aqpy.forecast.rnn_lite import recursive_predict as rnn_recursive_predict
 from aqpy.forecast.repository import (
+    ensure_forecast_state_table,
     ensure_predictions_table,
+    fetch_recent_multi_series,
     fetch_recent_series,
+    get_forecast_state,
     insert_predictions,
+    upsert_forecast_state,
     validate_identifier,
 )
+from aqpy.forecast.timing import StageTimer
+
+
+def latest_source_ts(conn, database, table, time_col, source_cache=None):
+    # Same ("latest", ...) watermark key the training batch uses: one MAX(t) per source per batch.
+    cache = source_cache if source_cache is not None else {}
+    key = ("latest", database, table, time_col)
+    if key not in cache:
+        cache[key] = fetch_latest_ts(conn, table, time_col)
+    return cache[key]
+
 
+UNCHANGED_REASON = "no new source rows since last forecast"
 
-def run_inference(model_path, horizon_steps=12, database_override=None):
+
+def forecast_is_current(state, model_version, horizon_steps, latest_ts):
+    # Nothing to do when this version already forecast this horizon from the newest source row.
+    return (
+        state is not None
+        and latest_ts is not None
+        and state["model_version"] == model_version
+        and state["horizon_steps"] >= horizon_steps
+        and state["last_forecast_source_ts"] >= latest_ts
+    )
+
+
+def run_inference(
+    model_path,
+    horizon_steps=12,
+    database_override=None,
+    skip_unchanged=False,
+    source_cache=None,
+):
     model_file = pathlib.Path(model_path)
     if not model_file.exists():
         raise FileNotFoundError(f"Model file not found: {model_file}")
 
-    model = json.loads(model_file.read_text())
+    timer = StageTimer("inference")
+    with timer.stage("load_artifact"):
+        model = json.loads(model_file.read_text())
     database = database_override or model["database"]
     table = validate_identifier(model["table"])
     time_col = validate_identifier(model["time_col"])
-    target = validate_identifier(model["target"])
+    model_type = model.get("model_type", "linear_lag")
+    if model_type == "nn_mlp_multi":
+        targets = [validate_identifier(t) for t in model["targets"]]
+    else:
+        targets = [validate_identifier(model["target"])]
     lags = [int(v) for v in model["lags"]]
     max_lag = max(lags)
     n_rows = max(max_lag + 20, 50)
+    direct_steps = int(model.get("direct_horizon_steps") or 0)
+    if direct_steps and horizon_steps > direct_steps:
+        raise ValueError(
+            f"Model '{model['model_name']}' forecasts {direct_steps} direct steps; "
+            f"requested {horizon_steps}."
+        )
+
+    timer.context.update(
+        model_name=model["model_name"],
+        model_type=model_type,
+        source_database=database,
+        source_table=table,
+    )
 
     conn = connect_db(database)
     try:
-        ensure_predictions_table(conn)
-        timestamps, values = fetch_recent_series(conn, table, time_col, target, n_rows)
-        if len(values) <= max_lag:
+        with timer.stage("probe"):
+            ensure_forecast_state_table(conn)
+            latest_ts = latest_source_ts(conn, database, table, time_col, source_cache)
+            state = get_forecast_state(conn, model["model_name"])
+        if skip_unchanged and forecast_is_current(
+            state, model["model_version"], horizon_steps, latest_ts
+        ):
+            # Not recorded in job_runs: an idle sensor would otherwise add a row per model per tick.
+            return {
+                "status": "skipped",
+                "reason": UNCHANGED_REASON,
+                "model_name": model["model_name"],
+                "last_forecast_source_ts": state["last_forecast_source_ts"],
+            }
+
+        with timer.stage("fetch"):
+            keyed = ensure_predictions_table(conn)
+            if model_type == "nn_mlp_multi":
+                timestamps, values_by_target = fetch_recent_multi_series(
+                    conn, table, time_col, targets, n_rows
+                )
+            else:
+                timestamps, values = fetch_recent_series(conn, table, time_col, targets[0], n_rows)
+                values_by_target = [values]
+        timer.set_rows("fetch", len(timestamps))
+        if len(timestamps) <= max_lag:
             raise RuntimeError(
-                f"Not enough source rows for inference. Need > {max_lag}, got {len(values)}."
+                f"Not enough source rows for inference. Need > {max_lag}, got {len(timestamps)}."
             )
 
-        model_type = model.get("model_type", "linear_lag")
-        if model_type == "nn_mlp":
-            preds = nn_recursive_predict(
-                model=model,
-                values=values,
-                lags=lags,
-                horizon_steps=horizon_steps,
-            )
-        elif model_type == "rnn_lite_gru":
-            preds = rnn_recursive_predict(
-                model=model,
-                values=values,
-                horizon_steps=horizon_steps,
-            )
-        elif model_type == "adaptive_ar":
-            preds = ar_recursive_predict(
-                model=model,
-                values=values,
-                lags=lags,
-                horizon_steps=horizon_steps,
-            )
-        else:
-            preds = linear_recursive_predict(
-                values=values,
-                lags=lags,
-                intercept=float(model["intercept"]),
-                weights=[float(w) for w in model["weights"]],
-                horizon_steps=horizon_steps,
-            )
+        with timer.stage("predict", rows=horizon_steps * len(targets)):
+            if model_type == "nn_mlp_multi":
+                preds_by_target = multi_recursive_predict(
+                    model=model,
+                    values_by_target=values_by_target,
+                    lags=lags,
+                    horizon_steps=horizon_steps,
+                )
+            elif direct_steps:
+                # One product over the origin's feature row yields every step at once.
+                if model_type == "nn_mlp":
+                    preds = nn_direct_predict(model, values, lags, horizon_steps)
+                elif model_type == "adaptive_ar":
+                    preds = ar_direct_predict(model, values, lags, horizon_steps)
+                else:
+                    preds = linear_direct_predict(
+                        values=values,
+                        lags=lags,
+                        intercept=model["intercept"],
+                        weights=model["weights"],
+                        horizon_steps=horizon_steps,
+                    )
+            elif model_type == "nn_mlp":
+                preds = nn_recursive_predict(
+                    model=model,
+                    values=values,
+                    lags=lags,
+                    horizon_steps=horizon_steps,
+                )
+            elif model_type == "rnn_lite_gru":
+                preds = rnn_recursive_predict(
+                    model=model,
+                    values=values,
+                    horizon_steps=horizon_steps,
+                )
+            elif model_type == "adaptive_ar":
+                preds = ar_recursive_predict(
+                    model=model,
+                    values=values,
+                    lags=lags,
+                    horizon_steps=horizon_steps,
+                )
+            else:
+                preds = linear_recursive_predict(
+                    values=values,
+                    lags=lags,
+                    intercept=float(model["intercept"]),
+                    weights=[float(w) for w in model["weights"]],
+                    horizon_steps=horizon_steps,
+                )
+            if model_type != "nn_mlp_multi":
+                preds_by_target = [preds]
 
         last_ts = timestamps[-1]
         cadence_seconds = int(model.get("cadence_seconds", 60))
+        pred_times = [
+            last_ts + dt.timedelta(seconds=cadence_seconds * step)
+            for step in range(1, horizon_steps + 1)
+        ]
         rows = []
-        for step, pred in enumerate(preds, start=1):
-            pred_for = last_ts + dt.timedelta(seconds=cadence_seconds * step)
-            rows.append(
-                (
-                    pred_for,
-                    database,
-                    table,
-                    target,
-                    model["model_name"],
-                    model["model_version"],
-                    step,
-                    pred,
+        for target, preds in zip(targets, preds_by_target):
+            for step, (pred_for, pred) in enumerate(zip(pred_times, preds), start=1):
+                rows.append(
+                    (
+                        pred_for,
+                        database,
+                        table,
+                        target,
+                        model["model_name"],
+                        model["model_version"],
+                        step,
+                        pred,
+                    )
                 )
-            )
 
-        insert_predictions(conn, rows)
-        return {
-            "inserted": len(rows),
-            "target": target,
-            "model_name": model["model_name"],
-            "model_version": model["model_version"],
-        }
+        with timer.stage("write", rows=len(rows)):
+            insert_predictions(conn, rows, upsert=keyed)
+            if latest_ts is not None:
+                upsert_forecast_state(
+                    conn,
+                    model_name=model["model_name"],
+                    model_version=model["model_version"],
+                    source_database=database,
+                    source_table=table,
+                    horizon_steps=horizon_steps,
+                    source_ts=max(latest_ts, last_ts),
+                )
+        return timer.finish(
+            conn,
+            {
+                "inserted": len(rows),
+                "target": ",".join(targets),
+                "model_name": model["model_name"],
+                "model_version": model["model_version"],
+                # Kept for ensembles in the same batch; forecast_specs removes it from the report.
+                "forecast": {
+                    "predicted_for": pred_times,
+                    "cadence_seconds": cadence_seconds,
+                    "yhat": {t: [float(v) for v in p] for t, p in zip(targets, preds_by_target)},
+                },
+            },
+        )
+    except Exception as exc:
+        timer.fail(conn, exc)
+        raise
     finally:
         conn.close()
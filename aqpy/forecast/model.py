@@ -1,3 +1,5 @@
+import functools
+
 import numpy as np
 
 from aqpy.forecast.features import build_single_feature
@@ -18,11 +20,67 @@ def fit_linear_regression(X_train, y_train):
     return intercept, weights
 
 
+def fit_direct_linear_regression(X_train, Y_train):
+    # One least-squares column per horizon step; weights is input_dim x horizon_steps.
+    X_aug = np.column_stack([np.ones(len(X_train)), X_train])
+    coef = np.linalg.lstsq(X_aug, Y_train, rcond=None)[0]
+    return coef[0].tolist(), coef[1:].tolist()
+
+
 def predict(intercept, weights, X):
     return intercept + np.dot(X, np.array(weights))
 
 
+def horizon_response(lag_coefs, intercept, horizon_steps):
+    return _horizon_response(tuple(float(v) for v in lag_coefs), float(intercept), int(horizon_steps))
+
+
+@functools.lru_cache(maxsize=128)
+def _horizon_response(lag_coefs, intercept, horizon_steps):
+    # Cached per coefficient set, so a loaded model builds its response once.
+    # Recursive forecasts of y_t = intercept + sum_k lag_coefs[k - 1] * y_{t - k} are affine in
+    # the last L = len(lag_coefs) observations: preds = window @ R + c, window oldest first.
+    # Each row of `history` holds one value as coefficients over (window..., 1).
+    n_lags = len(lag_coefs)
+    a = np.asarray(lag_coefs, dtype=float)[::-1]
+    history = np.zeros((n_lags + horizon_steps, n_lags + 1))
+    history[:n_lags, :n_lags] = np.eye(n_lags)
+    for h in range(horizon_steps):
+        row = n_lags + h
+        history[row] = a @ history[row - n_lags : row]
+        history[row, n_lags] += intercept
+    out = history[n_lags:]
+    R = np.ascontiguousarray(out[:, :n_lags].T)
+    c = out[:, n_lags].copy()
+    R.setflags(write=False)
+    c.setflags(write=False)
+    return R, c
+
+
+def lag_coefficients(lags, weights):
+    # Folds build_single_feature's lag columns and its last-3 / last-12 means into one
+    # coefficient per lag 1..L. Exact once the history holds at least L values.
+    coefs = np.zeros(max(max(lags), 12))
+    for lag, weight in zip(lags, weights):
+        coefs[lag - 1] += weight
+    coefs[:3] += weights[len(lags)] / 3.0
+    coefs[:12] += weights[len(lags) + 1] / 12.0
+    return coefs
+
+
+def recursive_predict_batch(windows, lags, intercept, weights, horizon_steps):
+    # windows: (n_origins, L) with the newest value last, L = len(lag_coefficients(...)).
+    R, c = horizon_response(lag_coefficients(lags, weights), float(intercept), horizon_steps)
+    return np.asarray(windows, dtype=float) @ R + c
+
+
 def recursive_predict(values, lags, intercept, weights, horizon_steps):
+    n_lags = max(max(lags), 12)
+    if len(values) >= n_lags:
+        window = np.asarray(values[-n_lags:], dtype=float)
+        return recursive_predict_batch(window[None, :], lags, intercept, weights, horizon_steps)[0].tolist()
+
+    # Short histories shrink the rolling means, so the closed form does not apply.
     history = list(values)
     preds = []
     for _ in range(horizon_steps):
@@ -33,6 +91,12 @@ def recursive_predict(values, lags, intercept, weights, horizon_steps):
     return preds
 
 
+def direct_predict(values, lags, intercept, weights, horizon_steps):
+    feat = build_single_feature(values, lags)
+    preds = np.asarray(intercept) + feat @ np.asarray(weights)
+    return [float(v) for v in preds[:horizon_steps]]
+
+
 def mae(y_true, y_pred):
     return float(np.mean(np.abs(y_true - y_pred)))
 
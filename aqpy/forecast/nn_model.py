@@ -1,22 +1,19 @@
 import numpy as np
 
 from aqpy.forecast.features import build_single_feature
+from aqpy.forecast.precision import model_dtype
 
 
 def _relu(x):
     return np.maximum(0.0, x)
 
 
-def _relu_grad(x):
-    return (x > 0.0).astype(float)
-
-
-def init_params(input_dim, hidden_dim, seed=42):
+def init_params(input_dim, hidden_dim, seed=42, output_dim=1):
     rng = np.random.default_rng(seed)
     w1 = rng.normal(0.0, 0.1, size=(input_dim, hidden_dim))
     b1 = np.zeros(hidden_dim)
-    w2 = rng.normal(0.0, 0.1, size=(hidden_dim, 1))
-    b2 = np.zeros(1)
+    w2 = rng.normal(0.0, 0.1, size=(hidden_dim, output_dim))
+    b2 = np.zeros(output_dim)
     return {"w1": w1, "b1": b1, "w2": w2, "b2": b2}
 
 
@@ -32,16 +29,149 @@ def _mse_loss(yhat, y):
     return float(np.mean((yhat - y) ** 2))
 
 
-def _backward(params, cache, yhat, y):
-    n = len(y)
-    dy = (2.0 / n) * (yhat - y)
-    dw2 = cache["a1"].T @ dy
-    db2 = np.sum(dy, axis=0)
-    da1 = dy @ params["w2"].T
-    dz1 = da1 * _relu_grad(cache["z1"])
-    dw1 = cache["X"].T @ dz1
-    db1 = np.sum(dz1, axis=0)
-    return {"dw1": dw1, "db1": db1, "dw2": dw2, "db2": db2}
+def _alloc_buffers(batch_size, input_dim, hidden_dim, dtype=float, output_dim=1):
+    return {
+        "xb": np.empty((batch_size, input_dim), dtype=dtype),
+        "yb": np.empty((batch_size, output_dim), dtype=dtype),
+        "z1": np.empty((batch_size, hidden_dim), dtype=dtype),
+        "a1": np.empty((batch_size, hidden_dim), dtype=dtype),
+        "mask": np.empty((batch_size, hidden_dim), dtype=dtype),
+        "dy": np.empty((batch_size, output_dim), dtype=dtype),
+        "dz1": np.empty((batch_size, hidden_dim), dtype=dtype),
+        "grads": {
+            "w1": np.empty((input_dim, hidden_dim), dtype=dtype),
+            "b1": np.empty(hidden_dim, dtype=dtype),
+            "w2": np.empty((hidden_dim, output_dim), dtype=dtype),
+            "b2": np.empty(output_dim, dtype=dtype),
+        },
+    }
+
+
+def _minibatch_gradients(params, bufs, m):
+    # Forward pass and MSE gradients, written into preallocated buffers. Returns the batch MSE.
+    xb, yb = bufs["xb"][:m], bufs["yb"][:m]
+    z1, a1, mask = bufs["z1"][:m], bufs["a1"][:m], bufs["mask"][:m]
+    dy, dz1 = bufs["dy"][:m], bufs["dz1"][:m]
+    grads = bufs["grads"]
+
+    np.matmul(xb, params["w1"], out=z1)
+    z1 += params["b1"]
+    np.maximum(z1, 0.0, out=a1)
+    np.matmul(a1, params["w2"], out=dy)
+    dy += params["b2"]
+    dy -= yb
+    # Mean over every output; dy.size == m for the one-step model.
+    loss = float(np.vdot(dy, dy)) / dy.size
+    dy *= 2.0 / dy.size
+
+    np.matmul(a1.T, dy, out=grads["w2"])
+    np.sum(dy, axis=0, out=grads["b2"])
+    np.matmul(dy, params["w2"].T, out=dz1)
+    np.greater(z1, 0.0, out=mask, casting="unsafe")
+    dz1 *= mask
+    np.matmul(xb.T, dz1, out=grads["w1"])
+    np.sum(dz1, axis=0, out=grads["b1"])
+    return loss
+
+
+PARAM_KEYS = ("w1", "b1", "w2", "b2")
+OPTIMIZERS = ("sgd", "momentum", "adam")
+MOMENTUM = 0.9
+ADAM_BETA1 = 0.9
+ADAM_BETA2 = 0.999
+ADAM_EPS = 1e-8
+
+
+def init_optimizer_state(optimizer, params):
+    if optimizer not in OPTIMIZERS:
+        raise ValueError(f"Unsupported optimizer '{optimizer}'. Allowed: {list(OPTIMIZERS)}")
+    state = {"step": 0}
+    if optimizer in ("momentum", "adam"):
+        state["m"] = {k: np.zeros_like(params[k]) for k in PARAM_KEYS}
+    if optimizer == "adam":
+        state["v"] = {k: np.zeros_like(params[k]) for k in PARAM_KEYS}
+    return state
+
+
+def load_optimizer_state(optimizer, saved, params):
+    # Resume moments from a prior artifact when they fit the current parameter shapes.
+    state = init_optimizer_state(optimizer, params)
+    if not saved:
+        return state
+    for slot in ("m", "v"):
+        if slot not in state:
+            continue
+        if slot not in saved:
+            return init_optimizer_state(optimizer, params)
+        for key in PARAM_KEYS:
+            arr = np.array(saved[slot][key], dtype=params[key].dtype)
+            if arr.shape != params[key].shape:
+                return init_optimizer_state(optimizer, params)
+            state[slot][key] = arr
+    step = saved.get("step", 0)
+    # nn_mlp_multi saves one step count per target.
+    state["step"] = np.array(step, dtype=np.int64) if isinstance(step, list) else int(step)
+    return state
+
+
+def dump_optimizer_state(state):
+    dumped = {"step": np.asarray(state["step"]).tolist()}
+    for slot in ("m", "v"):
+        if slot in state:
+            dumped[slot] = {k: state[slot][k].tolist() for k in PARAM_KEYS}
+    return dumped
+
+
+def copy_optimizer_state(state):
+    step = state["step"]
+    copied = {"step": step.copy() if isinstance(step, np.ndarray) else step}
+    for slot in ("m", "v"):
+        if slot in state:
+            copied[slot] = {k: v.copy() for k, v in state[slot].items()}
+    return copied
+
+
+def _optimizer_update(optimizer, params, grads, state, learning_rate):
+    state["step"] += 1
+    if optimizer == "sgd":
+        for key in PARAM_KEYS:
+            grads[key] *= learning_rate
+            params[key] -= grads[key]
+    elif optimizer == "momentum":
+        for key in PARAM_KEYS:
+            m = state["m"][key]
+            m *= MOMENTUM
+            m += grads[key]
+            params[key] -= learning_rate * m
+    else:
+        t = state["step"]
+        step_size = learning_rate * np.sqrt(1.0 - ADAM_BETA2**t) / (1.0 - ADAM_BETA1**t)
+        for key in PARAM_KEYS:
+            g = grads[key]
+            m, v = state["m"][key], state["v"][key]
+            m *= ADAM_BETA1
+            m += (1.0 - ADAM_BETA1) * g
+            v *= ADAM_BETA2
+            g *= g
+            v += (1.0 - ADAM_BETA2) * g
+            if np.ndim(step_size):
+                # Stacked per-target params (nn_mlp_multi): one bias correction per target on axis 0.
+                scale = step_size.astype(g.dtype).reshape((-1,) + (1,) * (g.ndim - 1))
+            else:
+                scale = float(step_size)
+            params[key] -= scale * m / (np.sqrt(v) + ADAM_EPS)
+
+
+def _train_epoch(params, opt_state, X, y, order, batch_size, bufs, optimizer, learning_rate):
+    total = 0.0
+    for start in range(0, len(order), batch_size):
+        batch_idx = order[start : start + batch_size]
+        m = len(batch_idx)
+        np.take(X, batch_idx, axis=0, out=bufs["xb"][:m])
+        np.take(y, batch_idx, axis=0, out=bufs["yb"][:m])
+        total += _minibatch_gradients(params, bufs, m) * m
+        _optimizer_update(optimizer, params, bufs["grads"], opt_state, learning_rate)
+    return total / len(order)
 
 
 def train_mlp_regressor(
@@ -53,39 +183,94 @@ def train_mlp_regressor(
     batch_size=64,
     seed=42,
     init=None,
+    patience=5,
+    min_delta=1e-4,
+    validation_fraction=0.1,
+    optimizer="sgd",
+    optimizer_state=None,
+    dtype=float,
 ):
-    x_mean = np.mean(X_train, axis=0)
-    x_std = np.std(X_train, axis=0)
+    dtype = np.dtype(dtype).type
+    # Scaling statistics stay float64 even when training runs in float32.
+    x_mean = np.mean(X_train, axis=0, dtype=float)
+    x_std = np.std(X_train, axis=0, dtype=float)
     x_std = np.where(x_std < 1e-8, 1.0, x_std)
-    Xs = (X_train - x_mean) / x_std
+    Xs = ((X_train - x_mean) / x_std).astype(dtype)
 
-    y_mean = float(np.mean(y_train))
-    y_std = float(np.std(y_train))
-    if y_std < 1e-8:
-        y_std = 1.0
-    ys = ((y_train - y_mean) / y_std).reshape(-1, 1)
+    # A 2-D y_train (rows x horizon steps) trains a direct multi-horizon head, one output per column.
+    y_train = np.asarray(y_train)
+    if y_train.ndim == 2:
+        output_dim = y_train.shape[1]
+        y_mean = np.mean(y_train, axis=0, dtype=float)
+        y_std = np.std(y_train, axis=0, dtype=float)
+        y_std = np.where(y_std < 1e-8, 1.0, y_std)
+        ys = ((y_train - y_mean) / y_std).astype(dtype)
+    else:
+        output_dim = 1
+        y_mean = float(np.mean(y_train, dtype=float))
+        y_std = float(np.std(y_train, dtype=float))
+        if y_std < 1e-8:
+            y_std = 1.0
+        ys = ((y_train - y_mean) / y_std).reshape(-1, 1).astype(dtype)
 
     input_dim = X_train.shape[1]
-    params = init if init is not None else init_params(input_dim, hidden_dim, seed=seed)
-    n = len(Xs)
-    losses = []
+    if init is None:
+        init = init_params(input_dim, hidden_dim, seed=seed, output_dim=output_dim)
+    params = {k: np.array(init[k], dtype=dtype) for k in PARAM_KEYS}
+    opt_state = load_optimizer_state(optimizer, optimizer_state, params)
 
+    # Early stopping watches the most recent slice of the window when it is big enough,
+    # otherwise the epoch's accumulated minibatch loss. With a validation slice, the slice only
+    # picks the epoch count: the model is then refit on every row for that many epochs, so the
+    # newest rows still shape the weights.
+    n_val = int(len(Xs) * validation_fraction) if patience > 0 else 0
+    if n_val < 10 or len(Xs) - n_val < 10:
+        n_val = 0
+    n = len(Xs) - n_val
+    X_fit, y_fit = Xs[:n], ys[:n]
+    X_val, y_val = Xs[n:], ys[n:]
+
+    batch_size = max(1, min(int(batch_size), n))
+    bufs = _alloc_buffers(batch_size, input_dim, params["w1"].shape[1], dtype=dtype, output_dim=output_dim)
+    order = np.arange(n)
+    rng = np.random.default_rng(seed)
+
+    best_loss = None
+    best_epoch = 0
+    bad_epochs = 0
+    train_loss = None
+    val_loss = None
+    epochs_run = 0
     for _ in range(max(1, epochs)):
-        idx = np.random.permutation(n)
-        X_ep = Xs[idx]
-        y_ep = ys[idx]
-        for start in range(0, n, max(1, batch_size)):
-            end = min(n, start + max(1, batch_size))
-            xb = X_ep[start:end]
-            yb = y_ep[start:end]
-            yhat, cache = forward(params, xb)
-            grads = _backward(params, cache, yhat, yb)
-            params["w1"] -= learning_rate * grads["dw1"]
-            params["b1"] -= learning_rate * grads["db1"]
-            params["w2"] -= learning_rate * grads["dw2"]
-            params["b2"] -= learning_rate * grads["db2"]
-        yhat_full, _ = forward(params, Xs)
-        losses.append(_mse_loss(yhat_full, ys))
+        rng.shuffle(order)
+        train_loss = _train_epoch(params, opt_state, X_fit, y_fit, order, batch_size, bufs, optimizer, learning_rate)
+        epochs_run += 1
+
+        if n_val:
+            yhat_val, _ = forward(params, X_val)
+            val_loss = _mse_loss(yhat_val, y_val)
+        monitored = val_loss if n_val else train_loss
+        if patience <= 0:
+            continue
+        if best_loss is None or monitored < best_loss - min_delta:
+            best_loss = monitored
+            best_epoch = epochs_run
+            bad_epochs = 0
+        else:
+            bad_epochs += 1
+            if bad_epochs >= patience:
+                break
+
+    refit_epochs = 0
+    if n_val and best_epoch:
+        params = {k: np.array(init[k], dtype=dtype) for k in PARAM_KEYS}
+        opt_state = load_optimizer_state(optimizer, optimizer_state, params)
+        order = np.arange(len(Xs))
+        rng = np.random.default_rng(seed)
+        for _ in range(best_epoch):
+            rng.shuffle(order)
+            train_loss = _train_epoch(params, opt_state, Xs, ys, order, batch_size, bufs, optimizer, learning_rate)
+        refit_epochs = best_epoch
 
     model = {
         "w1": params["w1"].tolist(),
@@ -94,33 +279,51 @@ def train_mlp_regressor(
         "b2": params["b2"].tolist(),
         "x_mean": x_mean.tolist(),
         "x_std": x_std.tolist(),
-        "y_mean": y_mean,
-        "y_std": y_std,
+        "y_mean": y_mean.tolist() if y_train.ndim == 2 else y_mean,
+        "y_std": y_std.tolist() if y_train.ndim == 2 else y_std,
         "hidden_dim": hidden_dim,
         "input_dim": input_dim,
-        "train_loss": losses[-1] if losses else None,
+        "train_loss": train_loss,
+        "val_loss": best_loss if n_val else None,
+        "epochs_run": epochs_run,
+        "refit_epochs": refit_epochs,
+        "stopped_early": epochs_run < max(1, epochs),
+        "optimizer": optimizer,
+        "optimizer_state": dump_optimizer_state(opt_state),
+        "precision": np.dtype(dtype).name,
     }
     return model
 
 
-def _predict_one(model, feature_row):
-    X = np.array([feature_row], dtype=float)
-    x_mean = np.array(model["x_mean"], dtype=float)
-    x_std = np.array(model["x_std"], dtype=float)
-    Xs = (X - x_mean) / x_std
-
-    params = {
-        "w1": np.array(model["w1"], dtype=float),
-        "b1": np.array(model["b1"], dtype=float),
-        "w2": np.array(model["w2"], dtype=float),
-        "b2": np.array(model["b2"], dtype=float),
-    }
+def _restore_params(model):
+    dtype = model_dtype(model)
+    params = {k: np.array(model[k], dtype=dtype) for k in PARAM_KEYS}
+    return params, np.array(model["x_mean"], dtype=dtype), np.array(model["x_std"], dtype=dtype)
+
+
+def _predict_scaled(model, X):
+    params, x_mean, x_std = _restore_params(model)
+    Xs = (np.asarray(X, dtype=x_mean.dtype) - x_mean) / x_std
     yhat_scaled, _ = forward(params, Xs)
-    return float(yhat_scaled[0, 0] * model["y_std"] + model["y_mean"])
+    if isinstance(model["y_mean"], list):
+        # Direct multi-horizon model: one column per step.
+        return yhat_scaled.astype(float) * np.array(model["y_std"]) + np.array(model["y_mean"])
+    return yhat_scaled[:, 0].astype(float) * model["y_std"] + model["y_mean"]
+
+
+def _predict_one(model, feature_row):
+    return float(_predict_scaled(model, [feature_row])[0])
 
 
 def predict_batch(model, X):
-    return np.array([_predict_one(model, row) for row in X], dtype=float)
+    if len(X) == 0:
+        return np.array([], dtype=float)
+    return _predict_scaled(model, X)
+
+
+def direct_predict(model, values, lags, horizon_steps):
+    feat = build_single_feature(values, lags)
+    return [float(v) for v in _predict_scaled(model, [feat])[0][:horizon_steps]]
 
 
 def recursive_predict(model, values, lags, horizon_steps):
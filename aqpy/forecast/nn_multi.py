@@ -0,0 +1,279 @@
+import numpy as np
+
+from aqpy.forecast.features import build_feature_matrix, build_single_feature
+from aqpy.forecast.nn_model import (
+    PARAM_KEYS,
+    _optimizer_update,
+    copy_optimizer_state,
+    dump_optimizer_state,
+    init_params,
+    load_optimizer_state,
+)
+from aqpy.forecast.precision import model_dtype
+
+
+# N independent lag MLPs, one per target column, stored as stacked weights
+# (w1: N x d x h, b1: N x h, w2: N x h x 1, b2: N x 1) and trained with batched matmuls.
+
+
+def build_multi_feature_matrix(values_by_target, lags, dtype=float):
+    pairs = [build_feature_matrix(values, lags, dtype=dtype) for values in values_by_target]
+    return np.stack([X for X, _ in pairs]), np.stack([y for _, y in pairs])
+
+
+def _alloc_multi_buffers(n_targets, m, input_dim, hidden_dim, dtype):
+    return {
+        "xb": np.empty((n_targets, m, input_dim), dtype=dtype),
+        "yb": np.empty((n_targets, m, 1), dtype=dtype),
+        "z1": np.empty((n_targets, m, hidden_dim), dtype=dtype),
+        "a1": np.empty((n_targets, m, hidden_dim), dtype=dtype),
+        "mask": np.empty((n_targets, m, hidden_dim), dtype=dtype),
+        "dy": np.empty((n_targets, m, 1), dtype=dtype),
+        "dz1": np.empty((n_targets, m, hidden_dim), dtype=dtype),
+    }
+
+
+def _multi_minibatch_gradients(params, bufs, grads, m):
+    xb, yb = bufs["xb"], bufs["yb"]
+    z1, a1, mask, dy, dz1 = bufs["z1"], bufs["a1"], bufs["mask"], bufs["dy"], bufs["dz1"]
+
+    np.matmul(xb, params["w1"], out=z1)
+    z1 += params["b1"][:, None, :]
+    np.maximum(z1, 0.0, out=a1)
+    np.matmul(a1, params["w2"], out=dy)
+    dy += params["b2"][:, None, :]
+    dy -= yb
+    losses = np.einsum("kmo,kmo->k", dy, dy).astype(float) / m
+    dy *= 2.0 / m
+
+    np.matmul(a1.transpose(0, 2, 1), dy, out=grads["w2"])
+    np.sum(dy, axis=1, out=grads["b2"])
+    np.matmul(dy, params["w2"].transpose(0, 2, 1), out=dz1)
+    np.greater(z1, 0.0, out=mask, casting="unsafe")
+    dz1 *= mask
+    np.matmul(xb.transpose(0, 2, 1), dz1, out=grads["w1"])
+    np.sum(dz1, axis=1, out=grads["b1"])
+    return losses
+
+
+def _forward_multi(params, Xs):
+    z1 = np.matmul(Xs, params["w1"]) + params["b1"][:, None, :]
+    a1 = np.maximum(z1, 0.0)
+    return np.matmul(a1, params["w2"]) + params["b2"][:, None, :]
+
+
+def _load_multi_optimizer_state(optimizer, saved, params, n_targets):
+    # Targets stop at different epochs, so each keeps its own step count for Adam's bias
+    # correction. Older artifacts saved one shared count, which every target resumes from.
+    state = load_optimizer_state(optimizer, saved, params)
+    step = np.asarray(state["step"], dtype=np.int64)
+    if step.shape != (n_targets,):
+        step = np.full(n_targets, int(step) if step.ndim == 0 else 0, dtype=np.int64)
+    state["step"] = step
+    return state
+
+
+def _copy_target(dst_params, dst_state, src_params, src_state, i):
+    for key in PARAM_KEYS:
+        dst_params[key][i] = src_params[key][i]
+    dst_state["step"][i] = src_state["step"][i]
+    for slot in ("m", "v"):
+        if slot in src_state:
+            for key in PARAM_KEYS:
+                dst_state[slot][key][i] = src_state[slot][key][i]
+
+
+def train_mlp_multi(
+    X_train,
+    y_train,
+    hidden_dim=8,
+    learning_rate=0.01,
+    epochs=40,
+    batch_size=64,
+    seed=42,
+    init=None,
+    patience=5,
+    min_delta=1e-4,
+    validation_fraction=0.1,
+    optimizer="sgd",
+    optimizer_state=None,
+    dtype=float,
+):
+    # Each target follows exactly the trajectory train_mlp_regressor would give it on its own
+    # columns (same init, shuffle order and stopping rule); only the arithmetic is batched.
+    dtype = np.dtype(dtype).type
+    X_train = np.asarray(X_train)
+    y_train = np.asarray(y_train)
+    n_targets, n_rows, input_dim = X_train.shape
+
+    x_mean = np.mean(X_train, axis=1, dtype=float)
+    x_std = np.std(X_train, axis=1, dtype=float)
+    x_std = np.where(x_std < 1e-8, 1.0, x_std)
+    Xs = ((X_train - x_mean[:, None, :]) / x_std[:, None, :]).astype(dtype)
+
+    y_mean = np.mean(y_train, axis=1, dtype=float)
+    y_std = np.std(y_train, axis=1, dtype=float)
+    y_std = np.where(y_std < 1e-8, 1.0, y_std)
+    ys = ((y_train - y_mean[:, None]) / y_std[:, None])[:, :, None].astype(dtype)
+
+    if init is None:
+        single = init_params(input_dim, hidden_dim, seed=seed)
+        init = {k: np.stack([single[k]] * n_targets) for k in PARAM_KEYS}
+    params = {k: np.array(init[k], dtype=dtype) for k in PARAM_KEYS}
+    hidden_dim = params["w1"].shape[2]
+    opt_state = _load_multi_optimizer_state(optimizer, optimizer_state, params, n_targets)
+
+    n_val = int(n_rows * validation_fraction) if patience > 0 else 0
+    if n_val < 10 or n_rows - n_val < 10:
+        n_val = 0
+    n = n_rows - n_val
+    X_fit, y_fit = np.ascontiguousarray(Xs[:, :n]), np.ascontiguousarray(ys[:, :n])
+    X_val, y_val = Xs[:, n:], ys[:, n:]
+
+    batch_size = max(1, min(int(batch_size), n))
+    bufs = {}
+    grads = {k: np.empty_like(params[k]) for k in PARAM_KEYS}
+    order = np.arange(n)
+    rng = np.random.default_rng(seed)
+
+    active = np.ones(n_targets, dtype=bool)
+    best_loss = np.full(n_targets, np.inf)
+    best_epoch = np.zeros(n_targets, dtype=int)
+    bad_epochs = np.zeros(n_targets, dtype=int)
+    epochs_run = np.zeros(n_targets, dtype=int)
+    train_loss = np.full(n_targets, np.nan)
+    result_params = {k: v.copy() for k, v in params.items()}
+    result_state = copy_optimizer_state(opt_state)
+
+    def train_epoch(X, y):
+        rng.shuffle(order)
+        total = np.zeros(n_targets)
+        for start in range(0, len(order), batch_size):
+            batch_idx = order[start : start + batch_size]
+            m = len(batch_idx)
+            if m not in bufs:
+                bufs[m] = _alloc_multi_buffers(n_targets, m, input_dim, hidden_dim, dtype)
+            np.take(X, batch_idx, axis=1, out=bufs[m]["xb"])
+            np.take(y, batch_idx, axis=1, out=bufs[m]["yb"])
+            total += _multi_minibatch_gradients(params, bufs[m], grads, m) * m
+            _optimizer_update(optimizer, params, grads, opt_state, learning_rate)
+        return total / len(order)
+
+    for _ in range(max(1, epochs)):
+        epoch_loss = train_epoch(X_fit, y_fit)
+        train_loss[active] = epoch_loss[active]
+        epochs_run[active] += 1
+
+        if patience <= 0:
+            continue
+        if n_val:
+            err = _forward_multi(params, X_val) - y_val
+            monitored = np.mean(err[:, :, 0].astype(float) ** 2, axis=1)
+        else:
+            monitored = epoch_loss
+        improved = active & (monitored < best_loss - min_delta)
+        for i in np.flatnonzero(improved):
+            best_loss[i] = monitored[i]
+            best_epoch[i] = epochs_run[i]
+            bad_epochs[i] = 0
+        stalled = active & ~improved
+        bad_epochs[stalled] += 1
+        for i in np.flatnonzero(stalled & (bad_epochs >= patience)):
+            active[i] = False
+            if not n_val:
+                _copy_target(result_params, result_state, params, opt_state, i)
+        if not active.any():
+            break
+
+    if not (n_val and patience > 0):
+        for i in np.flatnonzero(active):
+            _copy_target(result_params, result_state, params, opt_state, i)
+
+    # Refit every target on all rows for its best epoch count, as train_mlp_regressor does. The
+    # targets refit in lockstep and each is snapshotted once it reaches its own count.
+    if n_val and patience > 0:
+        params = {k: np.array(init[k], dtype=dtype) for k in PARAM_KEYS}
+        opt_state = _load_multi_optimizer_state(optimizer, optimizer_state, params, n_targets)
+        X_all, y_all = np.ascontiguousarray(Xs), np.ascontiguousarray(ys)
+        order = np.arange(n_rows)
+        rng = np.random.default_rng(seed)
+        for epoch in range(1, int(best_epoch.max()) + 1):
+            losses = train_epoch(X_all, y_all)
+            for i in np.flatnonzero(best_epoch == epoch):
+                train_loss[i] = losses[i]
+                _copy_target(result_params, result_state, params, opt_state, i)
+
+    return {
+        "w1": result_params["w1"].tolist(),
+        "b1": result_params["b1"].tolist(),
+        "w2": result_params["w2"].tolist(),
+        "b2": result_params["b2"].tolist(),
+        "x_mean": x_mean.tolist(),
+        "x_std": x_std.tolist(),
+        "y_mean": y_mean.tolist(),
+        "y_std": y_std.tolist(),
+        "hidden_dim": int(hidden_dim),
+        "input_dim": int(input_dim),
+        "n_targets": int(n_targets),
+        "train_loss": train_loss.tolist(),
+        "val_loss": best_loss.tolist() if n_val else None,
+        "epochs_run": epochs_run.tolist(),
+        "refit_epochs": (best_epoch if n_val and patience > 0 else np.zeros(n_targets, dtype=int)).tolist(),
+        "optimizer": optimizer,
+        "optimizer_state": dump_optimizer_state(result_state),
+        "precision": np.dtype(dtype).name,
+    }
+
+
+def _restore_multi(model):
+    dtype = model_dtype(model)
+    params = {k: np.array(model[k], dtype=dtype) for k in PARAM_KEYS}
+    x_mean = np.array(model["x_mean"], dtype=dtype)
+    x_std = np.array(model["x_std"], dtype=dtype)
+    y_mean = np.array(model["y_mean"], dtype=float)
+    y_std = np.array(model["y_std"], dtype=float)
+    return params, x_mean, x_std, y_mean, y_std
+
+
+def _predict_restored(restored, X):
+    params, x_mean, x_std, y_mean, y_std = restored
+    Xs = (np.asarray(X, dtype=x_mean.dtype) - x_mean[:, None, :]) / x_std[:, None, :]
+    yhat = _forward_multi(params, Xs)[:, :, 0].astype(float)
+    return yhat * y_std[:, None] + y_mean[:, None]
+
+
+def predict_batch(model, X):
+    X = np.asarray(X, dtype=float)
+    if X.shape[1] == 0:
+        return np.zeros((X.shape[0], 0), dtype=float)
+    return _predict_restored(_restore_multi(model), X)
+
+
+def recursive_predict(model, values_by_target, lags, horizon_steps):
+    restored = _restore_multi(model)
+    histories = [list(values) for values in values_by_target]
+    preds = [[] for _ in histories]
+    for _ in range(horizon_steps):
+        feats = np.stack([build_single_feature(history, lags) for history in histories])
+        step = _predict_restored(restored, feats[:, None, :])[:, 0]
+        for i, pred in enumerate(step):
+            histories[i].append(float(pred))
+            preds[i].append(float(pred))
+    return preds
+
+
+def member_model(model, index):
+    # Single-target nn_mlp view of one member; usable with nn_model.predict_batch.
+    member = {k: model[k][index] for k in PARAM_KEYS}
+    member.update(
+        {
+            "x_mean": model["x_mean"][index],
+            "x_std": model["x_std"][index],
+            "y_mean": model["y_mean"][index],
+            "y_std": model["y_std"][index],
+            "hidden_dim": model["hidden_dim"],
+            "input_dim": model["input_dim"],
+            "precision": model.get("precision", "float64"),
+        }
+    )
+    return member
@@ -1,7 +1,22 @@
 from psycopg2.extras import Json
 
+from aqpy.common.db import ensure_schema
+from aqpy.common.env import env_flag
+
+
+ONLINE_RELATIONS = [
+    "online_training_state",
+    "online_training_metrics",
+    "idx_online_training_metrics_model_time",
+    "retention_runs",
+]
+
 
 def ensure_online_tables(conn):
+    ensure_schema(conn, "online", ONLINE_RELATIONS, _create_online_tables)
+
+
+def _create_online_tables(conn):
     ddl = """
     CREATE TABLE IF NOT EXISTS online_training_state (
         model_name TEXT PRIMARY KEY,
@@ -89,6 +104,7 @@ def upsert_training_state(
     source_table,
     source_time_col,
     source_target_col,
+    commit=True,
 ):
     query = """
     INSERT INTO online_training_state (
@@ -127,10 +143,11 @@ def upsert_training_state(
                 source_target_col,
             ),
         )
-    conn.commit()
+    if commit:
+        conn.commit()
 
 
-def insert_training_metric(conn, metric_row):
+def insert_training_metric(conn, metric_row, commit=True):
     query = """
     INSERT INTO online_training_metrics (
         model_name,
@@ -161,17 +178,31 @@ def insert_training_metric(conn, metric_row):
     """
     with conn.cursor() as cur:
         cur.execute(query, metric_row)
-    conn.commit()
+    if commit:
+        conn.commit()
 
 
-def count_new_rows(conn, table, time_col, since_ts):
-    query = f"SELECT COUNT(*) FROM {table} WHERE {time_col} > %s"
+def count_new_rows(conn, table, time_col, since_ts, limit=None):
+    if limit is None:
+        query = f"SELECT COUNT(*) FROM {table} WHERE {time_col} > %s"
+        params = (since_ts,)
+    else:
+        # Bounded probe: stops after `limit` index entries instead of counting the whole range.
+        query = f"SELECT COUNT(*) FROM (SELECT 1 FROM {table} WHERE {time_col} > %s LIMIT %s) AS probe"
+        params = (since_ts, int(limit))
     with conn.cursor() as cur:
-        cur.execute(query, (since_ts,))
+        cur.execute(query, params)
         return int(cur.fetchone()[0])
 
 
-def insert_or_update_model_registry(conn, payload):
+def fetch_latest_ts(conn, table, time_col):
+    query = f"SELECT MAX({time_col}) FROM {table}"
+    with conn.cursor() as cur:
+        cur.execute(query)
+        return cur.fetchone()[0]
+
+
+def insert_or_update_model_registry(conn, payload, commit=True):
     query = """
     INSERT INTO model_registry (
         model_name,
@@ -202,6 +233,23 @@ def insert_or_update_model_registry(conn, payload):
                 payload["artifact_path"],
             ),
         )
+    if commit:
+        conn.commit()
+
+
+def write_training_outputs(conn, state, metric_rows, registry_payload, async_commit=None):
+    # State, metrics and registry row of one trained model commit together, so a crash never leaves
+    # a new version in one table but not the others. AQPY_TRAINING_ASYNC_COMMIT skips waiting for the
+    # WAL flush; a Postgres crash may then lose the last few runs whole, never part of one.
+    if async_commit is None:
+        async_commit = env_flag("AQPY_TRAINING_ASYNC_COMMIT")
+    if async_commit:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL synchronous_commit = off")
+    upsert_training_state(conn, **state, commit=False)
+    for row in metric_rows:
+        insert_training_metric(conn, row, commit=False)
+    insert_or_update_model_registry(conn, registry_payload, commit=False)
     conn.commit()
 
 
@@ -268,3 +316,166 @@ def insert_retention_run(
             ),
         )
     conn.commit()
+
+
+JOB_RUNS_DDL = """
+CREATE TABLE IF NOT EXISTS job_runs (
+    id BIGSERIAL PRIMARY KEY,
+    started_at TIMESTAMPTZ NOT NULL,
+    finished_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    job_name TEXT NOT NULL,
+    model_name TEXT,
+    model_type TEXT,
+    source_database TEXT,
+    source_table TEXT,
+    status TEXT NOT NULL,
+    total_seconds DOUBLE PRECISION NOT NULL,
+    stages JSONB NOT NULL,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_runs_job_time
+    ON job_runs (job_name, started_at DESC);
+"""
+
+
+BACKTEST_METRICS_DDL = """
+CREATE TABLE IF NOT EXISTS backtest_metrics (
+    id BIGSERIAL PRIMARY KEY,
+    run_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    model_name TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    model_type TEXT NOT NULL,
+    source_database TEXT NOT NULL,
+    source_table TEXT NOT NULL,
+    target TEXT NOT NULL,
+    horizon_step INTEGER NOT NULL,
+    n_origins INTEGER NOT NULL,
+    origin_start_ts TIMESTAMPTZ NOT NULL,
+    origin_end_ts TIMESTAMPTZ NOT NULL,
+    mae DOUBLE PRECISION NOT NULL,
+    rmse DOUBLE PRECISION NOT NULL,
+    baseline_mae DOUBLE PRECISION NOT NULL,
+    baseline_rmse DOUBLE PRECISION NOT NULL,
+    mae_improvement_pct DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_backtest_metrics_target_time
+    ON backtest_metrics (source_database, target, run_at DESC);
+"""
+
+
+def ensure_backtest_table(conn):
+    ensure_schema(
+        conn,
+        "backtest_metrics",
+        ["backtest_metrics", "idx_backtest_metrics_target_time"],
+        lambda c: _run_ddl(c, BACKTEST_METRICS_DDL),
+    )
+
+
+def _run_ddl(conn, ddl):
+    with conn.cursor() as cur:
+        cur.execute(ddl)
+    conn.commit()
+
+
+def insert_backtest_metrics(conn, rows):
+    query = """
+    INSERT INTO backtest_metrics (
+        model_name,
+        model_version,
+        model_type,
+        source_database,
+        source_table,
+        target,
+        horizon_step,
+        n_origins,
+        origin_start_ts,
+        origin_end_ts,
+        mae,
+        rmse,
+        baseline_mae,
+        baseline_rmse,
+        mae_improvement_pct
+    )
+    VALUES (%(model_name)s, %(model_version)s, %(model_type)s, %(source_database)s,
+            %(source_table)s, %(target)s, %(horizon_step)s, %(n_origins)s, %(origin_start_ts)s,
+            %(origin_end_ts)s, %(mae)s, %(rmse)s, %(baseline_mae)s, %(baseline_rmse)s,
+            %(mae_improvement_pct)s)
+    """
+    with conn.cursor() as cur:
+        cur.executemany(query, rows)
+    conn.commit()
+
+
+def ensure_job_runs_table(conn):
+    ensure_schema(
+        conn, "job_runs", ["job_runs", "idx_job_runs_job_time"], lambda c: _run_ddl(c, JOB_RUNS_DDL)
+    )
+
+
+def insert_job_run(conn, row):
+    query = """
+    INSERT INTO job_runs (
+        started_at,
+        job_name,
+        model_name,
+        model_type,
+        source_database,
+        source_table,
+        status,
+        total_seconds,
+        stages,
+        error
+    )
+    VALUES (%(started_at)s, %(job_name)s, %(model_name)s, %(model_type)s,
+            %(source_database)s, %(source_table)s, %(status)s, %(total_seconds)s,
+            %(stages)s, %(error)s)
+    """
+    params = dict(row)
+    params["stages"] = Json(row["stages"])
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+    conn.commit()
+
+
+def fetch_recent_improvements(conn, model_names, n_recent=6):
+    # Mean mae_improvement_pct over each model's last n_recent metric rows, per target.
+    query = """
+    SELECT model_name, source_target_col, AVG(mae_improvement_pct), COUNT(*)
+    FROM (
+        SELECT
+            model_name,
+            source_target_col,
+            mae_improvement_pct,
+            row_number() OVER (
+                PARTITION BY model_name, source_target_col
+                ORDER BY recorded_at DESC
+            ) AS rn
+        FROM online_training_metrics
+        WHERE model_name = ANY(%s)
+    ) recent
+    WHERE rn <= %s
+    GROUP BY model_name, source_target_col
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, (list(model_names), int(n_recent)))
+        rows = cur.fetchall()
+    return {(r[0], r[1]): float(r[2]) for r in rows}
+
+
+def fetch_last_job_runs(conn, job_name, model_names, since_ts):
+    query = """
+    SELECT model_name, MAX(started_at)
+    FROM job_runs
+    WHERE job_name = %s
+      AND started_at >= %s
+      AND status = 'ok'
+      AND model_name = ANY(%s)
+    GROUP BY model_name
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, (job_name, since_ts, list(model_names)))
+        rows = cur.fetchall()
+    return {r[0]: r[1] for r in rows}
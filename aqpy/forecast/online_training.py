@@ -9,29 +9,45 @@ from aqpy.forecast.adaptive_ar import (
     fit_recursive_least_squares,
     predict_batch as ar_predict_batch,
 )
+from aqpy.forecast.artifacts import write_artifact
+from aqpy.forecast.coordination import (
+    FORECAST_ACTIVE_REASON,
+    MODEL_LOCKED_REASON,
+    forecast_active,
+    try_model_lock,
+)
+from aqpy.forecast.dataset import (
+    TrainingDataset,
+    load_multi_training_dataset,
+    load_training_dataset,
+    split_index,
+)
 from aqpy.forecast.features import (
     build_ar_single_feature,
-    build_ar_feature_matrix,
     build_single_feature,
-    build_feature_matrix,
     estimate_cadence_seconds,
 )
 from aqpy.forecast.model import mae, rmse, split_train_val
-from aqpy.forecast.nn_model import predict_batch, train_mlp_regressor
+from aqpy.forecast.nn_model import PARAM_KEYS, predict_batch, train_mlp_regressor
+from aqpy.forecast.nn_multi import (
+    build_multi_feature_matrix,
+    predict_batch as multi_predict_batch,
+    train_mlp_multi,
+)
+from aqpy.forecast.precision import PRECISIONS, resolve_precision
 from aqpy.forecast.rnn_lite import (
-    build_sequence_dataset,
     fit_gru_lite_head,
     predict_batch as rnn_predict_batch,
 )
 from aqpy.forecast.online_repository import (
     count_new_rows,
     ensure_online_tables,
+    fetch_latest_ts,
     get_training_state,
-    insert_or_update_model_registry,
-    insert_training_metric,
-    upsert_training_state,
+    write_training_outputs,
 )
-from aqpy.forecast.repository import ensure_registry_table, fetch_series, validate_identifier
+from aqpy.forecast.repository import ensure_registry_table, validate_identifier
+from aqpy.forecast.timing import StageTimer
 
 
 def _timestamp_version():
@@ -44,16 +60,9 @@ def _timestamp_version():
     )
 
 
-def _baseline_from_features(X, lags):
-    try:
-        idx = lags.index(1)
-    except ValueError:
-        idx = 0
-    return X[:, idx]
-
-
-def _baseline_from_sequences(X_seq):
-    return X_seq[:, -1]
+def _baseline_lag(lags):
+    # Persistence baseline uses lag 1, or the shortest configured lag when 1 is absent.
+    return 1 if 1 in lags else lags[0]
 
 
 def _improvement_pct(baseline_metric, model_metric):
@@ -62,6 +71,196 @@ def _improvement_pct(baseline_metric, model_metric):
     return float((baseline_metric - model_metric) / baseline_metric * 100.0)
 
 
+def probe_new_rows(conn, database, table, time_col, since_ts, min_new_rows, source_cache=None):
+    # Specs on the same source share one MAX(t) watermark and, when their last_seen_ts
+    # matches, one bounded probe. The result is exact up to min_new_rows.
+    cache = source_cache if source_cache is not None else {}
+    watermark_key = ("latest", database, table, time_col)
+    if watermark_key not in cache:
+        cache[watermark_key] = fetch_latest_ts(conn, table, time_col)
+    latest_ts = cache[watermark_key]
+    if latest_ts is None or latest_ts <= since_ts:
+        return 0
+    probe_key = ("probe", database, table, time_col, since_ts, int(min_new_rows))
+    if probe_key not in cache:
+        cache[probe_key] = count_new_rows(
+            conn, table, time_col, since_ts, limit=max(1, int(min_new_rows))
+        )
+    return cache[probe_key]
+
+
+def _skip(reason, new_rows=None):
+    result = {"status": "skipped", "reason": reason}
+    if new_rows is not None:
+        result["new_rows"] = new_rows
+    return result
+
+
+def _begin_training(
+    conn, timer, model_name, database, table, time_col, min_new_rows, source_cache, defer_to_forecast
+):
+    # Shared start of every training step: model lock, state and the new-rows gate, then the check for
+    # a running forecast batch. Returns (state, new_rows, skip); a skip result ends the step.
+    # The model lock goes away with the step's connection.
+    with timer.stage("lock"):
+        locked = try_model_lock(conn, model_name)
+    if not locked:
+        return None, None, _skip(MODEL_LOCKED_REASON)
+    with timer.stage("state_check"):
+        ensure_online_tables(conn)
+        ensure_registry_table(conn)
+        state = get_training_state(conn, model_name)
+
+        if state is not None:
+            new_rows = probe_new_rows(
+                conn,
+                database,
+                table,
+                time_col,
+                state["last_seen_ts"],
+                min_new_rows,
+                source_cache=source_cache,
+            )
+        else:
+            new_rows = -1
+    if state is not None and new_rows < min_new_rows:
+        return state, new_rows, _skip(f"only {new_rows} new rows (min {min_new_rows})", new_rows)
+    # A step never waits for a forecast batch (it would hold the model lock meanwhile); the training
+    # batch defers it and retries once at the end.
+    if defer_to_forecast:
+        with timer.stage("yield"):
+            active = forecast_active(conn)
+        if active:
+            return state, new_rows, _skip(FORECAST_ACTIVE_REASON, new_rows)
+    return state, new_rows, None
+
+
+def _row_count_skip(n_values, burn_in_rows, lags, new_rows):
+    if n_values < burn_in_rows:
+        return _skip(f"burn-in not reached ({n_values} < {burn_in_rows})", new_rows)
+    if n_values <= max(lags) + 5:
+        return _skip(f"not enough rows ({n_values})", new_rows)
+    return None
+
+
+def _load_prior(model_file):
+    if not model_file.exists():
+        return None
+    return json.loads(model_file.read_text())
+
+
+def _prior_matches(prior, **expected):
+    return prior is not None and all(prior.get(key) == value for key, value in expected.items())
+
+
+def _mlp_warm_start(prior, optimizer):
+    # Prior weights, plus its optimizer moments when the optimizer is unchanged.
+    init = {k: np.array(prior[k], dtype=float) for k in PARAM_KEYS}
+    optimizer_state = prior.get("optimizer_state") if prior.get("optimizer") == optimizer else None
+    return init, optimizer_state
+
+
+def _holdout_metrics(y_holdout, holdout_pred, baseline, train_rows, holdout_rows, train_loss):
+    holdout_mae = mae(y_holdout, holdout_pred)
+    holdout_rmse = rmse(y_holdout, holdout_pred)
+    return {
+        "holdout_mae": holdout_mae,
+        "holdout_rmse": holdout_rmse,
+        "baseline_mae": baseline["baseline_mae"],
+        "baseline_rmse": baseline["baseline_rmse"],
+        "mae_improvement_pct": _improvement_pct(baseline["baseline_mae"], holdout_mae),
+        "rmse_improvement_pct": _improvement_pct(baseline["baseline_rmse"], holdout_rmse),
+        "train_rows": int(train_rows),
+        "holdout_rows": int(holdout_rows),
+        "train_loss": train_loss,
+    }
+
+
+def _build_artifact(model_type, model_name, source, lags, cadence_seconds, metrics, training_params, payload, **extra):
+    # source: database, table, time_col and target (comma-joined for multi-target models).
+    return {
+        "model_type": model_type,
+        "model_name": model_name,
+        "model_version": _timestamp_version(),
+        "trained_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        **source,
+        **extra,
+        "lags": lags,
+        "cadence_seconds": cadence_seconds,
+        "metrics": metrics,
+        "online_training": training_params,
+        **payload,
+    }
+
+
+def _persist_training(conn, timer, model_file, artifact, state, timestamps, target_metrics):
+    # Writes the versioned artifact, then state, one metrics row per entry of target_metrics and the
+    # registry row in one transaction. Returns the rows new since the previous run.
+    model_name = artifact["model_name"]
+    model_version = artifact["model_version"]
+    params = artifact["online_training"]
+    with timer.stage("write_artifact"):
+        artifact_file = write_artifact(model_file, artifact, version=model_version)
+    artifact_path = str(artifact_file.resolve())
+
+    last_seen_ts = timestamps[-1]
+    update_from = state["last_seen_ts"] if state is not None else None
+    if state is not None:
+        effective_new_rows = sum(1 for ts in timestamps if ts > state["last_seen_ts"])
+    else:
+        effective_new_rows = len(timestamps)
+
+    with timer.stage("write_db", rows=len(target_metrics) + 2):
+        write_training_outputs(
+            conn,
+            state={
+                "model_name": model_name,
+                "model_version": model_version,
+                "artifact_path": artifact_path,
+                "last_seen_ts": last_seen_ts,
+                "source_database": artifact["database"],
+                "source_table": artifact["table"],
+                "source_time_col": artifact["time_col"],
+                "source_target_col": artifact["target"],
+            },
+            metric_rows=[
+                {
+                    "model_name": model_name,
+                    "model_version": model_version,
+                    "source_database": artifact["database"],
+                    "source_table": artifact["table"],
+                    "source_target_col": target,
+                    "train_rows": metrics["train_rows"],
+                    "holdout_rows": metrics["holdout_rows"],
+                    "holdout_mae": metrics["holdout_mae"],
+                    "holdout_rmse": metrics["holdout_rmse"],
+                    "baseline_mae": metrics["baseline_mae"],
+                    "baseline_rmse": metrics["baseline_rmse"],
+                    "mae_improvement_pct": metrics["mae_improvement_pct"],
+                    "rmse_improvement_pct": metrics["rmse_improvement_pct"],
+                    "learning_rate": params["learning_rate"],
+                    "batch_size": int(params["batch_size"]),
+                    "epochs": int(params["epochs"]),
+                    "new_rows_since_last": int(effective_new_rows),
+                    "update_from_ts": update_from,
+                    "update_to_ts": last_seen_ts,
+                }
+                for target, metrics in target_metrics.items()
+            ],
+            registry_payload={
+                "model_name": model_name,
+                "model_version": model_version,
+                "trained_at": artifact["trained_at"],
+                "database": artifact["database"],
+                "table": artifact["table"],
+                "target": artifact["target"],
+                "metrics": artifact["metrics"],
+                "artifact_path": artifact_path,
+            },
+        )
+    return effective_new_rows
+
+
 def run_online_training_step(
     database,
     table,
@@ -85,278 +284,367 @@ def run_online_training_step(
     max_train_rows=None,
     rnn_ridge=1e-3,
     random_seed=42,
+    early_stopping_patience=5,
+    validation_fraction=0.1,
+    optimizer="sgd",
+    precision=None,
+    direct_horizon_steps=0,
+    encoder_epochs=0,
+    encoder_learning_rate=0.005,
+    bptt_steps=12,
+    encoder_seconds=None,
+    defer_to_forecast=True,
+    source_cache=None,
 ):
+    if direct_horizon_steps and model_type not in {"nn_mlp", "adaptive_ar"}:
+        raise ValueError(f"direct_horizon_steps is not supported for model_type '{model_type}'.")
     table = validate_identifier(table)
+    precision = resolve_precision(precision)
+    dtype = PRECISIONS[precision]
     time_col = validate_identifier(time_col)
     target = validate_identifier(target)
     lags = sorted(set(lags or [1, 2, 3, 6, 12]))
 
     conn = connect_db(database)
+    timer = StageTimer(
+        "online_training",
+        model_name=model_name,
+        model_type=model_type,
+        source_database=database,
+        source_table=table,
+    )
     try:
-        ensure_online_tables(conn)
-        ensure_registry_table(conn)
-        state = get_training_state(conn, model_name)
-
-        if state is not None:
-            new_rows = count_new_rows(conn, table, time_col, state["last_seen_ts"])
-            if new_rows < min_new_rows:
-                return {
-                    "status": "skipped",
-                    "reason": f"only {new_rows} new rows (min {min_new_rows})",
-                    "new_rows": new_rows,
-                }
-        else:
-            new_rows = -1
+        state, new_rows, skip = _begin_training(
+            conn, timer, model_name, database, table, time_col, min_new_rows, source_cache, defer_to_forecast
+        )
+        if skip is not None:
+            return timer.finish(conn, skip)
 
-        timestamps, values = fetch_series(conn, table, time_col, target, history_hours)
-        if max_train_rows is not None and max_train_rows > 0 and len(values) > max_train_rows:
-            timestamps = timestamps[-max_train_rows:]
-            values = values[-max_train_rows:]
-        if len(values) < burn_in_rows:
-            return {
-                "status": "skipped",
-                "reason": f"burn-in not reached ({len(values)} < {burn_in_rows})",
-                "new_rows": new_rows,
-            }
-
-        if len(values) <= max(lags) + 5:
-            return {
-                "status": "skipped",
-                "reason": f"not enough rows ({len(values)})",
-                "new_rows": new_rows,
-            }
+        with timer.stage("fetch"):
+            dataset, fetched = load_training_dataset(
+                conn, database, table, time_col, target, history_hours, source_cache=source_cache
+            )
+        timer.set_rows("fetch", len(dataset) if fetched else 0)
+        dataset = dataset.window(max_train_rows)
+        timestamps, values = dataset.timestamps, dataset.values
+        skip = _row_count_skip(len(values), burn_in_rows, lags, new_rows)
+        if skip is not None:
+            return timer.finish(conn, skip)
 
-        if model_type == "adaptive_ar":
-            X, y = build_ar_feature_matrix(values, lags)
-        elif model_type == "rnn_lite_gru":
-            X_seq, y = build_sequence_dataset(np.array(values, dtype=float), seq_len=seq_len)
-        else:
-            X, y = build_feature_matrix(values, lags)
+        with timer.stage("features"):
+            if model_type == "adaptive_ar":
+                X, y = dataset.ar_feature_matrix(lags)
+            elif model_type == "rnn_lite_gru":
+                X_seq, y = dataset.sequence_dataset(seq_len)
+            else:
+                X, y = dataset.feature_matrix(lags, dtype=dtype)
+            if direct_horizon_steps:
+                y = dataset.horizon_targets(max(lags), direct_horizon_steps, dtype=X.dtype)
+                X = X[: len(y)]
+        timer.set_rows("features", len(y))
         if model_type == "rnn_lite_gru":
-            split_idx = max(1, int(len(X_seq) * (1.0 - holdout_ratio)))
-            if split_idx >= len(X_seq):
-                split_idx = len(X_seq) - 1
-            X_train_seq = X_seq[:split_idx]
+            split_idx = split_index(len(X_seq), holdout_ratio)
             X_holdout_seq = X_seq[split_idx:]
             y_train = y[:split_idx]
             y_holdout = y[split_idx:]
-            if len(X_holdout_seq) < 5:
-                return {
-                    "status": "skipped",
-                    "reason": "holdout set too small",
-                    "new_rows": new_rows,
-                }
-            train_rows = len(X_train_seq)
-            holdout_rows = len(X_holdout_seq)
         else:
             X_train, X_holdout, y_train, y_holdout = split_train_val(X, y, train_ratio=1.0 - holdout_ratio)
-            if len(X_holdout) < 5:
-                return {
-                    "status": "skipped",
-                    "reason": "holdout set too small",
-                    "new_rows": new_rows,
-                }
-            train_rows = len(X_train)
-            holdout_rows = len(X_holdout)
+        train_rows = len(y_train)
+        holdout_rows = len(y_holdout)
+        if holdout_rows < 5:
+            return timer.finish(conn, _skip("holdout set too small", new_rows))
 
-        init = None
         model_file = pathlib.Path(model_path)
-        if model_file.exists():
-            prior = json.loads(model_file.read_text())
-            if model_type == "nn_mlp":
-                if (
-                    prior.get("model_type") == "nn_mlp"
-                    and prior.get("hidden_dim") == hidden_dim
-                    and prior.get("input_dim") == X_train.shape[1]
-                ):
-                    init = {
-                        "w1": np.array(prior["w1"], dtype=float),
-                        "b1": np.array(prior["b1"], dtype=float),
-                        "w2": np.array(prior["w2"], dtype=float),
-                        "b2": np.array(prior["b2"], dtype=float),
-                    }
-            elif model_type == "adaptive_ar" and prior.get("model_type") == "adaptive_ar":
-                if len(prior.get("theta", [])) == X_train.shape[1]:
+        prior = _load_prior(model_file)
+        if model_type == "adaptive_ar":
+            init = None
+            if _prior_matches(prior, model_type="adaptive_ar"):
+                if np.shape(prior.get("theta", [])) == X_train.shape[1:2] + y_train.shape[1:]:
                     init = {
                         "theta": np.array(prior["theta"], dtype=float),
                         "P": np.array(prior["P"], dtype=float),
                     }
-
-        if model_type == "adaptive_ar":
-            ar_model = fit_recursive_least_squares(
-                X_train=X_train,
-                y_train=y_train,
-                forgetting_factor=forgetting_factor,
-                delta=ar_delta,
-                init=init,
-            )
-            holdout_pred = ar_predict_batch(ar_model, X_holdout)
-            train_loss = float(np.mean((ar_predict_batch(ar_model, X_train) - y_train) ** 2))
-            baseline_pred = _baseline_from_features(X_holdout, lags)
+            with timer.stage("fit", rows=train_rows):
+                ar_model = fit_recursive_least_squares(
+                    X_train=X_train,
+                    y_train=y_train,
+                    forgetting_factor=forgetting_factor,
+                    delta=ar_delta,
+                    init=init,
+                )
+            with timer.stage("predict", rows=holdout_rows):
+                holdout_pred = ar_predict_batch(ar_model, X_holdout)
+                train_loss = float(np.mean((ar_predict_batch(ar_model, X_train) - y_train) ** 2))
             model_payload = ar_model
         elif model_type == "rnn_lite_gru":
             encoder_init = None
-            if model_file.exists():
-                prior = json.loads(model_file.read_text())
-                if (
-                    prior.get("model_type") == "rnn_lite_gru"
-                    and int(prior.get("seq_len", -1)) == int(seq_len)
-                    and int(prior.get("hidden_dim", -1)) == int(hidden_dim)
-                ):
-                    encoder_init = {
-                        "hidden_dim": int(prior["encoder"]["hidden_dim"]),
-                        "Wz": np.array(prior["encoder"]["Wz"], dtype=float),
-                        "Uz": np.array(prior["encoder"]["Uz"], dtype=float),
-                        "bz": np.array(prior["encoder"]["bz"], dtype=float),
-                        "Wr": np.array(prior["encoder"]["Wr"], dtype=float),
-                        "Ur": np.array(prior["encoder"]["Ur"], dtype=float),
-                        "br": np.array(prior["encoder"]["br"], dtype=float),
-                        "Wh": np.array(prior["encoder"]["Wh"], dtype=float),
-                        "Uh": np.array(prior["encoder"]["Uh"], dtype=float),
-                        "bh": np.array(prior["encoder"]["bh"], dtype=float),
-                    }
-            rnn_model = fit_gru_lite_head(
-                values=np.array(values, dtype=float),
-                seq_len=seq_len,
-                hidden_dim=hidden_dim,
-                ridge=rnn_ridge,
-                seed=random_seed,
-                init=encoder_init,
-            )
-            holdout_pred = rnn_predict_batch(rnn_model, X_holdout_seq)
+            if _prior_matches(prior, model_type="rnn_lite_gru", seq_len=int(seq_len), hidden_dim=int(hidden_dim)):
+                encoder_init = prior["encoder"]
+            with timer.stage("fit", rows=train_rows):
+                # Only the rows behind the training windows: the encoder update and ridge head must not
+                # see the holdout that holdout_mae (and champion ranking) is measured on.
+                rnn_model = fit_gru_lite_head(
+                    values=np.array(values[: split_idx + seq_len], dtype=float),
+                    seq_len=seq_len,
+                    hidden_dim=hidden_dim,
+                    ridge=rnn_ridge,
+                    seed=random_seed,
+                    init=encoder_init,
+                    dtype=dtype,
+                    encoder_epochs=encoder_epochs,
+                    encoder_learning_rate=encoder_learning_rate,
+                    encoder_batch_size=batch_size,
+                    bptt_steps=bptt_steps,
+                    encoder_seconds=encoder_seconds,
+                )
+            with timer.stage("predict", rows=holdout_rows):
+                holdout_pred = rnn_predict_batch(rnn_model, X_holdout_seq)
             train_loss = float(rnn_model.get("train_loss"))
-            baseline_pred = _baseline_from_sequences(X_holdout_seq)
             model_payload = rnn_model
         else:
-            nn_model = train_mlp_regressor(
-                X_train=X_train,
-                y_train=y_train,
-                hidden_dim=hidden_dim,
-                learning_rate=learning_rate,
-                epochs=epochs,
-                batch_size=batch_size,
-                init=init,
-            )
-            holdout_pred = predict_batch(nn_model, X_holdout)
+            init, optimizer_state = None, None
+            if (
+                _prior_matches(prior, model_type="nn_mlp", hidden_dim=hidden_dim, input_dim=X_train.shape[1])
+                and len(prior["b2"]) == (direct_horizon_steps or 1)
+            ):
+                init, optimizer_state = _mlp_warm_start(prior, optimizer)
+            with timer.stage("fit", rows=train_rows):
+                nn_model = train_mlp_regressor(
+                    X_train=X_train,
+                    y_train=y_train,
+                    hidden_dim=hidden_dim,
+                    learning_rate=learning_rate,
+                    epochs=epochs,
+                    batch_size=batch_size,
+                    init=init,
+                    patience=early_stopping_patience,
+                    validation_fraction=validation_fraction,
+                    optimizer=optimizer,
+                    optimizer_state=optimizer_state,
+                    dtype=dtype,
+                )
+            with timer.stage("predict", rows=holdout_rows):
+                holdout_pred = predict_batch(nn_model, X_holdout)
             train_loss = nn_model.get("train_loss")
-            baseline_pred = _baseline_from_features(X_holdout, lags)
             model_payload = nn_model
+        if model_type == "rnn_lite_gru":
+            baseline = dataset.baseline_metrics(seq_len, holdout_ratio)
+        elif direct_horizon_steps:
+            baseline = dataset.horizon_baseline_metrics(
+                max(lags), direct_horizon_steps, holdout_ratio, lag=_baseline_lag(lags)
+            )
+        else:
+            baseline = dataset.baseline_metrics(max(lags), holdout_ratio, lag=_baseline_lag(lags))
 
-        holdout_mae = mae(y_holdout, holdout_pred)
-        holdout_rmse = rmse(y_holdout, holdout_pred)
-        baseline_mae = mae(y_holdout, baseline_pred)
-        baseline_rmse = rmse(y_holdout, baseline_pred)
-        mae_improvement_pct = _improvement_pct(baseline_mae, holdout_mae)
-        rmse_improvement_pct = _improvement_pct(baseline_rmse, holdout_rmse)
-
-        trained_at = dt.datetime.now(dt.timezone.utc).isoformat()
-        model_version = _timestamp_version()
-        artifact = {
-            "model_type": model_type,
-            "model_name": model_name,
-            "model_version": model_version,
-            "trained_at": trained_at,
-            "database": database,
-            "table": table,
-            "time_col": time_col,
-            "target": target,
-            "lags": lags,
-            "cadence_seconds": estimate_cadence_seconds(timestamps),
-            "metrics": {
-                "holdout_mae": holdout_mae,
-                "holdout_rmse": holdout_rmse,
-                "baseline_mae": baseline_mae,
-                "baseline_rmse": baseline_rmse,
-                "mae_improvement_pct": mae_improvement_pct,
-                "rmse_improvement_pct": rmse_improvement_pct,
-                "train_rows": int(train_rows),
-                "holdout_rows": int(holdout_rows),
-                "train_loss": train_loss,
-            },
-            "online_training": {
+        metrics = _holdout_metrics(y_holdout, holdout_pred, baseline, train_rows, holdout_rows, train_loss)
+        if direct_horizon_steps:
+            # Headline metrics average every horizon step; these break them down per step.
+            metrics["horizon_mae"] = np.mean(np.abs(y_holdout - holdout_pred), axis=0).tolist()
+            metrics["baseline_horizon_mae"] = baseline["baseline_horizon_mae"]
+
+        artifact = _build_artifact(
+            model_type,
+            model_name,
+            {"database": database, "table": table, "time_col": time_col, "target": target},
+            lags,
+            dataset.cadence_seconds,
+            metrics,
+            {
                 "learning_rate": learning_rate,
                 "batch_size": batch_size,
                 "epochs": epochs,
+                "early_stopping_patience": early_stopping_patience,
+                "validation_fraction": validation_fraction,
+                "optimizer": optimizer,
+                "precision": precision,
                 "forgetting_factor": forgetting_factor,
                 "ar_delta": ar_delta,
                 "seq_len": seq_len,
                 "burn_in_rows": burn_in_rows,
                 "max_train_rows": max_train_rows,
                 "rnn_ridge": rnn_ridge,
+                "encoder_epochs": encoder_epochs,
+                "encoder_learning_rate": encoder_learning_rate,
+                "bptt_steps": bptt_steps,
                 "random_seed": random_seed,
                 "min_new_rows": min_new_rows,
                 "history_hours": history_hours,
             },
-            **model_payload,
-        }
-
-        model_file.parent.mkdir(parents=True, exist_ok=True)
-        model_file.write_text(json.dumps(artifact, indent=2))
-
-        last_seen_ts = timestamps[-1]
-        update_from = state["last_seen_ts"] if state is not None else None
-        effective_new_rows = max(0, new_rows) if state is not None else len(values)
-
-        upsert_training_state(
-            conn=conn,
-            model_name=model_name,
-            model_version=model_version,
-            artifact_path=str(model_file.resolve()),
-            last_seen_ts=last_seen_ts,
-            source_database=database,
-            source_table=table,
-            source_time_col=time_col,
-            source_target_col=target,
+            model_payload,
+            direct_horizon_steps=int(direct_horizon_steps or 0),
         )
-        insert_training_metric(
+        effective_new_rows = _persist_training(conn, timer, model_file, artifact, state, timestamps, {target: metrics})
+
+        return timer.finish(
             conn,
             {
-                "model_name": model_name,
-                "model_version": model_version,
-                "source_database": database,
-                "source_table": table,
-                "source_target_col": target,
-                "train_rows": int(train_rows),
-                "holdout_rows": int(holdout_rows),
-                "holdout_mae": holdout_mae,
-                "holdout_rmse": holdout_rmse,
-                "baseline_mae": baseline_mae,
-                "baseline_rmse": baseline_rmse,
-                "mae_improvement_pct": mae_improvement_pct,
-                "rmse_improvement_pct": rmse_improvement_pct,
+                "status": "trained",
+                "model_version": artifact["model_version"],
+                "artifact_path": str(model_file),
+                "holdout_mae": metrics["holdout_mae"],
+                "holdout_rmse": metrics["holdout_rmse"],
+                "baseline_mae": metrics["baseline_mae"],
+                "baseline_rmse": metrics["baseline_rmse"],
+                "mae_improvement_pct": metrics["mae_improvement_pct"],
+                "rmse_improvement_pct": metrics["rmse_improvement_pct"],
+                "new_rows": int(effective_new_rows),
+            },
+        )
+    except Exception as exc:
+        timer.fail(conn, exc)
+        raise
+    finally:
+        conn.close()
+
+
+def run_multi_training_step(
+    database,
+    table,
+    time_col,
+    targets,
+    model_name,
+    model_path,
+    history_hours=24 * 14,
+    lags=None,
+    holdout_ratio=0.2,
+    min_new_rows=30,
+    learning_rate=0.01,
+    epochs=40,
+    batch_size=64,
+    hidden_dim=8,
+    burn_in_rows=200,
+    max_train_rows=None,
+    random_seed=42,
+    early_stopping_patience=5,
+    validation_fraction=0.1,
+    optimizer="sgd",
+    precision=None,
+    defer_to_forecast=True,
+    source_cache=None,
+):
+    # One nn_mlp_multi artifact holding an independent lag MLP per target column.
+    model_type = "nn_mlp_multi"
+    table = validate_identifier(table)
+    precision = resolve_precision(precision)
+    dtype = PRECISIONS[precision]
+    time_col = validate_identifier(time_col)
+    targets = [validate_identifier(t) for t in targets]
+    lags = sorted(set(lags or [1, 2, 3, 6, 12]))
+
+    conn = connect_db(database)
+    timer = StageTimer(
+        "online_training",
+        model_name=model_name,
+        model_type=model_type,
+        source_database=database,
+        source_table=table,
+    )
+    try:
+        state, new_rows, skip = _begin_training(
+            conn, timer, model_name, database, table, time_col, min_new_rows, source_cache, defer_to_forecast
+        )
+        if skip is not None:
+            return timer.finish(conn, skip)
+
+        with timer.stage("fetch"):
+            timestamps, values, rows_fetched = load_multi_training_dataset(
+                conn, database, table, time_col, targets, history_hours, source_cache=source_cache
+            )
+        timer.set_rows("fetch", rows_fetched)
+        if max_train_rows and len(timestamps) > max_train_rows:
+            timestamps = timestamps[-max_train_rows:]
+            values = values[:, -max_train_rows:]
+        skip = _row_count_skip(len(timestamps), burn_in_rows, lags, new_rows)
+        if skip is not None:
+            return timer.finish(conn, skip)
+
+        with timer.stage("features"):
+            X, y = build_multi_feature_matrix(values, lags, dtype=dtype)
+        timer.set_rows("features", y.shape[1])
+        split_idx = split_index(y.shape[1], holdout_ratio)
+        X_train, X_holdout = X[:, :split_idx], X[:, split_idx:]
+        y_train, y_holdout = y[:, :split_idx], y[:, split_idx:]
+        train_rows = y_train.shape[1]
+        holdout_rows = y_holdout.shape[1]
+        if holdout_rows < 5:
+            return timer.finish(conn, _skip("holdout set too small", new_rows))
+
+        model_file = pathlib.Path(model_path)
+        prior = _load_prior(model_file)
+        init, optimizer_state = None, None
+        if _prior_matches(
+            prior, model_type=model_type, targets=targets, hidden_dim=hidden_dim, input_dim=X_train.shape[2]
+        ):
+            init, optimizer_state = _mlp_warm_start(prior, optimizer)
+
+        with timer.stage("fit", rows=train_rows * len(targets)):
+            multi_model = train_mlp_multi(
+                X_train=X_train,
+                y_train=y_train,
+                hidden_dim=hidden_dim,
+                learning_rate=learning_rate,
+                epochs=epochs,
+                batch_size=batch_size,
+                seed=random_seed,
+                init=init,
+                patience=early_stopping_patience,
+                validation_fraction=validation_fraction,
+                optimizer=optimizer,
+                optimizer_state=optimizer_state,
+                dtype=dtype,
+            )
+        with timer.stage("predict", rows=holdout_rows * len(targets)):
+            holdout_pred = multi_predict_batch(multi_model, X_holdout)
+
+        metrics = {}
+        for i, target in enumerate(targets):
+            baseline = TrainingDataset(timestamps, values[i]).baseline_metrics(
+                max(lags), holdout_ratio, lag=_baseline_lag(lags)
+            )
+            metrics[target] = _holdout_metrics(
+                y_holdout[i], holdout_pred[i], baseline, train_rows, holdout_rows, multi_model["train_loss"][i]
+            )
+
+        artifact = _build_artifact(
+            model_type,
+            model_name,
+            {"database": database, "table": table, "time_col": time_col, "target": ",".join(targets)},
+            lags,
+            estimate_cadence_seconds(timestamps),
+            metrics,
+            {
                 "learning_rate": learning_rate,
-                "batch_size": int(batch_size),
-                "epochs": int(epochs),
-                "new_rows_since_last": int(effective_new_rows),
-                "update_from_ts": update_from,
-                "update_to_ts": last_seen_ts,
+                "batch_size": batch_size,
+                "epochs": epochs,
+                "early_stopping_patience": early_stopping_patience,
+                "validation_fraction": validation_fraction,
+                "optimizer": optimizer,
+                "precision": precision,
+                "burn_in_rows": burn_in_rows,
+                "max_train_rows": max_train_rows,
+                "random_seed": random_seed,
+                "min_new_rows": min_new_rows,
+                "history_hours": history_hours,
             },
+            multi_model,
+            targets=targets,
         )
-        insert_or_update_model_registry(
+        effective_new_rows = _persist_training(conn, timer, model_file, artifact, state, timestamps, metrics)
+
+        return timer.finish(
             conn,
             {
-                "model_name": model_name,
-                "model_version": model_version,
-                "trained_at": trained_at,
-                "database": database,
-                "table": table,
-                "target": target,
-                "metrics": artifact["metrics"],
-                "artifact_path": str(model_file.resolve()),
+                "status": "trained",
+                "model_version": artifact["model_version"],
+                "artifact_path": str(model_file),
+                "targets": targets,
+                "holdout_mae": {t: metrics[t]["holdout_mae"] for t in targets},
+                "mae_improvement_pct": {t: metrics[t]["mae_improvement_pct"] for t in targets},
+                "new_rows": int(effective_new_rows),
             },
         )
-
-        return {
-            "status": "trained",
-            "model_version": model_version,
-            "artifact_path": str(model_file),
-            "holdout_mae": holdout_mae,
-            "holdout_rmse": holdout_rmse,
-            "baseline_mae": baseline_mae,
-            "baseline_rmse": baseline_rmse,
-            "mae_improvement_pct": mae_improvement_pct,
-            "rmse_improvement_pct": rmse_improvement_pct,
-            "new_rows": int(effective_new_rows),
-        }
+    except Exception as exc:
+        timer.fail(conn, exc)
+        raise
     finally:
         conn.close()
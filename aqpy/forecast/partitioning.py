@@ -0,0 +1,268 @@
+import datetime as dt
+import re
+
+from aqpy.common.db import connect_db
+from aqpy.forecast.repository import ensure_predictions_table, validate_identifier
+from aqpy.forecast.timing import StageTimer
+
+
+# Partition boundaries are aligned to this Monday so weekly partitions start on Mondays.
+PARTITION_EPOCH = dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc)
+DEFAULT_PARTITION_DAYS = 7
+PARTITION_BOUND_RE = re.compile(
+    r"FROM \((?:'(?P<lo>[^']+)'|MINVALUE)\) TO \((?:'(?P<hi>[^']+)'|MAXVALUE)\)"
+)
+
+
+def partition_floor(ts, interval_days):
+    days = (ts - PARTITION_EPOCH).days
+    return PARTITION_EPOCH + dt.timedelta(days=days - days % interval_days)
+
+
+def partition_windows(start_ts, end_ts, interval_days):
+    # Aligned half-open [lo, hi) ranges from start_ts's partition up to the one holding end_ts.
+    step = dt.timedelta(days=interval_days)
+    windows = []
+    lo = partition_floor(start_ts, interval_days)
+    while lo <= end_ts:
+        windows.append((lo, lo + step))
+        lo += step
+    return windows
+
+
+def partition_name(table, lo):
+    return f"{table}_p{lo:%Y%m%d}"
+
+
+def parse_partition_bound(expr):
+    # pg_get_expr(relpartbound) -> (lo, hi); None for MINVALUE/MAXVALUE. DEFAULT partitions give None.
+    match = PARTITION_BOUND_RE.search(expr or "")
+    if match is None:
+        return None
+    lo, hi = match.group("lo"), match.group("hi")
+    return (
+        dt.datetime.fromisoformat(lo) if lo else None,
+        dt.datetime.fromisoformat(hi) if hi else None,
+    )
+
+
+def storage_kind(conn, table):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT c.relkind, to_regclass('timescaledb_information.hypertables') IS NOT NULL
+            FROM pg_class c
+            WHERE c.oid = to_regclass(%s)
+            """,
+            (table,),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        relkind, has_timescale = row
+        if has_timescale:
+            cur.execute(
+                "SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = %s",
+                (table,),
+            )
+            if cur.fetchone() is not None:
+                return "hypertable"
+    return "partitioned" if relkind == "p" else "heap"
+
+
+def fetch_partitions(conn, table):
+    query = """
+    SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass(%s)
+    ORDER BY c.relname
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, (table,))
+        rows = cur.fetchall()
+    partitions = []
+    for name, expr in rows:
+        bound = parse_partition_bound(expr)
+        partitions.append((name, *(bound or (None, None)), bound is None))
+    return partitions
+
+
+def create_partition(conn, table, time_col, lo, hi, default_partition=None):
+    # Rows that landed in the DEFAULT partition for this range move over first, otherwise ATTACH refuses.
+    name = partition_name(table, lo)
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        if default_partition:
+            cur.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {default_partition}
+                    WHERE {time_col} >= %s AND {time_col} < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+                """,
+                (lo, hi),
+            )
+        cur.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", (lo, hi))
+    return name
+
+
+def ensure_partitions(conn, table, time_col, until_ts, interval_days=None):
+    # Extends a natively partitioned table up to the range holding until_ts. No-op for other tables.
+    table = validate_identifier(table)
+    time_col = validate_identifier(time_col)
+    if storage_kind(conn, table) != "partitioned":
+        return []
+    partitions = fetch_partitions(conn, table)
+    ranged = [p for p in partitions if not p[3] and p[2] is not None]
+    default_partition = next((p[0] for p in partitions if p[3]), None)
+    if interval_days is None:
+        newest = max((p for p in ranged if p[1] is not None), key=lambda p: p[2], default=None)
+        interval_days = (newest[2] - newest[1]).days if newest else DEFAULT_PARTITION_DAYS
+    upper = max((p[2] for p in ranged), default=None)
+    created = []
+    start_ts = upper or dt.datetime.now(dt.timezone.utc)
+    for lo, hi in partition_windows(start_ts, until_ts, interval_days):
+        if upper is not None and lo < upper:
+            continue
+        created.append(create_partition(conn, table, time_col, lo, hi, default_partition))
+    conn.commit()
+    return created
+
+
+def drop_expired_partitions(conn, table, cutoff):
+    # Drops partitions (or Timescale chunks) that lie entirely before cutoff. Returns (names, rows);
+    # rows is None for chunks, which Timescale drops without counting.
+    table = validate_identifier(table)
+    kind = storage_kind(conn, table)
+    dropped = []
+    rows = 0
+    with conn.cursor() as cur:
+        if kind == "hypertable":
+            cur.execute("SELECT drop_chunks(%s, older_than => %s)", (table, cutoff))
+            dropped = [r[0] for r in cur.fetchall()]
+            rows = None
+        elif kind == "partitioned":
+            for name, _, hi, is_default in fetch_partitions(conn, table):
+                if is_default or hi is None or hi > cutoff:
+                    continue
+                cur.execute(f"SELECT count(*) FROM {name}")
+                rows += int(cur.fetchone()[0])
+                cur.execute(f"DROP TABLE {name}")
+                dropped.append(name)
+    conn.commit()
+    return dropped, rows
+
+
+def _has_index(cur, name):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+    return bool(cur.fetchone()[0])
+
+
+def convert_to_partitions(conn, interval_days, until_ts, now=None):
+    # Swaps the predictions heap for a range-partitioned parent without copying: the old table is
+    # attached as one partition covering everything up to the end of the current interval, and
+    # new ranges get their own partitions. Retention drops it whole once it ages out.
+    now = now or dt.datetime.now(dt.timezone.utc)
+    with conn.cursor() as cur:
+        cur.execute("LOCK TABLE predictions IN ACCESS EXCLUSIVE MODE")
+        if not _has_index(cur, "uq_predictions_key"):
+            raise RuntimeError("predictions has no unique key yet; run compact_predictions.py first.")
+        cur.execute("SELECT max(predicted_for) FROM predictions")
+        newest = cur.fetchone()[0]
+        boundary = partition_floor(max(newest or now, now), interval_days) + dt.timedelta(days=interval_days)
+
+        cur.execute("ALTER TABLE predictions RENAME TO predictions_legacy")
+        cur.execute(
+            "SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = 'predictions_legacy'::regclass"
+        )
+        for (index_name,) in cur.fetchall():
+            cur.execute(f"ALTER INDEX {index_name} RENAME TO {index_name}_legacy")
+        cur.execute(
+            """
+            CREATE TABLE predictions (LIKE predictions_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            PARTITION BY RANGE (predicted_for)
+            """
+        )
+        # Keep the id sequence alive after the legacy partition is dropped.
+        cur.execute("SELECT pg_get_serial_sequence('predictions_legacy', 'id')")
+        sequence = cur.fetchone()[0]
+        if sequence:
+            cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY predictions.id")
+        cur.execute(
+            "ALTER TABLE predictions ATTACH PARTITION predictions_legacy FOR VALUES FROM (MINVALUE) TO (%s)",
+            (boundary,),
+        )
+        # Matching legacy indexes are attached rather than rebuilt.
+        cur.execute(
+            """
+            CREATE UNIQUE INDEX uq_predictions_key
+                ON predictions (model_name, target, horizon_step, predicted_for)
+            """
+        )
+        cur.execute(
+            "CREATE INDEX idx_predictions_lookup ON predictions (target, model_name, predicted_for DESC)"
+        )
+        cur.execute("CREATE INDEX idx_predictions_predicted_for_brin ON predictions USING brin (predicted_for)")
+        cur.execute("CREATE TABLE predictions_default PARTITION OF predictions DEFAULT")
+    created = ensure_partitions(conn, "predictions", "predicted_for", until_ts, interval_days)
+    return boundary, created
+
+
+def convert_to_hypertable(conn, interval_days):
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")
+        if cur.fetchone() is None:
+            raise RuntimeError("timescaledb extension is not installed in this database.")
+        if not _has_index(cur, "uq_predictions_key"):
+            raise RuntimeError("predictions has no unique key yet; run compact_predictions.py first.")
+        # Hypertable unique indexes must include the time column; the upsert key already does.
+        cur.execute("ALTER TABLE predictions DROP CONSTRAINT IF EXISTS predictions_pkey")
+        cur.execute(
+            """
+            SELECT create_hypertable(
+                'predictions', 'predicted_for',
+                chunk_time_interval => make_interval(days => %s),
+                migrate_data => true
+            )
+            """,
+            (interval_days,),
+        )
+    conn.commit()
+
+
+def run_partitioning(database, mode="native", interval_days=DEFAULT_PARTITION_DAYS, ahead_days=14):
+    timer = StageTimer("partitioning", source_database=database, source_table="predictions")
+    conn = connect_db(database)
+    try:
+        with timer.stage("inspect"):
+            ensure_predictions_table(conn)
+            kind = storage_kind(conn, "predictions")
+        until_ts = dt.datetime.now(dt.timezone.utc) + dt.timedelta(days=ahead_days)
+        if kind == "hypertable":
+            return timer.finish(conn, {"status": "skipped", "reason": "predictions is already a hypertable"})
+        if kind == "partitioned":
+            with timer.stage("extend"):
+                created = ensure_partitions(conn, "predictions", "predicted_for", until_ts)
+            return timer.finish(conn, {"status": "ok", "storage": kind, "partitions_created": created})
+
+        with timer.stage("convert"):
+            if mode == "timescale":
+                convert_to_hypertable(conn, interval_days)
+                result = {"status": "ok", "storage": "hypertable"}
+            else:
+                boundary, created = convert_to_partitions(conn, interval_days, until_ts)
+                result = {
+                    "status": "ok",
+                    "storage": "partitioned",
+                    "legacy_until": boundary.isoformat(),
+                    "partitions_created": created,
+                }
+        return timer.finish(conn, result)
+    except Exception as exc:
+        timer.fail(conn, exc)
+        raise
+    finally:
+        conn.close()
@@ -0,0 +1,24 @@
+import os
+
+import numpy as np
+
+
+PRECISIONS = {"float64": np.float64, "float32": np.float32}
+DEFAULT_PRECISION = "float64"
+
+
+def resolve_precision(precision=None):
+    name = precision or os.getenv("AQPY_FORECAST_PRECISION", DEFAULT_PRECISION)
+    name = str(name).strip().lower()
+    if name not in PRECISIONS:
+        raise ValueError(f"Unsupported precision '{name}'. Allowed: {sorted(PRECISIONS)}")
+    return name
+
+
+def precision_dtype(precision=None):
+    return PRECISIONS[resolve_precision(precision)]
+
+
+def model_dtype(model):
+    # Artifacts written before precision was recorded are float64.
+    return PRECISIONS.get(model.get("precision", DEFAULT_PRECISION), np.float64)
@@ -1,7 +1,10 @@
 import re
 
 import numpy as np
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_values
+
+from aqpy.common.db import ensure_schema
+from aqpy.common.env import env_flag
 
 
 IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
@@ -46,7 +49,46 @@ def fetch_recent_series(conn, table, time_col, target_col, n_rows):
     return timestamps, values
 
 
+def fetch_multi_series(conn, table, time_col, target_cols, history_hours):
+    not_null = " AND ".join(f"{col} IS NOT NULL" for col in target_cols)
+    query = f"""
+    SELECT {time_col}, {", ".join(target_cols)}
+    FROM {table}
+    WHERE {time_col} >= now() - make_interval(hours => %s)
+      AND {not_null}
+    ORDER BY {time_col} ASC
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, (history_hours,))
+        rows = cur.fetchall()
+    timestamps = [r[0] for r in rows]
+    values = np.array([r[1:] for r in rows], dtype=float).reshape(len(rows), len(target_cols)).T
+    return timestamps, values
+
+
+def fetch_recent_multi_series(conn, table, time_col, target_cols, n_rows):
+    not_null = " AND ".join(f"{col} IS NOT NULL" for col in target_cols)
+    query = f"""
+    SELECT {time_col}, {", ".join(target_cols)}
+    FROM {table}
+    WHERE {not_null}
+    ORDER BY {time_col} DESC
+    LIMIT %s
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, (n_rows,))
+        rows = cur.fetchall()
+    rows.reverse()
+    timestamps = [r[0] for r in rows]
+    values = [[float(r[i + 1]) for r in rows] for i in range(len(target_cols))]
+    return timestamps, values
+
+
 def ensure_registry_table(conn):
+    ensure_schema(conn, "model_registry", ["model_registry"], _create_registry_table)
+
+
+def _create_registry_table(conn):
     ddl = """
     CREATE TABLE IF NOT EXISTS model_registry (
         model_name TEXT NOT NULL,
@@ -65,7 +107,22 @@ def ensure_registry_table(conn):
     conn.commit()
 
 
+PREDICTIONS_RELATIONS = [
+    "predictions",
+    "idx_predictions_lookup",
+    "idx_predictions_predicted_for_brin",
+    "uq_predictions_key",
+    "predictions_history",
+    "idx_predictions_history_lookup",
+]
+
+
 def ensure_predictions_table(conn):
+    # True once predictions has the upsert key; see _create_predictions_table.
+    return bool(ensure_schema(conn, "predictions", PREDICTIONS_RELATIONS, _create_predictions_table))
+
+
+def _create_predictions_table(conn):
     ddl = """
     CREATE TABLE IF NOT EXISTS predictions (
         id BIGSERIAL PRIMARY KEY,
@@ -82,12 +139,123 @@ def ensure_predictions_table(conn):
 
     CREATE INDEX IF NOT EXISTS idx_predictions_lookup
         ON predictions (target, model_name, predicted_for DESC);
+
+    CREATE INDEX IF NOT EXISTS idx_predictions_predicted_for_brin
+        ON predictions USING brin (predicted_for);
+    """
+    with conn.cursor() as cur:
+        cur.execute(ddl)
+        cur.execute(PREDICTIONS_HISTORY_DDL)
+        keyed = _has_prediction_key(cur)
+        if not keyed:
+            # Tables written before the unique key may hold duplicates; compact_predictions.py
+            # collapses them and adds the key. Until then writes stay append-only.
+            cur.execute("SELECT 1 FROM predictions LIMIT 1")
+            if cur.fetchone() is None:
+                cur.execute(PREDICTIONS_KEY_DDL)
+                keyed = True
+    conn.commit()
+    return keyed
+
+
+PREDICTIONS_KEY_DDL = """
+CREATE UNIQUE INDEX IF NOT EXISTS uq_predictions_key
+    ON predictions (model_name, target, horizon_step, predicted_for);
+"""
+
+PREDICTIONS_HISTORY_DDL = """
+CREATE TABLE IF NOT EXISTS predictions_history (
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    generated_at TIMESTAMPTZ NOT NULL,
+    predicted_for TIMESTAMPTZ NOT NULL,
+    source_database TEXT NOT NULL,
+    source_table TEXT NOT NULL,
+    target TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    horizon_step INTEGER NOT NULL,
+    yhat DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_predictions_history_lookup
+    ON predictions_history (target, model_name, predicted_for DESC);
+"""
+
+
+def _has_prediction_key(cur):
+    cur.execute("SELECT to_regclass('uq_predictions_key') IS NOT NULL")
+    return bool(cur.fetchone()[0])
+
+
+def ensure_forecast_state_table(conn):
+    ensure_schema(conn, "forecast_state", ["forecast_state"], _create_forecast_state_table)
+
+
+def _create_forecast_state_table(conn):
+    ddl = """
+    CREATE TABLE IF NOT EXISTS forecast_state (
+        model_name TEXT PRIMARY KEY,
+        model_version TEXT NOT NULL,
+        source_database TEXT NOT NULL,
+        source_table TEXT NOT NULL,
+        horizon_steps INTEGER NOT NULL,
+        last_forecast_source_ts TIMESTAMPTZ NOT NULL,
+        last_forecast_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
     """
     with conn.cursor() as cur:
         cur.execute(ddl)
     conn.commit()
 
 
+def get_forecast_state(conn, model_name):
+    query = """
+    SELECT model_version, horizon_steps, last_forecast_source_ts
+    FROM forecast_state
+    WHERE model_name = %s
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, (model_name,))
+        row = cur.fetchone()
+    if row is None:
+        return None
+    return {
+        "model_version": row[0],
+        "horizon_steps": int(row[1]),
+        "last_forecast_source_ts": row[2],
+    }
+
+
+def upsert_forecast_state(
+    conn, model_name, model_version, source_database, source_table, horizon_steps, source_ts
+):
+    query = """
+    INSERT INTO forecast_state (
+        model_name,
+        model_version,
+        source_database,
+        source_table,
+        horizon_steps,
+        last_forecast_source_ts,
+        last_forecast_at
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, now())
+    ON CONFLICT (model_name) DO UPDATE
+    SET model_version = EXCLUDED.model_version,
+        source_database = EXCLUDED.source_database,
+        source_table = EXCLUDED.source_table,
+        horizon_steps = EXCLUDED.horizon_steps,
+        last_forecast_source_ts = EXCLUDED.last_forecast_source_ts,
+        last_forecast_at = now()
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            query,
+            (model_name, model_version, source_database, source_table, int(horizon_steps), source_ts),
+        )
+    conn.commit()
+
+
 def register_model(conn, payload):
     query = """
     INSERT INTO model_registry (
@@ -122,7 +290,17 @@ def register_model(conn, payload):
     conn.commit()
 
 
-def insert_predictions(conn, payload_rows):
+def insert_predictions(conn, payload_rows, upsert=True, keep_history=None):
+    # Rows are (predicted_for, source_database, source_table, target, model_name, model_version,
+    # horizon_step, yhat). With upsert, a newer forecast replaces the stored one for the same
+    # (model_name, target, horizon_step, predicted_for); keep_history first copies the replaced
+    # rows into predictions_history.
+    if keep_history is None:
+        keep_history = env_flag("AQPY_PREDICTIONS_KEEP_HISTORY")
+    rows = list(payload_rows)
+    if upsert:
+        # One statement cannot update the same key twice, so the last row per key wins.
+        rows = list({(r[4], r[3], int(r[6]), r[0]): r for r in rows}.values())
     query = """
     INSERT INTO predictions (
         generated_at,
@@ -134,10 +312,43 @@ def insert_predictions(conn, payload_rows):
         model_version,
         horizon_step,
         yhat
-    ) VALUES (now(), %s, %s, %s, %s, %s, %s, %s, %s)
+    ) VALUES %s
+    """
+    if upsert:
+        query += """
+    ON CONFLICT (model_name, target, horizon_step, predicted_for) DO UPDATE
+    SET generated_at = EXCLUDED.generated_at,
+        source_database = EXCLUDED.source_database,
+        source_table = EXCLUDED.source_table,
+        model_version = EXCLUDED.model_version,
+        yhat = EXCLUDED.yhat
     """
     with conn.cursor() as cur:
-        cur.executemany(query, payload_rows)
+        if upsert and keep_history and rows:
+            execute_values(
+                cur,
+                """
+                INSERT INTO predictions_history (
+                    generated_at, predicted_for, source_database, source_table, target,
+                    model_name, model_version, horizon_step, yhat
+                )
+                SELECT p.generated_at, p.predicted_for, p.source_database, p.source_table, p.target,
+                       p.model_name, p.model_version, p.horizon_step, p.yhat
+                FROM predictions p
+                JOIN (VALUES %s) AS k (model_name, target, horizon_step, predicted_for)
+                  USING (model_name, target, horizon_step, predicted_for)
+                """,
+                [(r[4], r[3], int(r[6]), r[0]) for r in rows],
+                template="(%s, %s, %s::integer, %s::timestamptz)",
+                page_size=1000,
+            )
+        execute_values(
+            cur,
+            query,
+            rows,
+            template="(now(), %s, %s, %s, %s, %s, %s, %s, %s)",
+            page_size=1000,
+        )
     conn.commit()
 
 
@@ -180,3 +391,145 @@ def delete_predictions_window(
         deleted = cur.rowcount
     conn.commit()
     return int(deleted)
+
+
+def fetch_realized_predictions(
+    conn,
+    source_database,
+    table,
+    time_col,
+    target_col,
+    model_names,
+    max_step,
+    since_ts,
+    until_ts,
+    tolerance_seconds,
+):
+    # Latest stored forecast per (model, step, predicted_for), matched to the nearest source row.
+    # Rows are keyed by that source row's timestamp, so models with slightly different cadences align.
+    query = f"""
+    SELECT p.model_name, p.horizon_step, a.actual_ts, p.yhat, a.actual
+    FROM (
+        SELECT DISTINCT ON (model_name, horizon_step, predicted_for)
+            model_name, horizon_step, predicted_for, yhat
+        FROM predictions
+        WHERE source_database = %s
+          AND source_table = %s
+          AND target = %s
+          AND model_name = ANY(%s)
+          AND horizon_step <= %s
+          AND predicted_for > %s
+          AND predicted_for <= %s
+        ORDER BY model_name, horizon_step, predicted_for, generated_at DESC
+    ) p
+    CROSS JOIN LATERAL (
+        SELECT {time_col} AS actual_ts, {target_col} AS actual
+        FROM {table}
+        WHERE {time_col} BETWEEN p.predicted_for - make_interval(secs => %s)
+                             AND p.predicted_for + make_interval(secs => %s)
+          AND {target_col} IS NOT NULL
+        ORDER BY abs(extract(epoch FROM {time_col} - p.predicted_for))
+        LIMIT 1
+    ) a
+    ORDER BY a.actual_ts, p.horizon_step
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            query,
+            (
+                source_database,
+                table,
+                target_col,
+                list(model_names),
+                int(max_step),
+                since_ts,
+                until_ts,
+                float(tolerance_seconds),
+                float(tolerance_seconds),
+            ),
+        )
+        return cur.fetchall()
+
+
+def fetch_prediction_series_keys(conn):
+    query = """
+    SELECT target, model_name, MIN(predicted_for), MAX(predicted_for), MAX(id)
+    FROM predictions
+    GROUP BY target, model_name
+    ORDER BY target, model_name
+    """
+    with conn.cursor() as cur:
+        cur.execute(query)
+        return cur.fetchall()
+
+
+_DEDUPE_TAIL = """
+), removed AS (
+    DELETE FROM predictions p
+    USING ranked r
+    WHERE p.id = r.id
+      AND r.rn > 1
+    RETURNING p.*
+), archived AS (
+    INSERT INTO predictions_history (
+        generated_at, predicted_for, source_database, source_table, target,
+        model_name, model_version, horizon_step, yhat
+    )
+    SELECT generated_at, predicted_for, source_database, source_table, target,
+           model_name, model_version, horizon_step, yhat
+    FROM removed
+    WHERE %s
+    RETURNING 1
+)
+SELECT (SELECT COUNT(*) FROM removed), (SELECT COUNT(*) FROM archived)
+"""
+
+_RANK = """
+row_number() OVER (
+    PARTITION BY model_name, target, horizon_step, predicted_for
+    ORDER BY generated_at DESC, id DESC
+) AS rn
+"""
+
+
+def delete_duplicate_predictions(conn, target, model_name, start_ts, end_ts, keep_history=False):
+    # Keeps the newest row per key in one (target, model_name, predicted_for) range; the range
+    # predicate rides idx_predictions_lookup so each batch only reads its own rows.
+    query = f"""
+    WITH ranked AS (
+        SELECT id, {_RANK}
+        FROM predictions
+        WHERE target = %s
+          AND model_name = %s
+          AND predicted_for >= %s
+          AND predicted_for < %s
+    {_DEDUPE_TAIL}
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, (target, model_name, start_ts, end_ts, bool(keep_history)))
+        deleted, archived = cur.fetchone()
+    conn.commit()
+    return int(deleted), int(archived)
+
+
+def add_prediction_key(conn, since_id, keep_history=False):
+    # Writers may have added duplicates while batches ran. Block them, collapse the keys touched by
+    # rows newer than since_id, and create the unique key in the same transaction.
+    query = f"""
+    WITH touched AS (
+        SELECT DISTINCT model_name, target, horizon_step, predicted_for
+        FROM predictions
+        WHERE id > %s
+    ), ranked AS (
+        SELECT id, {_RANK}
+        FROM predictions p
+        JOIN touched t USING (model_name, target, horizon_step, predicted_for)
+    {_DEDUPE_TAIL}
+    """
+    with conn.cursor() as cur:
+        cur.execute("LOCK TABLE predictions IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute(query, (int(since_id), bool(keep_history)))
+        deleted, archived = cur.fetchone()
+        cur.execute(PREDICTIONS_KEY_DDL)
+    conn.commit()
+    return int(deleted), int(archived)
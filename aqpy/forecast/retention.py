@@ -1,6 +1,8 @@
 import datetime as dt
 import re
 
+from aqpy.forecast.timing import StageTimer
+
 IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
 
 
@@ -24,6 +26,7 @@ def run_retention(
     retention_days=14,
     safety_hours=12,
     use_training_watermark=True,
+    partition_ahead_days=14,
 ):
     from aqpy.common.db import connect_db
     from aqpy.forecast.online_repository import (
@@ -32,21 +35,34 @@ def run_retention(
         get_min_last_seen_ts,
         insert_retention_run,
     )
+    from aqpy.forecast.partitioning import drop_expired_partitions, ensure_partitions
 
     table = _validate_identifier(table)
     time_col = _validate_identifier(time_col)
     conn = connect_db(database)
+    timer = StageTimer(
+        "retention",
+        model_name=model_name,
+        source_database=database,
+        source_table=table,
+    )
     try:
-        ensure_online_tables(conn)
-        now_utc = dt.datetime.now(dt.timezone.utc)
+        with timer.stage("watermark"):
+            ensure_online_tables(conn)
+            now_utc = dt.datetime.now(dt.timezone.utc)
+            min_last_seen_ts = None
+            if use_training_watermark:
+                min_last_seen_ts = get_min_last_seen_ts(conn, model_name=model_name)
         if use_training_watermark:
-            min_last_seen_ts = get_min_last_seen_ts(conn, model_name=model_name)
             if min_last_seen_ts is None:
-                return {
-                    "status": "skipped",
-                    "reason": "no training state found",
-                    "rows_deleted": 0,
-                }
+                return timer.finish(
+                    conn,
+                    {
+                        "status": "skipped",
+                        "reason": "no training state found",
+                        "rows_deleted": 0,
+                    },
+                )
 
             delete_cutoff = compute_delete_cutoff(
                 now_utc=now_utc,
@@ -56,22 +72,42 @@ def run_retention(
             )
         else:
             delete_cutoff = now_utc - dt.timedelta(days=retention_days)
-        rows_deleted = delete_older_than(conn, table, time_col, delete_cutoff)
-        insert_retention_run(
-            conn=conn,
-            model_name=model_name or "__all_models__",
-            source_database=database,
-            source_table=table,
-            source_time_col=time_col,
-            rows_deleted=rows_deleted,
-            delete_cutoff=delete_cutoff,
-            retention_days=retention_days,
-            safety_hours=safety_hours,
+        # Partitioned tables and hypertables lose whole expired ranges first; the row delete then
+        # only touches the partition straddling the cutoff.
+        with timer.stage("partitions"):
+            dropped, rows_dropped = drop_expired_partitions(conn, table, delete_cutoff)
+            created = ensure_partitions(
+                conn, table, time_col, now_utc + dt.timedelta(days=partition_ahead_days)
+            )
+        timer.set_rows("partitions", rows_dropped or 0)
+        with timer.stage("delete"):
+            rows_deleted = delete_older_than(conn, table, time_col, delete_cutoff)
+        timer.set_rows("delete", rows_deleted)
+        rows_deleted += rows_dropped or 0
+        with timer.stage("write", rows=1):
+            insert_retention_run(
+                conn=conn,
+                model_name=model_name or "__all_models__",
+                source_database=database,
+                source_table=table,
+                source_time_col=time_col,
+                rows_deleted=rows_deleted,
+                delete_cutoff=delete_cutoff,
+                retention_days=retention_days,
+                safety_hours=safety_hours,
+            )
+        return timer.finish(
+            conn,
+            {
+                "status": "ok",
+                "rows_deleted": rows_deleted,
+                "delete_cutoff": delete_cutoff.isoformat(),
+                "partitions_dropped": dropped,
+                "partitions_created": created,
+            },
         )
-        return {
-            "status": "ok",
-            "rows_deleted": rows_deleted,
-            "delete_cutoff": delete_cutoff.isoformat(),
-        }
+    except Exception as exc:
+        timer.fail(conn, exc)
+        raise
     finally:
         conn.close()
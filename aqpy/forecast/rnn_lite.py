@@ -1,5 +1,17 @@
+import time
+
 import numpy as np
 
+from aqpy.common.env import env_int
+from aqpy.forecast.nn_model import ADAM_BETA1, ADAM_BETA2, ADAM_EPS
+from aqpy.forecast.precision import model_dtype
+
+
+ENCODER_KEYS = ("Wz", "Uz", "bz", "Wr", "Ur", "br", "Wh", "Uh", "bh")
+DEFAULT_ENCODER_SECONDS = 20
+# Global gradient norm cap for the encoder update; recurrent gradients spike on level shifts.
+GRAD_CLIP = 1.0
+
 
 def _sigmoid(x):
     return 1.0 / (1.0 + np.exp(-x))
@@ -23,7 +35,7 @@ def init_gru_encoder(hidden_dim=8, seed=42):
 
 
 def _step(encoder, x_scalar, h_prev):
-    x = np.array([[float(x_scalar)]], dtype=float)
+    x = np.array([[float(x_scalar)]], dtype=encoder["Uz"].dtype)
     h = h_prev.reshape(1, -1)
     z = _sigmoid(x @ encoder["Wz"] + h @ encoder["Uz"] + encoder["bz"])
     r = _sigmoid(x @ encoder["Wr"] + h @ encoder["Ur"] + encoder["br"])
@@ -33,12 +45,148 @@ def _step(encoder, x_scalar, h_prev):
 
 
 def encode_sequence(encoder, seq):
-    h = np.zeros(encoder["hidden_dim"], dtype=float)
+    h = np.zeros(encoder["hidden_dim"], dtype=encoder["Uz"].dtype)
     for value in seq:
         h = _step(encoder, value, h)
     return h
 
 
+def encode_batch(encoder, X_seq):
+    # Steps every sequence together; row i matches encode_sequence(encoder, X_seq[i]).
+    dtype = encoder["Uz"].dtype
+    X_seq = np.asarray(X_seq, dtype=dtype)
+    H = np.zeros((len(X_seq), encoder["hidden_dim"]), dtype=dtype)
+    for t in range(X_seq.shape[1]):
+        x = X_seq[:, t : t + 1]
+        z = _sigmoid(x @ encoder["Wz"] + H @ encoder["Uz"] + encoder["bz"])
+        r = _sigmoid(x @ encoder["Wr"] + H @ encoder["Ur"] + encoder["br"])
+        h_tilde = np.tanh(x @ encoder["Wh"] + (r * H) @ encoder["Uh"] + encoder["bh"])
+        H = (1.0 - z) * H + z * h_tilde
+    return H
+
+
+def _cast_encoder(encoder, dtype):
+    return {
+        k: (int(v) if k == "hidden_dim" else np.array(v, dtype=dtype)) for k, v in encoder.items()
+    }
+
+
+def _gru_forward_steps(encoder, X_seq, bptt_steps):
+    # Runs the first steps without keeping activations, then caches the last bptt_steps for backprop.
+    H = np.zeros((len(X_seq), encoder["hidden_dim"]), dtype=X_seq.dtype)
+    T = X_seq.shape[1]
+    cut = T - bptt_steps
+    cache = []
+    for t in range(T):
+        x = X_seq[:, t : t + 1]
+        z = _sigmoid(x @ encoder["Wz"] + H @ encoder["Uz"] + encoder["bz"])
+        r = _sigmoid(x @ encoder["Wr"] + H @ encoder["Ur"] + encoder["br"])
+        rh = r * H
+        h_tilde = np.tanh(x @ encoder["Wh"] + rh @ encoder["Uh"] + encoder["bh"])
+        H_new = (1.0 - z) * H + z * h_tilde
+        if t >= cut:
+            cache.append((x, H, z, r, rh, h_tilde))
+        H = H_new
+    return H, cache
+
+
+def _gru_backward_steps(encoder, cache, dH):
+    grads = {k: np.zeros_like(encoder[k]) for k in ENCODER_KEYS}
+    for x, H, z, r, rh, h_tilde in reversed(cache):
+        da_z = dH * (h_tilde - H) * z * (1.0 - z)
+        da_h = dH * z * (1.0 - h_tilde * h_tilde)
+        grads["Wh"] += x.T @ da_h
+        grads["Uh"] += rh.T @ da_h
+        grads["bh"] += da_h.sum(axis=0)
+        d_rh = da_h @ encoder["Uh"].T
+        da_r = d_rh * H * r * (1.0 - r)
+        grads["Wz"] += x.T @ da_z
+        grads["Uz"] += H.T @ da_z
+        grads["bz"] += da_z.sum(axis=0)
+        grads["Wr"] += x.T @ da_r
+        grads["Ur"] += H.T @ da_r
+        grads["br"] += da_r.sum(axis=0)
+        dH = dH * (1.0 - z) + d_rh * r + da_z @ encoder["Uz"].T + da_r @ encoder["Ur"].T
+    return grads
+
+
+def encoder_gradients(encoder, head_w, head_b, X_seq, y, bptt_steps):
+    # MSE loss of the linear head on the final hidden state and its gradients. Backprop is truncated
+    # to the last bptt_steps steps of each window; earlier steps only feed the starting state.
+    H, cache = _gru_forward_steps(encoder, X_seq, max(1, min(int(bptt_steps), X_seq.shape[1])))
+    err = H @ head_w + head_b - y
+    loss = float(np.mean(err * err))
+    d_out = (2.0 / len(y)) * err
+    grads = _gru_backward_steps(encoder, cache, np.outer(d_out, head_w))
+    grads["head_w"] = H.T @ d_out
+    grads["head_b"] = d_out.sum()
+    return loss, grads
+
+
+def train_gru_encoder(
+    encoder,
+    X_seq,
+    y,
+    head_w,
+    head_b=0.0,
+    epochs=2,
+    learning_rate=0.005,
+    batch_size=64,
+    bptt_steps=12,
+    max_seconds=None,
+    seed=42,
+    clock=time.monotonic,
+):
+    # Adam over minibatches of windows, updating encoder and head together. Stops after `epochs` or
+    # once max_seconds (AQPY_GRU_ENCODER_SECONDS, 0 = no cap) is spent, checked between minibatches.
+    if max_seconds is None:
+        max_seconds = env_int("AQPY_GRU_ENCODER_SECONDS", DEFAULT_ENCODER_SECONDS)
+    dtype = encoder["Uz"].dtype
+    params = {k: np.array(encoder[k], dtype=dtype) for k in ENCODER_KEYS}
+    params["head_w"] = np.array(head_w, dtype=dtype)
+    params["head_b"] = np.array(head_b, dtype=dtype)
+    m = {k: np.zeros_like(v) for k, v in params.items()}
+    v = {k: np.zeros_like(v) for k, v in params.items()}
+    X_seq = np.asarray(X_seq, dtype=dtype)
+    y = np.asarray(y, dtype=dtype)
+    n = len(X_seq)
+    batch_size = max(1, min(int(batch_size), n))
+    order = np.arange(n)
+    rng = np.random.default_rng(seed)
+    started = clock()
+    step = 0
+    epochs_run = 0
+    out_of_time = False
+    for _ in range(max(0, int(epochs))):
+        rng.shuffle(order)
+        for start in range(0, n, batch_size):
+            if max_seconds and clock() - started >= max_seconds:
+                out_of_time = True
+                break
+            idx = order[start : start + batch_size]
+            enc = {"hidden_dim": encoder["hidden_dim"], **params}
+            _, grads = encoder_gradients(enc, params["head_w"], params["head_b"], X_seq[idx], y[idx], bptt_steps)
+            norm = np.sqrt(sum(float(np.sum(g * g)) for g in grads.values()))
+            scale = GRAD_CLIP / norm if norm > GRAD_CLIP else 1.0
+            step += 1
+            step_size = float(learning_rate * np.sqrt(1.0 - ADAM_BETA2**step) / (1.0 - ADAM_BETA1**step))
+            for key, g in grads.items():
+                g = g * scale
+                m[key] = ADAM_BETA1 * m[key] + (1.0 - ADAM_BETA1) * g
+                v[key] = ADAM_BETA2 * v[key] + (1.0 - ADAM_BETA2) * g * g
+                params[key] = params[key] - step_size * m[key] / (np.sqrt(v[key]) + ADAM_EPS)
+        if out_of_time:
+            break
+        epochs_run += 1
+    trained = {"hidden_dim": int(encoder["hidden_dim"]), **{k: params[k] for k in ENCODER_KEYS}}
+    return trained, {
+        "encoder_epochs_run": epochs_run,
+        "encoder_steps": step,
+        "encoder_train_seconds": round(clock() - started, 3),
+        "encoder_budget_hit": out_of_time,
+    }
+
+
 def build_sequence_dataset(values, seq_len):
     if len(values) <= seq_len:
         raise ValueError(f"Need > {seq_len} rows, got {len(values)}")
@@ -51,11 +199,30 @@ def build_sequence_dataset(values, seq_len):
 
 
 def _to_head_matrix(encoder, X_seq):
-    H = [encode_sequence(encoder, seq) for seq in X_seq]
-    return np.array(H, dtype=float)
+    # The ridge solve below always runs in float64.
+    return encode_batch(encoder, X_seq).astype(float)
 
 
-def fit_gru_lite_head(values, seq_len=24, hidden_dim=8, ridge=1e-3, seed=42, init=None):
+def _solve_head(H, y, ridge):
+    I = np.eye(H.shape[1], dtype=float)
+    w = np.linalg.solve(H.T @ H + ridge * I, H.T @ y.reshape(-1, 1)).reshape(-1)
+    return w, float(np.mean((H @ w - y) ** 2))
+
+
+def fit_gru_lite_head(
+    values,
+    seq_len=24,
+    hidden_dim=8,
+    ridge=1e-3,
+    seed=42,
+    init=None,
+    dtype=float,
+    encoder_epochs=0,
+    encoder_learning_rate=0.005,
+    encoder_batch_size=64,
+    bptt_steps=12,
+    encoder_seconds=None,
+):
     x_mean = float(np.mean(values))
     x_std = float(np.std(values))
     if x_std < 1e-8:
@@ -64,14 +231,33 @@ def fit_gru_lite_head(values, seq_len=24, hidden_dim=8, ridge=1e-3, seed=42, ini
 
     X_seq, y = build_sequence_dataset(vals, seq_len=seq_len)
     encoder = init_gru_encoder(hidden_dim=hidden_dim, seed=seed) if init is None else init
+    encoder = _cast_encoder(encoder, dtype)
     H = _to_head_matrix(encoder, X_seq)
-    y_col = y.reshape(-1, 1)
-    I = np.eye(H.shape[1], dtype=float)
-    w = np.linalg.solve(H.T @ H + ridge * I, H.T @ y_col).reshape(-1)
+    w, train_loss = _solve_head(H, y, ridge)
     b = 0.0
 
-    y_hat = H @ w + b
-    train_loss = float(np.mean((y_hat - y) ** 2))
+    encoder_stats = {"encoder_epochs_run": 0, "encoder_updated": False}
+    if encoder_epochs > 0:
+        # Warm-started from `init` (the prior artifact's encoder) with the ridge head as the starting
+        # head; the head is re-solved afterwards and the update is kept only if it lowers train loss.
+        trained, stats = train_gru_encoder(
+            encoder,
+            X_seq,
+            y,
+            head_w=w,
+            epochs=encoder_epochs,
+            learning_rate=encoder_learning_rate,
+            batch_size=encoder_batch_size,
+            bptt_steps=bptt_steps,
+            max_seconds=encoder_seconds,
+            seed=seed,
+        )
+        H_new = _to_head_matrix(trained, X_seq)
+        w_new, loss_new = _solve_head(H_new, y, ridge)
+        encoder_stats = {**stats, "encoder_updated": bool(loss_new < train_loss)}
+        if loss_new < train_loss:
+            encoder, w, train_loss = trained, w_new, loss_new
+
     return {
         "model_type": "rnn_lite_gru",
         "seq_len": int(seq_len),
@@ -85,42 +271,30 @@ def fit_gru_lite_head(values, seq_len=24, hidden_dim=8, ridge=1e-3, seed=42, ini
         "head_b": float(b),
         "ridge": float(ridge),
         "train_loss": train_loss,
+        "precision": np.dtype(dtype).name,
+        **encoder_stats,
     }
 
 
 def _restore_encoder(model):
-    enc = model["encoder"]
-    return {
-        "hidden_dim": int(enc["hidden_dim"]),
-        "Wz": np.array(enc["Wz"], dtype=float),
-        "Uz": np.array(enc["Uz"], dtype=float),
-        "bz": np.array(enc["bz"], dtype=float),
-        "Wr": np.array(enc["Wr"], dtype=float),
-        "Ur": np.array(enc["Ur"], dtype=float),
-        "br": np.array(enc["br"], dtype=float),
-        "Wh": np.array(enc["Wh"], dtype=float),
-        "Uh": np.array(enc["Uh"], dtype=float),
-        "bh": np.array(enc["bh"], dtype=float),
-    }
+    return _cast_encoder(model["encoder"], model_dtype(model))
 
 
-def predict_next(model, history_values):
-    vals = np.array(history_values, dtype=float)
-    vals = (vals - float(model["x_mean"])) / float(model["x_std"])
+def predict_batch(model, X_seq_raw):
+    X_seq = np.asarray(X_seq_raw, dtype=float)
+    if len(X_seq) == 0:
+        return np.array([], dtype=float)
     seq_len = int(model["seq_len"])
-    seq = vals[-seq_len:]
-    encoder = _restore_encoder(model)
-    h = encode_sequence(encoder, seq)
+    X_seq = (X_seq[:, -seq_len:] - float(model["x_mean"])) / float(model["x_std"])
+    H = encode_batch(_restore_encoder(model), X_seq).astype(float)
     w = np.array(model["head_w"], dtype=float)
-    pred_scaled = float(h @ w + float(model["head_b"]))
-    return float(pred_scaled * float(model["x_std"]) + float(model["x_mean"]))
+    pred_scaled = H @ w + float(model["head_b"])
+    return pred_scaled * float(model["x_std"]) + float(model["x_mean"])
 
 
-def predict_batch(model, X_seq_raw):
-    out = []
-    for seq in X_seq_raw:
-        out.append(predict_next(model, seq))
-    return np.array(out, dtype=float)
+def predict_next(model, history_values):
+    seq_len = int(model["seq_len"])
+    return float(predict_batch(model, [list(history_values)[-seq_len:]])[0])
 
 
 def recursive_predict(model, values, horizon_steps):
@@ -9,18 +9,23 @@ REQUIRED_KEYS = {
     "database",
     "table",
     "time_col",
-    "target",
     "model_path",
 }
 
-ALLOWED_MODEL_TYPES = {"nn_mlp", "adaptive_ar", "rnn_lite_gru"}
+ALLOWED_MODEL_TYPES = {"nn_mlp", "nn_mlp_multi", "adaptive_ar", "rnn_lite_gru", "ensemble"}
+ALLOWED_ENSEMBLE_METHODS = {"inverse_error", "exp_gradient"}
+ALLOWED_OPTIMIZERS = {"sgd", "momentum", "adam"}
+ALLOWED_PRECISIONS = {"float64", "float32"}
 IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
 FAMILY_TO_MODEL_TYPES = {
     "nn": {"nn_mlp"},
+    "nn_multi": {"nn_mlp_multi"},
     "ar": {"adaptive_ar"},
     "rnn": {"rnn_lite_gru"},
+    "ensemble": {"ensemble"},
     # Also allow explicit model_type values as family filters.
     "nn_mlp": {"nn_mlp"},
+    "nn_mlp_multi": {"nn_mlp_multi"},
     "adaptive_ar": {"adaptive_ar"},
     "rnn_lite_gru": {"rnn_lite_gru"},
 }
@@ -64,6 +69,52 @@ def _validate_lags(spec):
         raise ValueError(f"Spec '{spec['model_name']}' has duplicate values in 'lags'.")
 
 
+def spec_targets(spec):
+    # nn_mlp_multi specs list their columns under 'targets'; every other type has one 'target'.
+    if spec.get("model_type") == "nn_mlp_multi":
+        return list(spec.get("targets") or [])
+    return [spec["target"]]
+
+
+def _validate_targets(spec):
+    targets = spec.get("targets")
+    if not isinstance(targets, list) or len(targets) < 2:
+        raise ValueError(f"Spec '{spec['model_name']}' with nn_mlp_multi must list at least two 'targets'.")
+    if not all(_is_identifier(t) for t in targets):
+        raise ValueError(f"Spec '{spec['model_name']}' has invalid SQL identifier in 'targets'.")
+    if len(set(targets)) != len(targets):
+        raise ValueError(f"Spec '{spec['model_name']}' has duplicate values in 'targets'.")
+
+
+def _validate_ensembles(specs):
+    # Members must be other specs forecasting the same column, so their batch forecasts can be blended.
+    by_name = {spec["model_name"]: spec for spec in specs}
+    for spec in specs:
+        if spec["model_type"] != "ensemble":
+            continue
+        name = spec["model_name"]
+        members = spec.get("members")
+        if not isinstance(members, list) or len(members) < 2 or len(set(members)) != len(members):
+            raise ValueError(f"Spec '{name}' with ensemble must list at least two distinct 'members'.")
+        for member in members:
+            other = by_name.get(member)
+            if other is None:
+                raise ValueError(f"Spec '{name}' has unknown ensemble member '{member}'.")
+            if other["model_type"] == "ensemble":
+                raise ValueError(f"Spec '{name}' cannot use ensemble '{member}' as a member.")
+            if (other["database"], other["table"]) != (spec["database"], spec["table"]) or spec[
+                "target"
+            ] not in spec_targets(other):
+                raise ValueError(
+                    f"Spec '{name}' member '{member}' does not forecast "
+                    f"{spec['database']}.{spec['table']}.{spec['target']}."
+                )
+            if other.get("forecast_horizon_steps", 12) < spec.get("forecast_horizon_steps", 12):
+                raise ValueError(
+                    f"Spec '{name}' member '{member}' forecasts fewer steps than the ensemble."
+                )
+
+
 def validate_model_specs(specs):
     if not isinstance(specs, list):
         raise ValueError("Model specs file must contain a top-level JSON list.")
@@ -77,7 +128,10 @@ def validate_model_specs(specs):
         if not isinstance(spec, dict):
             raise ValueError(f"Spec at index {idx} must be an object.")
 
-        missing = REQUIRED_KEYS - set(spec.keys())
+        required = REQUIRED_KEYS | ({"targets"} if spec.get("model_type") == "nn_mlp_multi" else {"target"})
+        if spec.get("model_type") == "ensemble":
+            required = required | {"members"}
+        missing = required - set(spec.keys())
         if missing:
             raise ValueError(f"Spec '{spec.get('model_name', idx)}' missing keys: {sorted(missing)}")
 
@@ -107,35 +161,89 @@ def validate_model_specs(specs):
             raise ValueError(f"Spec '{model_name}' has unsupported database '{spec['database']}'.")
 
         for key in ("table", "time_col", "target"):
-            if not _is_identifier(spec[key]):
+            if key in spec and not _is_identifier(spec[key]):
                 raise ValueError(f"Spec '{model_name}' has invalid SQL identifier for '{key}'.")
+        if model_type == "nn_mlp_multi":
+            _validate_targets(spec)
 
         _expect_positive_int(spec, "history_hours")
         _expect_positive_int(spec, "burn_in_rows")
         _expect_positive_int(spec, "max_train_rows")
         _expect_positive_int(spec, "forecast_horizon_steps")
         _expect_nonnegative_int(spec, "min_new_rows")
+        _expect_nonnegative_int(spec, "early_stopping_patience")
         _expect_positive_int(spec, "epochs")
         _expect_positive_int(spec, "batch_size")
         _expect_positive_int(spec, "hidden_dim")
         _expect_positive_int(spec, "seq_len")
+        _expect_positive_int(spec, "direct_horizon_steps")
+        _expect_nonnegative_int(spec, "encoder_epochs")
+        _expect_nonnegative_int(spec, "encoder_seconds")
+        _expect_positive_int(spec, "bptt_steps")
 
         if "holdout_ratio" in spec:
             holdout_ratio = spec["holdout_ratio"]
             if not isinstance(holdout_ratio, (int, float)) or holdout_ratio <= 0 or holdout_ratio >= 1:
                 raise ValueError(f"Spec '{model_name}' key 'holdout_ratio' must be in (0, 1).")
 
+        if "validation_fraction" in spec:
+            validation_fraction = spec["validation_fraction"]
+            if (
+                not isinstance(validation_fraction, (int, float))
+                or validation_fraction < 0
+                or validation_fraction >= 1
+            ):
+                raise ValueError(f"Spec '{model_name}' key 'validation_fraction' must be in [0, 1).")
+
+        if "optimizer" in spec:
+            if model_type not in {"nn_mlp", "nn_mlp_multi"}:
+                raise ValueError(f"Spec '{model_name}' key 'optimizer' only applies to nn_mlp models.")
+            if spec["optimizer"] not in ALLOWED_OPTIMIZERS:
+                raise ValueError(
+                    f"Spec '{model_name}' has unsupported optimizer '{spec['optimizer']}'. "
+                    f"Allowed: {sorted(ALLOWED_OPTIMIZERS)}"
+                )
+
+        if "ensemble_method" in spec:
+            if model_type != "ensemble":
+                raise ValueError(f"Spec '{model_name}' key 'ensemble_method' only applies to ensemble.")
+            if spec["ensemble_method"] not in ALLOWED_ENSEMBLE_METHODS:
+                raise ValueError(
+                    f"Spec '{model_name}' has unsupported ensemble_method '{spec['ensemble_method']}'. "
+                    f"Allowed: {sorted(ALLOWED_ENSEMBLE_METHODS)}"
+                )
+        if model_type == "ensemble" and not 0 < spec.get("forgetting_factor", 0.98) < 1:
+            raise ValueError(f"Spec '{model_name}' ensemble 'forgetting_factor' must be in (0, 1).")
+
+        if "precision" in spec and spec["precision"] not in ALLOWED_PRECISIONS:
+            raise ValueError(
+                f"Spec '{model_name}' has unsupported precision '{spec['precision']}'. "
+                f"Allowed: {sorted(ALLOWED_PRECISIONS)}"
+            )
+
         _expect_positive_number(spec, "learning_rate")
         _expect_positive_number(spec, "forgetting_factor")
         _expect_positive_number(spec, "ar_delta")
         _expect_positive_number(spec, "rnn_ridge")
+        _expect_positive_number(spec, "encoder_learning_rate")
 
-        if model_type in {"nn_mlp", "adaptive_ar"}:
+        if model_type in {"nn_mlp", "nn_mlp_multi", "adaptive_ar"}:
             _validate_lags(spec)
         if model_type == "rnn_lite_gru":
             if "seq_len" not in spec:
                 raise ValueError(f"Spec '{model_name}' with rnn_lite_gru must provide 'seq_len'.")
 
+        if "direct_horizon_steps" in spec:
+            if model_type not in {"nn_mlp", "adaptive_ar"}:
+                raise ValueError(
+                    f"Spec '{model_name}' key 'direct_horizon_steps' only applies to nn_mlp and adaptive_ar."
+                )
+            if spec.get("forecast_horizon_steps", 12) > spec["direct_horizon_steps"]:
+                raise ValueError(
+                    f"Spec '{model_name}' has forecast_horizon_steps > direct_horizon_steps "
+                    f"({spec.get('forecast_horizon_steps', 12)} > {spec['direct_horizon_steps']})."
+                )
+
         if "max_train_rows" in spec and "burn_in_rows" in spec:
             if spec["max_train_rows"] < spec["burn_in_rows"]:
                 raise ValueError(
@@ -143,6 +251,8 @@ def validate_model_specs(specs):
                     f"({spec['max_train_rows']} < {spec['burn_in_rows']})."
                 )
 
+    _validate_ensembles(specs)
+
 
 def load_model_specs(spec_path):
     path = pathlib.Path(spec_path)
@@ -163,7 +273,7 @@ def filter_specs(specs, model_names=None, databases=None, targets=None, families
         selected = [s for s in selected if s["database"] in allowed_db]
     if targets:
         allowed_targets = set(targets)
-        selected = [s for s in selected if s["target"] in allowed_targets]
+        selected = [s for s in selected if allowed_targets.intersection(spec_targets(s))]
     if families:
         allowed_types = set()
         for family in families:
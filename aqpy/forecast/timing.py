@@ -0,0 +1,93 @@
+import datetime as dt
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+class StageTimer:
+    def __init__(self, job_name, **context):
+        self.job_name = job_name
+        self.context = {
+            "model_name": None,
+            "model_type": None,
+            "source_database": None,
+            "source_table": None,
+        }
+        self.context.update(context)
+        self.started_at = dt.datetime.now(dt.timezone.utc)
+        self._start = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "rows": None})
+            entry["seconds"] += time.perf_counter() - start
+            if rows is not None:
+                self.set_rows(name, rows)
+
+    def set_rows(self, name, rows):
+        entry = self.stages.setdefault(name, {"seconds": 0.0, "rows": None})
+        entry["rows"] = int(rows)
+
+    def timed(self, name):
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def summary(self):
+        return {
+            "total_seconds": round(time.perf_counter() - self._start, 6),
+            "stages": {
+                name: {"seconds": round(entry["seconds"], 6), "rows": entry["rows"]}
+                for name, entry in self.stages.items()
+            },
+        }
+
+    def _record(self, conn, status, summary, error=None):
+        try:
+            from aqpy.forecast.online_repository import ensure_job_runs_table, insert_job_run
+
+            ensure_job_runs_table(conn)
+            insert_job_run(
+                conn,
+                {
+                    "started_at": self.started_at,
+                    "job_name": self.job_name,
+                    "status": status,
+                    "total_seconds": summary["total_seconds"],
+                    "stages": summary["stages"],
+                    "error": error,
+                    **self.context,
+                },
+            )
+        except Exception:
+            # Timing is diagnostics only; never fail the job because it could not be logged.
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return False
+        return True
+
+    def finish(self, conn, result):
+        summary = self.summary()
+        summary["recorded"] = self._record(conn, result.get("status", "ok"), summary)
+        result["timings"] = summary
+        return result
+
+    def fail(self, conn, exc):
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        self._record(conn, "failed", self.summary(), error=str(exc)[:500])
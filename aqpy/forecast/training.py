@@ -1,10 +1,21 @@
 import datetime as dt
-import json
 import pathlib
 
 from aqpy.common.db import connect_db
-from aqpy.forecast.features import build_feature_matrix, estimate_cadence_seconds
-from aqpy.forecast.model import fit_linear_regression, mae, predict, rmse, split_train_val
+from aqpy.forecast.artifacts import artifact_version_path, write_artifact
+from aqpy.forecast.features import (
+    build_feature_matrix,
+    build_horizon_targets,
+    estimate_cadence_seconds,
+)
+from aqpy.forecast.model import (
+    fit_direct_linear_regression,
+    fit_linear_regression,
+    mae,
+    predict,
+    rmse,
+    split_train_val,
+)
 from aqpy.forecast.repository import (
     ensure_registry_table,
     fetch_series,
@@ -23,6 +34,7 @@ def train_model(
     model_name,
     model_path,
     register=False,
+    direct_horizon_steps=0,
 ):
     table = validate_identifier(table)
     time_col = validate_identifier(time_col)
@@ -33,8 +45,14 @@ def train_model(
     try:
         timestamps, values = fetch_series(conn, table, time_col, target, history_hours)
         X, y = build_feature_matrix(values, lags)
+        if direct_horizon_steps:
+            y = build_horizon_targets(values, max(lags), direct_horizon_steps)
+            X = X[: len(y)]
         X_train, X_val, y_train, y_val = split_train_val(X, y)
-        intercept, weights = fit_linear_regression(X_train, y_train)
+        if direct_horizon_steps:
+            intercept, weights = fit_direct_linear_regression(X_train, y_train)
+        else:
+            intercept, weights = fit_linear_regression(X_train, y_train)
         y_pred = predict(intercept, weights, X_val)
 
         metrics = {
@@ -59,14 +77,13 @@ def train_model(
             "lags": lags,
             "intercept": intercept,
             "weights": weights,
+            "direct_horizon_steps": int(direct_horizon_steps or 0),
             "cadence_seconds": estimate_cadence_seconds(timestamps),
             "metrics": metrics,
-            "artifact_path": str(pathlib.Path(model_path).resolve()),
+            "artifact_path": str(artifact_version_path(pathlib.Path(model_path).absolute(), model_version)),
         }
 
-        artifact = pathlib.Path(model_path)
-        artifact.parent.mkdir(parents=True, exist_ok=True)
-        artifact.write_text(json.dumps(payload, indent=2))
+        write_artifact(model_path, payload, version=model_version)
 
         if register:
             ensure_registry_table(conn)
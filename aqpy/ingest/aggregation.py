@@ -0,0 +1,60 @@
+import numpy as np
+
+
+AGGREGATE_METHODS = ("mean", "median", "trimmed_mean")
+SAMPLE_LAYOUT = (("pm_st", 3), ("pm_en", 3), ("hist", 6))
+SAMPLE_WIDTH = sum(width for _, width in SAMPLE_LAYOUT)
+
+
+class PMSWindowAggregator:
+    def __init__(self, capacity=64, trim_fraction=0.1):
+        if not 0.0 <= trim_fraction < 0.5:
+            raise ValueError(f"trim_fraction must be in [0, 0.5), got {trim_fraction}")
+        self.trim_fraction = float(trim_fraction)
+        self.frames = np.empty((max(1, int(capacity)), SAMPLE_WIDTH), dtype=np.uint16)
+        self.frame_count = 0
+        self.checksum_failures = 0
+
+    def reset(self):
+        self.frame_count = 0
+        self.checksum_failures = 0
+
+    def add(self, sample):
+        if self.frame_count == len(self.frames):
+            self.frames = np.concatenate([self.frames, np.empty_like(self.frames)])
+        row = self.frames[self.frame_count]
+        offset = 0
+        for key, width in SAMPLE_LAYOUT:
+            row[offset : offset + width] = sample[key]
+            offset += width
+        self.frame_count += 1
+
+    def statistics(self):
+        n = self.frame_count
+        if n == 0:
+            raise RuntimeError("no PMS5003 frames in aggregation window")
+
+        # One sort per window serves median and trimmed mean; mean comes from the same array.
+        window = np.sort(self.frames[:n], axis=0).astype(float)
+        trim = int(n * self.trim_fraction)
+        return {
+            "mean": window.mean(axis=0),
+            "median": 0.5 * (window[(n - 1) // 2] + window[n // 2]),
+            "trimmed_mean": window[trim : n - trim].mean(axis=0),
+            "frame_count": n,
+            "checksum_failures": int(self.checksum_failures),
+        }
+
+    def summarize(self, method="trimmed_mean"):
+        if method not in AGGREGATE_METHODS:
+            raise ValueError(f"Unsupported aggregate method {method!r}. Allowed: {AGGREGATE_METHODS}")
+        stats = self.statistics()
+        values = np.rint(stats[method]).astype(int).tolist()
+        data = {}
+        offset = 0
+        for key, width in SAMPLE_LAYOUT:
+            data[key] = values[offset : offset + width]
+            offset += width
+        data["frame_count"] = stats["frame_count"]
+        data["checksum_failures"] = stats["checksum_failures"]
+        return data
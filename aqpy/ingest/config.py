@@ -1,7 +1,8 @@
 import os
 from dataclasses import dataclass
 
-from aqpy.common.env import env_int
+from aqpy.common.env import env_flag, env_int
+from aqpy.ingest.aggregation import AGGREGATE_METHODS
 
 
 def env_hex_int(name, default):
@@ -18,24 +19,40 @@ class IngestConfig:
     serial_baud: int
     pms_startup_delay: int
     pms_avg_time: int
+    pms_agg_method: str
+    pms_persist_quality: bool
     sleep_seconds: int
     bme_i2c_port: int
     bme_i2c_addr: int
     db_name_pms: str
     db_name_bme: str
     log_level: str
+    metrics_textfile: str
+    metrics_port: int
+    metrics_host: str
 
 
 def load_config():
+    # Checked here so a typo fails at startup instead of silently disabling PMS ingest.
+    pms_agg_method = os.getenv("AQPY_PMS_AGG_METHOD", "trimmed_mean").lower()
+    if pms_agg_method not in AGGREGATE_METHODS:
+        raise ValueError(
+            f"Unsupported AQPY_PMS_AGG_METHOD {pms_agg_method!r}. Allowed: {AGGREGATE_METHODS}"
+        )
     return IngestConfig(
         serial_port=os.getenv("AQPY_SERIAL_PORT", "/dev/serial0"),
         serial_baud=env_int("AQPY_SERIAL_BAUD", 9600),
         pms_startup_delay=env_int("AQPY_PMS_STARTUP_DELAY", 20),
         pms_avg_time=env_int("AQPY_PMS_AVG_TIME", 10),
+        pms_agg_method=pms_agg_method,
+        pms_persist_quality=env_flag("AQPY_PMS_PERSIST_QUALITY", False),
         sleep_seconds=env_int("AQPY_SLEEP_SECONDS", 30),
         bme_i2c_port=env_int("AQPY_BME_I2C_PORT", 1),
         bme_i2c_addr=env_hex_int("AQPY_BME_I2C_ADDR", 0x76),
         db_name_pms=os.getenv("AQPY_DB_NAME_PMS", "pms"),
         db_name_bme=os.getenv("AQPY_DB_NAME_BME", "bme"),
         log_level=os.getenv("AQPY_LOG_LEVEL", "INFO").upper(),
+        metrics_textfile=os.getenv("AQPY_METRICS_TEXTFILE", ""),
+        metrics_port=env_int("AQPY_METRICS_PORT", 0),
+        metrics_host=os.getenv("AQPY_METRICS_HOST", "127.0.0.1"),
     )
@@ -1,12 +1,17 @@
 from typing import Protocol, TypedDict
 
 
-class PMSData(TypedDict):
+class _PMSSample(TypedDict):
     pm_st: list[int]
     pm_en: list[int]
     hist: list[int]
 
 
+class PMSData(_PMSSample, total=False):
+    frame_count: int
+    checksum_failures: int
+
+
 class ClimateReading(Protocol):
     temperature: float
     humidity: float
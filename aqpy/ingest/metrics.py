@@ -0,0 +1,156 @@
+import os
+import pathlib
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0)
+
+METRIC_HELP = {
+    "aqpy_ingest_cycle_seconds": "Wall time of one ingest cycle across all tasks.",
+    "aqpy_ingest_cycles_total": "Ingest cycles completed.",
+    "aqpy_ingest_task_seconds": "Wall time of one ingest task run (sensor read + DB write).",
+    "aqpy_ingest_task_runs_total": "Ingest task runs by outcome.",
+    "aqpy_ingest_task_last_success_timestamp_seconds": "Unix time of the last successful task run.",
+    "aqpy_ingest_repository_seconds": "Wall time of one ingest repository call.",
+    "aqpy_ingest_repository_errors_total": "Ingest repository calls that raised.",
+    "aqpy_pms_frames_total": "Valid PMS5003 frames aggregated into samples.",
+    "aqpy_pms_checksum_failures_total": "PMS5003 frames rejected by checksum.",
+    "aqpy_pms_frame_rate_hz": "Valid PMS5003 frames per second in the last averaging window.",
+}
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels)
+    if extra is not None:
+        items.append(extra)
+    if not items:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in items
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._kinds = {}
+        self._values = {}
+        self._histograms = {}
+
+    def _register(self, name, kind):
+        known = self._kinds.setdefault(name, kind)
+        if known != kind:
+            raise ValueError(f"Metric {name!r} already registered as {known}")
+
+    def inc(self, name, value=1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._register(name, "counter")
+            self._values[key] = self._values.get(key, 0.0) + float(value)
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._register(name, "gauge")
+            self._values[key] = float(value)
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        value = float(value)
+        with self._lock:
+            self._register(name, "histogram")
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist[0][i] += 1
+            hist[1] += value
+            hist[2] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self):
+        with self._lock:
+            kinds = dict(self._kinds)
+            values = dict(self._values)
+            histograms = {k: ([*v[0]], v[1], v[2]) for k, v in self._histograms.items()}
+
+        lines = []
+        for name in sorted(kinds):
+            kind = kinds[name]
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, bucket_count in zip(self.buckets, counts):
+                        lines.append(
+                            f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {bucket_count}"
+                        )
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+            else:
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def write_textfile(registry, path):
+    # node-exporter may read at any moment; write a sibling temp file and rename over the target.
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "w") as fh:
+            fh.write(registry.render())
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def start_http_server(registry, port, host="127.0.0.1"):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            return None
+
+    server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="aqpy-metrics", daemon=True)
+    thread.start()
+    return server
@@ -1,13 +1,79 @@
 import struct
 import time
 
+from aqpy.ingest.aggregation import AGGREGATE_METHODS, PMSWindowAggregator
+
+
+FRAME_HEADER = b"\x42\x4D"
+FRAME_LENGTH = 32
+CHECKSUM_OFFSET = FRAME_LENGTH - 2
+DATA_WORDS = 12
+
+
+def sample_from_words(words):
+    return {
+        "pm_st": list(words[0:3]),
+        "pm_en": list(words[3:6]),
+        "hist": list(words[6:12]),
+    }
+
+
+class PMSFrameParser:
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames_parsed = 0
+        self.checksum_failures = 0
+
+    def feed(self, data):
+        self.buffer.extend(data)
+
+    def clear(self):
+        del self.buffer[:]
+
+    def frames(self):
+        buf = self.buffer
+        while True:
+            idx = buf.find(FRAME_HEADER)
+            if idx < 0:
+                # Keep a trailing first header byte; its pair may be in the next chunk.
+                keep = 1 if buf[-1:] == FRAME_HEADER[:1] else 0
+                del buf[: len(buf) - keep]
+                return
+            if len(buf) - idx < FRAME_LENGTH:
+                del buf[:idx]
+                return
+
+            with memoryview(buf) as view:
+                frame = view[idx : idx + FRAME_LENGTH]
+                checksum = sum(frame[:CHECKSUM_OFFSET])
+                expected = int.from_bytes(frame[CHECKSUM_OFFSET:], "big")
+                frame.release()
+            if checksum != expected:
+                # A real header may start inside the corrupted frame; resume just past this one.
+                self.checksum_failures += 1
+                del buf[: idx + 1]
+                continue
+
+            words = struct.unpack_from(">%dH" % DATA_WORDS, buf, idx + 4)
+            del buf[: idx + FRAME_LENGTH]
+            self.frames_parsed += 1
+            yield words
+
 
 class PMS5003:
-    def __init__(self, serial_conn, startup_delay):
+    def __init__(self, serial_conn, startup_delay, aggregate_method="trimmed_mean", trim_fraction=0.1):
+        if aggregate_method not in AGGREGATE_METHODS:
+            raise ValueError(
+                f"Unsupported PMS5003 aggregate method {aggregate_method!r}. "
+                f"Allowed: {AGGREGATE_METHODS}"
+            )
         self.serial = serial_conn
         self.startup_delay = startup_delay
         self.cmd_delay = 0.5
         self.timeout = 5
+        self.aggregate_method = aggregate_method
+        self.parser = PMSFrameParser()
+        self.aggregator = PMSWindowAggregator(trim_fraction=trim_fraction)
 
         self.wake()
         self.set_active()
@@ -31,43 +97,14 @@ class PMS5003:
 
     def read(self):
         deadline = time.time() + self.timeout
-        found_first = False
         while time.time() < deadline:
-            b = self.serial.read(1)
-            if len(b) == 0:
-                continue
-
-            byte = b[0]
-            if not found_first:
-                if byte == 0x42:
-                    found_first = True
-                continue
-
-            if byte == 0x42:
-                # Keep searching while treating this as a new potential first byte.
-                found_first = True
-                continue
+            for words in self.parser.frames():
+                return sample_from_words(words)
 
-            if byte != 0x4D:
-                found_first = False
-                continue
-
-            payload = self.serial.read(30)
-            if len(payload) != 30:
-                found_first = False
-                continue
-
-            parsed = struct.unpack(">15H", payload)
-            checksum = sum(payload[:-2]) + 0x42 + 0x4D
-            if checksum != parsed[-1]:
-                found_first = False
-                continue
-
-            return {
-                "pm_st": list(parsed[1:4]),
-                "pm_en": list(parsed[4:7]),
-                "hist": list(parsed[7:13]),
-            }
+            # Block for at least one byte, then take whatever else is already waiting.
+            chunk = self.serial.read(max(1, self.serial.in_waiting))
+            if chunk:
+                self.parser.feed(chunk)
 
         raise RuntimeError("valid PMS5003 frame not found before timeout")
 
@@ -76,37 +113,29 @@ class PMS5003:
         if self.status == "ASLEEP":
             self.wake()
 
+        self.aggregator.reset()
+        failures_before = self.parser.checksum_failures
         start = time.time()
-        count = 0
-        data = None
         while time.time() - start < avg_time:
             try:
                 sample = self.read()
             except RuntimeError:
                 continue
+            self.aggregator.add(sample)
+        self.aggregator.checksum_failures = self.parser.checksum_failures - failures_before
 
-            if data is None:
-                data = sample
-            else:
-                for key, values in data.items():
-                    for idx in range(len(values)):
-                        data[key][idx] += sample[key][idx]
-            count += 1
-
-        if count == 0:
+        if self.aggregator.frame_count == 0:
             raise RuntimeError("no valid PMS5003 frames collected during averaging window")
 
-        for key, values in data.items():
-            for idx in range(len(values)):
-                data[key][idx] = int(round(float(values[idx]) / count))
-
+        data = self.aggregator.summarize(self.aggregate_method)
         if prev_status == "ASLEEP":
             self.sleep()
         return data
 
     def drain_buffer(self):
         while self.serial.in_waiting > 0:
-            self.serial.read()
+            self.serial.read(self.serial.in_waiting)
+        self.parser.clear()
 
     def close(self):
         self.serial.close()
@@ -12,6 +12,17 @@ INSERT INTO pi (
 )
 """
 
+INSERT_PMS_WITH_QUALITY = """
+INSERT INTO pi (
+    t, pm10_st, pm25_st, pm100_st,
+    pm10_en, pm25_en, pm100_en,
+    p1, p2, p3, p4, p5, p6,
+    frame_count, checksum_failures
+) VALUES (
+    now(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+)
+"""
+
 INSERT_BME = """
 INSERT INTO pi (t, temperature, humidity, pressure)
 VALUES (now(), %s, %s, %s)
@@ -19,7 +30,8 @@ VALUES (now(), %s, %s, %s)
 
 
 class PostgresIngestRepository:
-    def __init__(self, pms_database, bme_database):
+    def __init__(self, pms_database, bme_database, persist_pms_quality=False):
+        self.persist_pms_quality = persist_pms_quality
         self.conn_pms = connect_db(pms_database)
         self.conn_pms.autocommit = True
         self.cur_pms = self.conn_pms.cursor()
@@ -29,23 +41,27 @@ class PostgresIngestRepository:
         self.cur_bme = self.conn_bme.cursor()
 
     def insert_pms_sample(self, pms_data: PMSData):
-        self.cur_pms.execute(
-            INSERT_PMS,
-            (
-                pms_data["pm_st"][0],
-                pms_data["pm_st"][1],
-                pms_data["pm_st"][2],
-                pms_data["pm_en"][0],
-                pms_data["pm_en"][1],
-                pms_data["pm_en"][2],
-                pms_data["hist"][0],
-                pms_data["hist"][1],
-                pms_data["hist"][2],
-                pms_data["hist"][3],
-                pms_data["hist"][4],
-                pms_data["hist"][5],
-            ),
+        params = (
+            pms_data["pm_st"][0],
+            pms_data["pm_st"][1],
+            pms_data["pm_st"][2],
+            pms_data["pm_en"][0],
+            pms_data["pm_en"][1],
+            pms_data["pm_en"][2],
+            pms_data["hist"][0],
+            pms_data["hist"][1],
+            pms_data["hist"][2],
+            pms_data["hist"][3],
+            pms_data["hist"][4],
+            pms_data["hist"][5],
         )
+        if self.persist_pms_quality:
+            self.cur_pms.execute(
+                INSERT_PMS_WITH_QUALITY,
+                params + (pms_data.get("frame_count"), pms_data.get("checksum_failures")),
+            )
+        else:
+            self.cur_pms.execute(INSERT_PMS, params)
 
     def insert_bme_sample(self, bme_data: ClimateReading):
         self.cur_bme.execute(
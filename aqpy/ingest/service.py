@@ -1,7 +1,7 @@
 import logging
 import time
-from dataclasses import dataclass
-from typing import Sequence
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
 
 from aqpy.ingest.config import load_config
 from aqpy.ingest.interfaces import (
@@ -10,16 +10,21 @@ from aqpy.ingest.interfaces import (
     IngestTask,
     ParticleSensor,
 )
+from aqpy.ingest.metrics import MetricsRegistry, start_http_server, write_textfile
 from aqpy.ingest.pms5003 import PMS5003
 
 
 logger = logging.getLogger(__name__)
 
 
-def _build_repository(db_name_pms, db_name_bme):
+def _build_repository(db_name_pms, db_name_bme, persist_pms_quality=False):
     from aqpy.ingest.repository import PostgresIngestRepository
 
-    return PostgresIngestRepository(db_name_pms, db_name_bme)
+    return PostgresIngestRepository(
+        db_name_pms,
+        db_name_bme,
+        persist_pms_quality=persist_pms_quality,
+    )
 
 
 def _open_serial(port, baudrate, timeout):
@@ -45,15 +50,45 @@ class BME280Sensor:
         self.bus.close()
 
 
+@dataclass
+class InstrumentedRepository:
+    repository: IngestRepository
+    metrics: MetricsRegistry
+
+    def _call(self, call, *args):
+        try:
+            with self.metrics.timer("aqpy_ingest_repository_seconds", call=call):
+                return getattr(self.repository, call)(*args)
+        except Exception:
+            self.metrics.inc("aqpy_ingest_repository_errors_total", call=call)
+            raise
+
+    def insert_pms_sample(self, pms_data):
+        return self._call("insert_pms_sample", pms_data)
+
+    def insert_bme_sample(self, bme_data):
+        return self._call("insert_bme_sample", bme_data)
+
+    def close(self):
+        self.repository.close()
+
+
 @dataclass
 class PMSIngestTask:
     name: str
     particle_sensor: ParticleSensor
     repository: IngestRepository
     pms_avg_time: int
+    metrics: MetricsRegistry = field(default_factory=MetricsRegistry)
 
     def run_once(self):
         data = self.particle_sensor.averaged_read(self.pms_avg_time)
+        frame_count = data.get("frame_count")
+        if frame_count is not None:
+            self.metrics.inc("aqpy_pms_frames_total", frame_count)
+            self.metrics.inc("aqpy_pms_checksum_failures_total", data.get("checksum_failures", 0))
+            if self.pms_avg_time > 0:
+                self.metrics.set("aqpy_pms_frame_rate_hz", frame_count / self.pms_avg_time)
         self.repository.insert_pms_sample(data)
         return True
 
@@ -91,21 +126,61 @@ class AQIngestService:
     tasks: Sequence[IngestTask]
     repository: IngestRepository
     sleep_seconds: int
+    metrics: MetricsRegistry = field(default_factory=MetricsRegistry)
+    metrics_textfile: str = ""
+    metrics_port: int = 0
+    metrics_host: str = "127.0.0.1"
+    metrics_server: Optional[object] = None
 
     def run_cycle(self):
         result = {}
+        cycle_start = time.perf_counter()
         for task in self.tasks:
+            task_start = time.perf_counter()
             try:
                 result[task.name] = task.run_once()
             except Exception:
                 logger.exception("%s sample failed", task.name.upper())
                 result[task.name] = False
+            self.metrics.observe(
+                "aqpy_ingest_task_seconds", time.perf_counter() - task_start, task=task.name
+            )
+            status = "ok" if result[task.name] else "error"
+            self.metrics.inc("aqpy_ingest_task_runs_total", task=task.name, status=status)
+            if result[task.name]:
+                self.metrics.set(
+                    "aqpy_ingest_task_last_success_timestamp_seconds", time.time(), task=task.name
+                )
+        self.metrics.observe("aqpy_ingest_cycle_seconds", time.perf_counter() - cycle_start)
+        self.metrics.inc("aqpy_ingest_cycles_total")
         return result
 
+    def export_metrics(self):
+        if not self.metrics_textfile:
+            return
+        try:
+            write_textfile(self.metrics, self.metrics_textfile)
+        except Exception:
+            logger.exception("Failed to write metrics textfile %s", self.metrics_textfile)
+
+    def start_metrics_server(self):
+        if self.metrics_port <= 0 or self.metrics_server is not None:
+            return
+        try:
+            self.metrics_server = start_http_server(
+                self.metrics, self.metrics_port, host=self.metrics_host
+            )
+        except Exception:
+            logger.exception("Failed to start metrics endpoint on port %s", self.metrics_port)
+        else:
+            logger.info("Serving ingest metrics on %s:%s", self.metrics_host, self.metrics_port)
+
     def run_forever(self, max_cycles=None):
+        self.start_metrics_server()
         cycles = 0
         while max_cycles is None or cycles < max_cycles:
             cycle_result = self.run_cycle()
+            self.export_metrics()
             ok_count = sum(1 for v in cycle_result.values() if v)
             if ok_count > 0:
                 logger.info("Recorded sensor sample %s", cycle_result)
@@ -125,6 +200,13 @@ class AQIngestService:
             self.repository.close()
         except Exception:
             pass
+        if self.metrics_server is not None:
+            try:
+                self.metrics_server.shutdown()
+                self.metrics_server.server_close()
+            except Exception:
+                pass
+            self.metrics_server = None
 
 
 @dataclass
@@ -194,10 +276,16 @@ class LegacyAQIngestService:
 
 def build_default_service():
     config = load_config()
+    metrics = MetricsRegistry()
     repository = None
     tasks = []
     try:
-        repository = _build_repository(config.db_name_pms, config.db_name_bme)
+        repository = _build_repository(
+            config.db_name_pms,
+            config.db_name_bme,
+            persist_pms_quality=config.pms_persist_quality,
+        )
+        instrumented = InstrumentedRepository(repository=repository, metrics=metrics)
 
         serial_conn = None
         pms = None
@@ -207,7 +295,11 @@ def build_default_service():
                 baudrate=config.serial_baud,
                 timeout=1,
             )
-            pms = PMS5003(serial_conn, startup_delay=config.pms_startup_delay)
+            pms = PMS5003(
+                serial_conn,
+                startup_delay=config.pms_startup_delay,
+                aggregate_method=config.pms_agg_method,
+            )
             pms.sleep()
         except Exception:
             logger.exception("PMS5003 init failed; continuing with BME-only ingest")
@@ -226,8 +318,9 @@ def build_default_service():
                 PMSIngestTask(
                     name="pms",
                     particle_sensor=pms,
-                    repository=repository,
+                    repository=instrumented,
                     pms_avg_time=config.pms_avg_time,
+                    metrics=metrics,
                 )
             )
 
@@ -240,7 +333,7 @@ def build_default_service():
                 BMEIngestTask(
                     name="bme",
                     climate_sensor=bme_sensor,
-                    repository=repository,
+                    repository=instrumented,
                 )
             )
 
@@ -251,6 +344,10 @@ def build_default_service():
             tasks=tasks,
             repository=repository,
             sleep_seconds=config.sleep_seconds,
+            metrics=metrics,
+            metrics_textfile=config.metrics_textfile,
+            metrics_port=config.metrics_port,
+            metrics_host=config.metrics_host,
         )
     except Exception:
         if repository is not None:
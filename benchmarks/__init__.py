@@ -0,0 +1 @@
+"""Performance benchmarks for AQPy hot paths."""
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+
+import argparse
+import copy
+import datetime as dt
+import io
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if __package__ in (None, ""):
+    sys.path.insert(0, str(REPO_ROOT))
+
+from aqpy.common.db import set_connection_factory
+from aqpy.forecast.specs import filter_specs, load_model_specs
+from run_backfill_batch import backfill_specs
+from run_backtest_batch import backtest_specs
+from run_forecast_batch import forecast_specs
+from run_online_training_batch import train_specs
+
+
+SCHEMA_FILES = {
+    "bme": ["raw_schema_bme.sql", "forecast_schema.sql", "online_learning_schema.sql"],
+    "pms": [
+        "raw_schema_pms.sql",
+        "derived_schema_pms.sql",
+        "forecast_schema.sql",
+        "online_learning_schema.sql",
+    ],
+}
+RAW_COLUMNS = {
+    "bme": ["temperature", "humidity", "pressure"],
+    "pms": [
+        "pm10_st",
+        "pm25_st",
+        "pm100_st",
+        "pm10_en",
+        "pm25_en",
+        "pm100_en",
+        "p1",
+        "p2",
+        "p3",
+        "p4",
+        "p5",
+        "p6",
+    ],
+}
+
+
+class PipelineStats:
+    def __init__(self):
+        self.stage = "setup"
+        self.by_stage = {}
+
+    def _entry(self):
+        return self.by_stage.setdefault(
+            self.stage, {"round_trips": 0, "rows_read": 0, "rows_written": 0, "connections": 0}
+        )
+
+    def add(self, key, n=1):
+        self._entry()[key] += int(n)
+
+
+class CountingCursor:
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _count_written(self, statement):
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        if verb in {"INSERT", "UPDATE", "DELETE"} and self._cursor.rowcount > 0:
+            self._stats.add("rows_written", self._cursor.rowcount)
+
+    def execute(self, query, params=None):
+        self._stats.add("round_trips")
+        result = self._cursor.execute(query, params)
+        # execute_values sends pre-rendered bytes.
+        self._count_written(query.decode() if isinstance(query, bytes) else str(query))
+        return result
+
+    def executemany(self, query, params_seq):
+        params_seq = list(params_seq)
+        # psycopg2 sends one statement per parameter set.
+        self._stats.add("round_trips", len(params_seq))
+        result = self._cursor.executemany(query, params_seq)
+        verb = str(query).lstrip().split(None, 1)[0].upper()
+        if verb in {"INSERT", "UPDATE", "DELETE"}:
+            self._stats.add("rows_written", len(params_seq))
+        return result
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.add("rows_read")
+        return row
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.add("rows_read", len(rows))
+        return rows
+
+
+class CountingConnection:
+    def __init__(self, conn, stats):
+        self._conn = conn
+        self._stats = stats
+        stats.add("connections")
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._conn.cursor(*args, **kwargs), self._stats)
+
+    def commit(self):
+        self._stats.add("round_trips")
+        return self._conn.commit()
+
+    def rollback(self):
+        self._stats.add("round_trips")
+        return self._conn.rollback()
+
+
+def synthesize_rows(database, n_rows, cadence_seconds, end_ts, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_rows, dtype=float) * cadence_seconds
+    day = 24 * 3600.0
+    daily = np.sin(2 * np.pi * t / day)
+    columns = {}
+    if database == "bme":
+        columns["temperature"] = 68.0 + 8.0 * daily + rng.normal(0, 0.3, n_rows)
+        columns["humidity"] = 45.0 - 10.0 * daily + rng.normal(0, 1.0, n_rows)
+        columns["pressure"] = 1013.0 + 2.0 * np.sin(2 * np.pi * t / (3 * day)) + rng.normal(0, 0.2, n_rows)
+    else:
+        base = np.clip(8.0 + 5.0 * daily + rng.gamma(2.0, 1.5, n_rows), 0, None)
+        for i, col in enumerate(RAW_COLUMNS["pms"]):
+            scale = 1.0 + 0.3 * (i % 3)
+            columns[col] = np.rint(base * scale + rng.normal(0, 0.5, n_rows)).clip(0).astype(int)
+    start_ts = end_ts - dt.timedelta(seconds=cadence_seconds * (n_rows - 1))
+    timestamps = [start_ts + dt.timedelta(seconds=cadence_seconds * i) for i in range(n_rows)]
+    return timestamps, columns
+
+
+def load_synthetic_data(conn, database, timestamps, columns):
+    names = RAW_COLUMNS[database]
+    buf = io.StringIO()
+    for i, ts in enumerate(timestamps):
+        buf.write(ts.isoformat())
+        for name in names:
+            buf.write("\t")
+            buf.write(str(columns[name][i]))
+        buf.write("\n")
+    buf.seek(0)
+    with conn.cursor() as cur:
+        cur.copy_expert(f"COPY pi (t, {', '.join(names)}) FROM STDIN", buf)
+    conn.commit()
+
+
+def provision_databases(admin_dsn, prefix):
+    import psycopg2
+
+    names = {db: f"{prefix}_{db}" for db in SCHEMA_FILES}
+    admin = psycopg2.connect(admin_dsn)
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cur:
+            for name in names.values():
+                cur.execute(f"DROP DATABASE IF EXISTS {name}")
+                cur.execute(f"CREATE DATABASE {name}")
+    finally:
+        admin.close()
+    return names
+
+
+def drop_databases(admin_dsn, names):
+    import psycopg2
+
+    admin = psycopg2.connect(admin_dsn)
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cur:
+            for name in names.values():
+                cur.execute(f"DROP DATABASE IF EXISTS {name}")
+    finally:
+        admin.close()
+
+
+def _dsn_for(admin_dsn, database):
+    import psycopg2.extensions
+
+    params = psycopg2.extensions.parse_dsn(admin_dsn)
+    params["dbname"] = database
+    return psycopg2.extensions.make_dsn(**params)
+
+
+def _summarize_results(results):
+    counts = {}
+    for item in results:
+        status = item.get("status") or item.get("result", {}).get("status") or "ok"
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def run_pipeline(
+    admin_dsn,
+    specs,
+    days=3,
+    cadence_seconds=30,
+    cycles=1,
+    backfill_hours=48,
+    challenger_interval_minutes=0,
+    keep=False,
+    prefix=None,
+):
+    import psycopg2
+
+    prefix = prefix or f"aqpy_bench_{os.getpid()}"
+    stats = PipelineStats()
+    report = {"stages": [], "databases": {}}
+    names = provision_databases(admin_dsn, prefix)
+    previous_factory = None
+    try:
+        n_rows = int(days * 24 * 3600 // cadence_seconds)
+        end_ts = dt.datetime.now(dt.timezone.utc) - dt.timedelta(seconds=cadence_seconds)
+        for db, name in names.items():
+            conn = psycopg2.connect(_dsn_for(admin_dsn, name))
+            try:
+                start = time.perf_counter()
+                with conn.cursor() as cur:
+                    for filename in SCHEMA_FILES[db]:
+                        cur.execute((REPO_ROOT / "sql" / filename).read_text())
+                conn.commit()
+                schema_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                timestamps, columns = synthesize_rows(db, n_rows, cadence_seconds, end_ts)
+                load_synthetic_data(conn, db, timestamps, columns)
+                report["databases"][db] = {
+                    "database": name,
+                    "rows": n_rows,
+                    "schema_seconds": round(schema_seconds, 4),
+                    "load_seconds": round(time.perf_counter() - start, 4),
+                }
+            finally:
+                conn.close()
+
+        previous_factory = set_connection_factory(
+            lambda database: CountingConnection(
+                psycopg2.connect(_dsn_for(admin_dsn, names.get(database, database))), stats
+            )
+        )
+        with tempfile.TemporaryDirectory() as models_dir:
+            run_specs = []
+            for spec in specs:
+                spec = copy.deepcopy(spec)
+                spec["model_path"] = str(pathlib.Path(models_dir) / pathlib.Path(spec["model_path"]).name)
+                run_specs.append(spec)
+
+            stages = []
+            for cycle in range(1, cycles + 1):
+                stages.append((f"train_{cycle}", lambda: train_specs(run_specs)))
+                stages.append(
+                    (
+                        f"forecast_{cycle}",
+                        lambda: forecast_specs(
+                            run_specs, challenger_interval_minutes=challenger_interval_minutes
+                        ),
+                    )
+                )
+            stages.append(
+                ("backfill", lambda: backfill_specs(run_specs, backfill_hours=backfill_hours))
+            )
+            stages.append(("backtest", lambda: backtest_specs(run_specs, window_hours=backfill_hours)))
+            for stage_name, fn in stages:
+                stats.stage = stage_name
+                start = time.perf_counter()
+                results = fn()
+                wall = time.perf_counter() - start
+                counters = stats.by_stage.get(stage_name, {})
+                report["stages"].append(
+                    {
+                        "stage": stage_name,
+                        "wall_seconds": round(wall, 4),
+                        "specs": len(results),
+                        "statuses": _summarize_results(results),
+                        **counters,
+                    }
+                )
+    finally:
+        set_connection_factory(previous_factory)
+        if not keep:
+            drop_databases(admin_dsn, names)
+
+    report["total_wall_seconds"] = round(sum(s["wall_seconds"] for s in report["stages"]), 4)
+    return report
+
+
+def default_admin_dsn():
+    return os.getenv(
+        "AQPY_BENCH_ADMIN_DSN",
+        "dbname=postgres user={user} password={password} host={host} port={port}".format(
+            user=os.getenv("AQPY_DB_USER", "pi"),
+            password=os.getenv("AQPY_DB_PASSWORD", "rpi4"),
+            host=os.getenv("AQPY_DB_HOST", "localhost"),
+            port=os.getenv("AQPY_DB_PORT", "5432"),
+        ),
+    )
+
+
+def parse_csv(value):
+    if not value:
+        return []
+    return [x.strip() for x in value.split(",") if x.strip()]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=(
+            "End-to-end train/forecast/backfill/backtest benchmark against throwaway Postgres databases "
+            "loaded from sql/*.sql with synthetic sensor data."
+        )
+    )
+    parser.add_argument("--admin-dsn", default=default_admin_dsn())
+    parser.add_argument("--spec-file", default=str(REPO_ROOT / "configs" / "model_specs.json"))
+    parser.add_argument("--days", type=float, default=3.0)
+    parser.add_argument("--cadence-seconds", type=int, default=30)
+    parser.add_argument("--cycles", type=int, default=1)
+    parser.add_argument("--backfill-hours", type=int, default=48)
+    parser.add_argument("--models", default="")
+    parser.add_argument("--databases", default="")
+    parser.add_argument("--targets", default="")
+    parser.add_argument("--families", default="")
+    parser.add_argument("--challenger-interval-minutes", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark databases.")
+    parser.add_argument("--output", default="")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    specs = load_model_specs(args.spec_file)
+    specs = filter_specs(
+        specs,
+        model_names=parse_csv(args.models),
+        databases=parse_csv(args.databases),
+        targets=parse_csv(args.targets),
+        families=[x.lower() for x in parse_csv(args.families)],
+    )
+    report = run_pipeline(
+        admin_dsn=args.admin_dsn,
+        specs=specs,
+        days=args.days,
+        cadence_seconds=args.cadence_seconds,
+        cycles=args.cycles,
+        backfill_hours=args.backfill_hours,
+        challenger_interval_minutes=args.challenger_interval_minutes,
+        keep=args.keep,
+    )
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        pathlib.Path(args.output).write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from aqpy.forecast import adaptive_ar, model as linear_model, nn_model, rnn_lite
+from aqpy.forecast.features import build_ar_feature_matrix, build_feature_matrix
+
+
+DEFAULT_SIZES = (1000, 5000, 50000)
+LAGS = [1, 2, 3, 6, 12]
+HORIZON_STEPS = 12
+SEQ_LEN = 24
+CADENCE_SECONDS = 30
+
+
+def synthetic_series(n_rows, seed=0):
+    # Daily cycle + slow drift + noise at the ingest cadence, roughly temperature-shaped.
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_rows, dtype=float) * CADENCE_SECONDS
+    day = 24 * 3600.0
+    values = 68.0 + 8.0 * np.sin(2 * np.pi * t / day) + 0.5 * np.sin(2 * np.pi * t / (7 * day))
+    return values + rng.normal(0.0, 0.3, size=n_rows)
+
+
+def _time_call(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+
+def _artifact_roundtrip(artifact, directory, name):
+    path = pathlib.Path(directory) / f"{name}.json"
+    path.write_text(json.dumps(artifact, indent=2))
+    return json.loads(path.read_text())
+
+
+def build_cases(values, epochs, tmpdir):
+    # Cases are yielded in dependency order; later cases reuse fitted models from `state`.
+    state = {}
+    recent = values[-(max(LAGS) + 20) :].tolist()
+    recent_seq = values[-max(SEQ_LEN + 20, 50) :].tolist()
+
+    def features():
+        state["X"], state["y"] = build_feature_matrix(values, LAGS)
+
+    def ar_features():
+        state["X_ar"], state["y_ar"] = build_ar_feature_matrix(values, LAGS)
+
+    def train_mlp():
+        state["nn"] = nn_model.train_mlp_regressor(state["X"], state["y"], epochs=epochs)
+
+    def fit_linear():
+        state["linear"] = linear_model.fit_linear_regression(state["X"], state["y"])
+
+    def fit_rls():
+        state["ar"] = adaptive_ar.fit_recursive_least_squares(state["X_ar"], state["y_ar"])
+
+    def fit_gru():
+        state["rnn"] = rnn_lite.fit_gru_lite_head(values, seq_len=SEQ_LEN)
+
+    def rnn_sequences():
+        X_seq, _ = rnn_lite.build_sequence_dataset(values, seq_len=SEQ_LEN)
+        state["X_seq"] = X_seq
+
+    yield "features.build_feature_matrix", features
+    yield "features.build_ar_feature_matrix", ar_features
+    yield "nn_model.train_mlp_regressor", train_mlp
+    yield "nn_model.predict_batch", lambda: nn_model.predict_batch(state["nn"], state["X"])
+    yield "nn_model.recursive_predict", lambda: nn_model.recursive_predict(
+        state["nn"], recent, LAGS, HORIZON_STEPS
+    )
+    yield "model.fit_linear_regression", fit_linear
+    yield "model.recursive_predict", lambda: linear_model.recursive_predict(
+        recent, LAGS, state["linear"][0], state["linear"][1], HORIZON_STEPS
+    )
+    yield "adaptive_ar.fit_recursive_least_squares", fit_rls
+    yield "adaptive_ar.predict_batch", lambda: adaptive_ar.predict_batch(state["ar"], state["X_ar"])
+    yield "adaptive_ar.recursive_predict", lambda: adaptive_ar.recursive_predict(
+        state["ar"], recent, LAGS, HORIZON_STEPS
+    )
+    yield "rnn_lite.fit_gru_lite_head", fit_gru
+    yield "rnn_lite.build_sequence_dataset", rnn_sequences
+    yield "rnn_lite.predict_batch", lambda: rnn_lite.predict_batch(state["rnn"], state["X_seq"])
+    yield "rnn_lite.recursive_predict", lambda: rnn_lite.recursive_predict(
+        state["rnn"], recent_seq, HORIZON_STEPS
+    )
+    yield "artifact.roundtrip_nn", lambda: _artifact_roundtrip(state["nn"], tmpdir, "nn")
+    yield "artifact.roundtrip_ar", lambda: _artifact_roundtrip(state["ar"], tmpdir, "ar")
+    yield "artifact.roundtrip_rnn", lambda: _artifact_roundtrip(state["rnn"], tmpdir, "rnn")
+
+
+def run_suite(sizes=DEFAULT_SIZES, repeat=3, epochs=40, only=None, seed=0):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n_rows in sizes:
+            values = synthetic_series(n_rows, seed=seed)
+            for name, fn in build_cases(values, epochs, tmpdir):
+                # Setup-style cases always run so dependent cases have their inputs.
+                selected = not only or any(token in name for token in only)
+                _, timings = _time_call(fn, repeat if selected else 1)
+                if not selected:
+                    continue
+                results[f"{name}@{n_rows}"] = {
+                    "case": name,
+                    "rows": int(n_rows),
+                    "repeat": len(timings),
+                    "seconds_min": min(timings),
+                    "seconds_median": statistics.median(timings),
+                }
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "sizes": list(sizes),
+            "repeat": int(repeat),
+            "epochs": int(epochs),
+        },
+        "results": results,
+    }
+
+
+def compare_to_baseline(current, baseline, tolerance=0.25, min_delta_seconds=0.005):
+    regressions = []
+    improvements = []
+    for key, cur in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        delta = cur["seconds_min"] - base["seconds_min"]
+        ratio = cur["seconds_min"] / base["seconds_min"] if base["seconds_min"] > 0 else float("inf")
+        row = {
+            "key": key,
+            "baseline_seconds": base["seconds_min"],
+            "current_seconds": cur["seconds_min"],
+            "ratio": round(ratio, 3),
+        }
+        if ratio > 1.0 + tolerance and delta > min_delta_seconds:
+            regressions.append(row)
+        elif ratio < 1.0 - tolerance and -delta > min_delta_seconds:
+            improvements.append(row)
+    return {"regressions": regressions, "improvements": improvements}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark forecast hot paths on synthetic series (no database needed)."
+    )
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--only", default="", help="comma-separated substrings of case names")
+    parser.add_argument("--output", default="", help="write results JSON here as well as stdout")
+    parser.add_argument("--baseline", default="", help="baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    only = [x.strip() for x in args.only.split(",") if x.strip()]
+    report = run_suite(sizes=sizes, repeat=args.repeat, epochs=args.epochs, only=only)
+
+    exit_code = 0
+    if args.baseline:
+        baseline = json.loads(pathlib.Path(args.baseline).read_text())
+        report["comparison"] = compare_to_baseline(report, baseline, tolerance=args.tolerance)
+        if report["comparison"]["regressions"]:
+            exit_code = 1
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        pathlib.Path(args.output).write_text(text + "\n")
+    print(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+
+from aqpy.common.env import env_flag
+from aqpy.forecast.compaction import run_compaction
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Collapse duplicate predictions to the newest row per key and add the unique key."
+    )
+    parser.add_argument(
+        "--databases",
+        default=",".join(
+            [os.getenv("AQPY_DB_NAME_BME", "bme"), os.getenv("AQPY_DB_NAME_PMS", "pms")]
+        ),
+    )
+    parser.add_argument("--chunk-hours", type=int, default=24)
+    parser.add_argument(
+        "--keep-history",
+        action="store_true",
+        default=env_flag("AQPY_PREDICTIONS_KEEP_HISTORY"),
+        help="Move collapsed rows into predictions_history instead of deleting them.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {}
+    for database in [x.strip() for x in args.databases.split(",") if x.strip()]:
+        results[database] = run_compaction(
+            database=database,
+            chunk_hours=args.chunk_hours,
+            keep_history=args.keep_history,
+        )
+    print(json.dumps(results, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+
+from aqpy.common.env import env_int
+from aqpy.forecast.partitioning import run_partitioning
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Convert predictions to native range partitions (or a Timescale hypertable) on "
+            "predicted_for, or extend existing partitions."
+        )
+    )
+    parser.add_argument(
+        "--databases",
+        default=",".join(
+            [os.getenv("AQPY_DB_NAME_BME", "bme"), os.getenv("AQPY_DB_NAME_PMS", "pms")]
+        ),
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["native", "timescale"],
+        default=os.getenv("AQPY_PREDICTIONS_PARTITION_MODE", "native"),
+    )
+    parser.add_argument(
+        "--partition-days", type=int, default=env_int("AQPY_PREDICTIONS_PARTITION_DAYS", 7)
+    )
+    parser.add_argument("--ahead-days", type=int, default=env_int("AQPY_PARTITION_AHEAD_DAYS", 14))
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {}
+    for database in [x.strip() for x in args.databases.split(",") if x.strip()]:
+        results[database] = run_partitioning(
+            database=database,
+            mode=args.mode,
+            interval_days=args.partition_days,
+            ahead_days=args.ahead_days,
+        )
+    print(json.dumps(results, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -28,18 +28,18 @@ def parse_args():
     return parser.parse_args()
 
 
-def main():
-    args = parse_args()
-    specs = load_model_specs(args.spec_file)
-    specs = filter_specs(
-        specs,
-        model_names=parse_csv(args.models),
-        databases=parse_csv(args.databases),
-        targets=parse_csv(args.targets),
-        families=[x.lower() for x in parse_csv(args.families)],
-    )
+def backfill_specs(specs, backfill_hours=48, replace_existing=True):
     results = []
     for spec in specs:
+        if spec["model_type"] == "ensemble":
+            results.append(
+                {
+                    "model_name": spec["model_name"],
+                    "status": "skipped",
+                    "reason": "ensemble has no backfill of its own",
+                }
+            )
+            continue
         model_path = pathlib.Path(spec["model_path"])
         if not model_path.exists():
             results.append(
@@ -53,9 +53,9 @@ def main():
         try:
             res = run_backfill(
                 model_path=str(model_path),
-                backfill_hours=args.backfill_hours,
+                backfill_hours=backfill_hours,
                 database_override=spec["database"],
-                replace_existing=not args.append,
+                replace_existing=replace_existing,
             )
             results.append({"model_name": spec["model_name"], "result": res})
         except Exception as exc:
@@ -66,6 +66,24 @@ def main():
                     "error": str(exc),
                 }
             )
+    return results
+
+
+def main():
+    args = parse_args()
+    specs = load_model_specs(args.spec_file)
+    specs = filter_specs(
+        specs,
+        model_names=parse_csv(args.models),
+        databases=parse_csv(args.databases),
+        targets=parse_csv(args.targets),
+        families=[x.lower() for x in parse_csv(args.families)],
+    )
+    results = backfill_specs(
+        specs,
+        backfill_hours=args.backfill_hours,
+        replace_existing=not args.append,
+    )
     print(json.dumps(results, indent=2, default=str))
 
 
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import pathlib
+
+from aqpy.forecast.backtest import run_backtest
+from aqpy.forecast.specs import filter_specs, load_model_specs
+
+
+def parse_csv(value):
+    if not value:
+        return []
+    return [x.strip() for x in value.split(",") if x.strip()]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Rolling-origin backtest of trained model artifacts across model specs."
+    )
+    parser.add_argument("--spec-file", default="configs/model_specs.json")
+    parser.add_argument("--models", default="")
+    parser.add_argument("--databases", default="")
+    parser.add_argument("--targets", default="")
+    parser.add_argument("--families", default="")
+    parser.add_argument("--window-hours", type=int, default=24)
+    parser.add_argument("--horizon-steps", type=int, default=0)
+    parser.add_argument("--max-origins", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Print metrics without writing backtest_metrics.")
+    return parser.parse_args()
+
+
+def backtest_specs(specs, window_hours=24, horizon_steps=0, max_origins=500, write=True):
+    results = []
+    for spec in specs:
+        if spec["model_type"] == "ensemble":
+            results.append(
+                {
+                    "model_name": spec["model_name"],
+                    "status": "skipped",
+                    "reason": "ensemble has no backtest of its own",
+                }
+            )
+            continue
+        model_path = pathlib.Path(spec["model_path"])
+        if not model_path.exists():
+            results.append(
+                {
+                    "model_name": spec["model_name"],
+                    "status": "skipped",
+                    "reason": f"model not found: {model_path}",
+                }
+            )
+            continue
+        horizon = (
+            horizon_steps
+            if horizon_steps > 0
+            else int(spec.get("forecast_horizon_steps", 12))
+        )
+        try:
+            res = run_backtest(
+                model_path=str(model_path),
+                window_hours=window_hours,
+                horizon_steps=horizon,
+                max_origins=max_origins,
+                database_override=spec["database"],
+                write=write,
+            )
+            results.append({"model_name": spec["model_name"], "result": res})
+        except Exception as exc:
+            results.append(
+                {
+                    "model_name": spec["model_name"],
+                    "status": "failed",
+                    "error": str(exc),
+                }
+            )
+    return results
+
+
+def main():
+    args = parse_args()
+    specs = load_model_specs(args.spec_file)
+    specs = filter_specs(
+        specs,
+        model_names=parse_csv(args.models),
+        databases=parse_csv(args.databases),
+        targets=parse_csv(args.targets),
+        families=[x.lower() for x in parse_csv(args.families)],
+    )
+    results = backtest_specs(
+        specs,
+        window_hours=args.window_hours,
+        horizon_steps=args.horizon_steps,
+        max_origins=args.max_origins,
+        write=not args.dry_run,
+    )
+    print(json.dumps(results, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
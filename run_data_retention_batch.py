@@ -61,6 +61,12 @@ def parse_args():
         type=int,
         default=env_int("AQPY_RETENTION_SAFETY_HOURS_PREDICTIONS", 0),
     )
+    parser.add_argument(
+        "--partition-ahead-days",
+        type=int,
+        default=env_int("AQPY_PARTITION_AHEAD_DAYS", 14),
+        help="Create partitions this far ahead on natively partitioned tables.",
+    )
     args = parser.parse_args()
     if args.retention_days is not None:
         args.raw_retention_days = args.retention_days
@@ -99,15 +105,17 @@ def collect_retention_sources(
         }
 
     for db in sorted(databases):
-        key = (db, "predictions", "predicted_for", "predictions")
-        unique_sources[key] = {
-            "database": db,
-            "table": "predictions",
-            "time_col": "predicted_for",
-            "retention_days": pred_retention_days,
-            "safety_hours": pred_safety_hours,
-            "use_training_watermark": False,
-        }
+        # Replaced forecasts archived by AQPY_PREDICTIONS_KEEP_HISTORY age out with the live ones.
+        for table in ("predictions", "predictions_history"):
+            key = (db, table, "predicted_for", "predictions")
+            unique_sources[key] = {
+                "database": db,
+                "table": table,
+                "time_col": "predicted_for",
+                "retention_days": pred_retention_days,
+                "safety_hours": pred_safety_hours,
+                "use_training_watermark": False,
+            }
 
     return list(unique_sources.values()), skipped_sources
 
@@ -143,6 +151,7 @@ def main():
                 retention_days=source["retention_days"],
                 safety_hours=source["safety_hours"],
                 use_training_watermark=source["use_training_watermark"],
+                partition_ahead_days=args.partition_ahead_days,
             )
             results.append(
                 {
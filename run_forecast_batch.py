@@ -4,7 +4,11 @@ import argparse
 import json
 import pathlib
 
-from aqpy.forecast.inference import run_inference
+from aqpy.common.env import env_int
+from aqpy.forecast.champion import plan_forecasts
+from aqpy.forecast.coordination import open_forecast_gates
+from aqpy.forecast.ensemble import run_ensemble
+from aqpy.forecast.inference import UNCHANGED_REASON, run_inference
 from aqpy.forecast.specs import filter_specs, load_model_specs
 
 
@@ -24,52 +28,180 @@ def parse_args():
     parser.add_argument("--targets", default="")
     parser.add_argument("--families", default="")
     parser.add_argument("--horizon-steps", type=int, default=0)
+    parser.add_argument(
+        "--challenger-interval-minutes",
+        type=int,
+        default=env_int("AQPY_CHALLENGER_INTERVAL_MINUTES", 0),
+        help="Forecast every run only with each target's champion; run the others at most this often. 0 runs all.",
+    )
+    parser.add_argument(
+        "--champion-window",
+        type=int,
+        default=env_int("AQPY_CHAMPION_WINDOW", 6),
+        help="Recent online_training_metrics rows per model averaged to rank champions.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Forecast even when no source row arrived since a model's last forecast.",
+    )
     return parser.parse_args()
 
 
+def forecast_specs(
+    specs,
+    horizon_steps=0,
+    challenger_interval_minutes=0,
+    champion_window=6,
+    ranking_specs=None,
+    force=False,
+):
+    # ranking_specs lets a filtered run (e.g. one family) still rank against every spec for its targets.
+    plan = {}
+    if challenger_interval_minutes > 0 and specs:
+        plan = plan_forecasts(
+            ranking_specs or specs,
+            challenger_interval_minutes,
+            n_recent=champion_window,
+        )
+
+    results = {}
+    member_forecasts = {}
+    # Newest source timestamp per table, probed once and shared by every spec on it.
+    source_cache = {}
+    # Ensembles blend the member forecasts made earlier in this same loop, so they go last.
+    ordered = sorted(specs, key=lambda spec: spec["model_type"] == "ensemble")
+    # Training batches on the same databases hold back while these are open.
+    gates = open_forecast_gates({spec["database"] for spec in specs})
+    try:
+        for spec in ordered:
+            entry = plan.get(spec["model_name"], {})
+            if entry and not entry["due"]:
+                results[id(spec)] = {
+                    "model_name": spec["model_name"],
+                    "status": "skipped",
+                    "role": entry["role"],
+                    "reason": "challenger not due",
+                }
+                continue
+            if spec["model_type"] == "ensemble":
+                _refresh_unchanged_members(
+                    spec, specs, results, horizon_steps, member_forecasts, source_cache
+                )
+            row = _forecast_spec(spec, horizon_steps, member_forecasts, source_cache, force)
+            if entry:
+                row["role"] = entry["role"]
+            results[id(spec)] = row
+    finally:
+        for conn in gates:
+            conn.close()
+    return [results[id(spec)] for spec in specs]
+
+
+def _refresh_unchanged_members(spec, specs, results, horizon_steps, member_forecasts, source_cache):
+    # A retrained member forecasts while its siblings skip as unchanged; blending that one
+    # forecast alone would overwrite the full blend, so the skipped siblings forecast too.
+    members = set(spec["members"])
+    if not members & set(member_forecasts):
+        return
+    for member in specs:
+        name = member["model_name"]
+        if name not in members or name in member_forecasts or id(member) not in results:
+            continue
+        if results[id(member)].get("result", {}).get("reason") != UNCHANGED_REASON:
+            continue
+        row = _forecast_spec(member, horizon_steps, member_forecasts, source_cache, True)
+        if "role" in results[id(member)]:
+            row["role"] = results[id(member)]["role"]
+        results[id(member)] = row
+
+
+def _forecast_spec(spec, horizon_steps, member_forecasts, source_cache, force):
+    horizon = (
+        horizon_steps
+        if horizon_steps > 0
+        else int(spec.get("forecast_horizon_steps", 12))
+    )
+    if spec["model_type"] == "ensemble":
+        try:
+            res = run_ensemble(spec, member_forecasts, horizon_steps=horizon)
+            return {"model_name": spec["model_name"], "result": res}
+        except Exception as exc:
+            return {"model_name": spec["model_name"], "status": "failed", "error": str(exc)}
+
+    model_path = pathlib.Path(spec["model_path"])
+    if not model_path.exists():
+        return {
+            "model_name": spec["model_name"],
+            "status": "skipped",
+            "reason": f"model not found: {model_path}",
+        }
+    try:
+        res = run_inference(
+            model_path=str(model_path),
+            horizon_steps=horizon,
+            database_override=spec["database"],
+            skip_unchanged=not force,
+            source_cache=source_cache,
+        )
+        if "forecast" in res:
+            member_forecasts[spec["model_name"]] = res.pop("forecast")
+        return {"model_name": spec["model_name"], "result": res}
+    except Exception as exc:
+        return {
+            "model_name": spec["model_name"],
+            "status": "failed",
+            "error": str(exc),
+        }
+
+
+def summarize_forecasts(results):
+    summary = {
+        "specs": len(results),
+        "forecast": 0,
+        "skipped": 0,
+        "failed": 0,
+        "inserted": 0,
+        "skip_reasons": {},
+    }
+    for item in results:
+        res = item.get("result", {})
+        status = item.get("status") or res.get("status") or "ok"
+        if status == "skipped":
+            reason = item.get("reason") or res.get("reason", "")
+            summary["skip_reasons"][reason] = summary["skip_reasons"].get(reason, 0) + 1
+            summary["skipped"] += 1
+        elif status == "failed":
+            summary["failed"] += 1
+        else:
+            summary["forecast"] += 1
+            summary["inserted"] += int(res.get("inserted", 0))
+    return summary
+
+
 def main():
     args = parse_args()
-    specs = load_model_specs(args.spec_file)
+    all_specs = load_model_specs(args.spec_file)
     specs = filter_specs(
-        specs,
+        all_specs,
         model_names=parse_csv(args.models),
         databases=parse_csv(args.databases),
         targets=parse_csv(args.targets),
         families=[x.lower() for x in parse_csv(args.families)],
     )
-    results = []
-    for spec in specs:
-        model_path = pathlib.Path(spec["model_path"])
-        if not model_path.exists():
-            results.append(
-                {
-                    "model_name": spec["model_name"],
-                    "status": "skipped",
-                    "reason": f"model not found: {model_path}",
-                }
-            )
-            continue
-        horizon = (
-            args.horizon_steps
-            if args.horizon_steps > 0
-            else int(spec.get("forecast_horizon_steps", 12))
+    results = forecast_specs(
+        specs,
+        horizon_steps=args.horizon_steps,
+        challenger_interval_minutes=args.challenger_interval_minutes,
+        champion_window=args.champion_window,
+        ranking_specs=[s for s in all_specs if s["database"] in {x["database"] for x in specs}],
+        force=args.force,
+    )
+    print(
+        json.dumps(
+            {"summary": summarize_forecasts(results), "results": results}, indent=2, default=str
         )
-        try:
-            res = run_inference(
-                model_path=str(model_path),
-                horizon_steps=horizon,
-                database_override=spec["database"],
-            )
-            results.append({"model_name": spec["model_name"], "result": res})
-        except Exception as exc:
-            results.append(
-                {
-                    "model_name": spec["model_name"],
-                    "status": "failed",
-                    "error": str(exc),
-                }
-            )
-    print(json.dumps(results, indent=2, default=str))
+    )
 
 
 if __name__ == "__main__":
@@ -37,6 +37,40 @@ def parse_args():
     parser.add_argument("--ar-delta", type=float, default=100.0)
     parser.add_argument("--rnn-ridge", type=float, default=1e-3)
     parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument(
+        "--early-stopping-patience",
+        type=int,
+        default=5,
+        help="Stop nn_mlp training after this many epochs without improvement (0 disables).",
+    )
+    parser.add_argument("--validation-fraction", type=float, default=0.1)
+    parser.add_argument("--optimizer", choices=["sgd", "momentum", "adam"], default="sgd")
+    parser.add_argument(
+        "--precision",
+        choices=["float64", "float32"],
+        default=None,
+        help="Compute precision for nn/rnn (default: AQPY_FORECAST_PRECISION or float64).",
+    )
+    parser.add_argument(
+        "--direct-horizon-steps",
+        type=int,
+        default=0,
+        help="nn_mlp/adaptive_ar: learn one output per horizon step instead of recursive feeding.",
+    )
+    parser.add_argument(
+        "--encoder-epochs",
+        type=int,
+        default=0,
+        help="rnn_lite_gru: truncated-BPTT epochs over the GRU encoder before the ridge solve (0 keeps it frozen).",
+    )
+    parser.add_argument("--encoder-learning-rate", type=float, default=0.005)
+    parser.add_argument("--bptt-steps", type=int, default=12)
+    parser.add_argument(
+        "--encoder-seconds",
+        type=int,
+        default=None,
+        help="Time budget for the encoder update (default: AQPY_GRU_ENCODER_SECONDS or 20; 0 = no cap).",
+    )
     return parser.parse_args()
 
 
@@ -66,6 +100,15 @@ def main():
         ar_delta=args.ar_delta,
         rnn_ridge=args.rnn_ridge,
         random_seed=args.random_seed,
+        early_stopping_patience=args.early_stopping_patience,
+        validation_fraction=args.validation_fraction,
+        optimizer=args.optimizer,
+        precision=args.precision,
+        direct_horizon_steps=args.direct_horizon_steps,
+        encoder_epochs=args.encoder_epochs,
+        encoder_learning_rate=args.encoder_learning_rate,
+        bptt_steps=args.bptt_steps,
+        encoder_seconds=args.encoder_seconds,
     )
     print(json.dumps(result, indent=2, default=str))
 
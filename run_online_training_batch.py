@@ -2,9 +2,13 @@
 
 import argparse
 import json
+import os
 
-from aqpy.forecast.online_training import run_online_training_step
-from aqpy.forecast.specs import filter_specs, load_model_specs
+from aqpy.common.env import env_int
+from aqpy.forecast.coordination import DEFERRED_REASONS, FORECAST_ACTIVE_REASON, wait_for_forecasts
+from aqpy.forecast.dataset import dataset_key, release_dataset_matrices, release_datasets
+from aqpy.forecast.online_training import run_multi_training_step, run_online_training_step
+from aqpy.forecast.specs import filter_specs, load_model_specs, spec_targets
 
 
 def parse_csv(value):
@@ -22,11 +26,151 @@ def parse_args():
     parser.add_argument("--databases", default="")
     parser.add_argument("--targets", default="")
     parser.add_argument("--families", default="")
+    parser.add_argument(
+        "--nice",
+        type=int,
+        default=env_int("AQPY_TRAINING_NICE", 10),
+        help="Lower this process's CPU priority so forecasting wins contended cores. 0 keeps it.",
+    )
     return parser.parse_args()
 
 
+def _source_key(spec):
+    return (spec["database"], spec["table"], spec["time_col"], spec.get("history_hours", 24 * 14))
+
+
+def group_specs_by_source(specs):
+    # One group per dataset. Groups of the same source table are adjacent, with nn_mlp_multi groups
+    # last so they reuse the per-target series the single-target groups already fetched.
+    groups = {}
+    for spec in specs:
+        database, table, time_col, history_hours = _source_key(spec)
+        key = dataset_key(database, table, time_col, ",".join(spec_targets(spec)), history_hours)
+        groups.setdefault(key, []).append(spec)
+    sources = list(dict.fromkeys(_source_key(group[0]) for group in groups.values()))
+    return sorted(
+        groups.values(),
+        key=lambda group: (sources.index(_source_key(group[0])), group[0].get("model_type") == "nn_mlp_multi"),
+    )
+
+
+def train_specs(specs):
+    results = {}
+    # Shared across the batch: source watermarks per (database, table) and one
+    # TrainingDataset per target, reused by every family trained from it. Derived matrices are
+    # released after each group and the series once their source table is done.
+    source_cache = {}
+    groups = group_specs_by_source(specs)
+    for i, group in enumerate(groups):
+        for spec in group:
+            results[id(spec)] = _train_spec(spec, source_cache)
+        release_dataset_matrices(source_cache)
+        if i + 1 == len(groups) or _source_key(groups[i + 1][0]) != _source_key(group[0]):
+            release_datasets(source_cache)
+    # Models another job held, or deferred while a forecast batch ran, are retried once at the end
+    # instead of blocking the batch. Before that the batch waits once, up to
+    # AQPY_TRAINING_YIELD_SECONDS in total, for forecasts to finish; retries then train regardless.
+    deferred = [spec for spec in specs if results[id(spec)].get("result", {}).get("reason") in DEFERRED_REASONS]
+    forecast_dbs = {
+        spec["database"]
+        for spec in deferred
+        if results[id(spec)]["result"]["reason"] == FORECAST_ACTIVE_REASON
+    }
+    if forecast_dbs:
+        wait_for_forecasts(forecast_dbs)
+    for spec in deferred:
+        results[id(spec)] = _train_spec(spec, source_cache, defer_to_forecast=False)
+    release_datasets(source_cache)
+    return [results[id(spec)] for spec in specs]
+
+
+def _train_multi_spec(spec, source_cache, defer_to_forecast):
+    return run_multi_training_step(
+        database=spec["database"],
+        table=spec["table"],
+        time_col=spec["time_col"],
+        targets=spec["targets"],
+        model_name=spec["model_name"],
+        model_path=spec["model_path"],
+        history_hours=spec.get("history_hours", 24 * 14),
+        lags=spec.get("lags"),
+        holdout_ratio=spec.get("holdout_ratio", 0.2),
+        min_new_rows=spec.get("min_new_rows", 30),
+        learning_rate=spec.get("learning_rate", 0.01),
+        epochs=spec.get("epochs", 40),
+        batch_size=spec.get("batch_size", 64),
+        hidden_dim=spec.get("hidden_dim", 8),
+        burn_in_rows=spec.get("burn_in_rows", 200),
+        max_train_rows=spec.get("max_train_rows"),
+        random_seed=spec.get("random_seed", 42),
+        early_stopping_patience=spec.get("early_stopping_patience", 5),
+        validation_fraction=spec.get("validation_fraction", 0.1),
+        optimizer=spec.get("optimizer", "sgd"),
+        precision=spec.get("precision"),
+        defer_to_forecast=defer_to_forecast,
+        source_cache=source_cache,
+    )
+
+
+def _train_spec(spec, source_cache, defer_to_forecast=True):
+    if spec.get("model_type") == "ensemble":
+        return {
+            "model_name": spec["model_name"],
+            "status": "skipped",
+            "reason": "ensemble weights are updated by the forecast batch",
+        }
+    try:
+        if spec.get("model_type") == "nn_mlp_multi":
+            res = _train_multi_spec(spec, source_cache, defer_to_forecast)
+            return {"model_name": spec["model_name"], "result": res}
+        res = run_online_training_step(
+            database=spec["database"],
+            table=spec["table"],
+            time_col=spec["time_col"],
+            target=spec["target"],
+            model_name=spec["model_name"],
+            model_path=spec["model_path"],
+            history_hours=spec.get("history_hours", 24 * 14),
+            lags=spec.get("lags"),
+            holdout_ratio=spec.get("holdout_ratio", 0.2),
+            min_new_rows=spec.get("min_new_rows", 30),
+            learning_rate=spec.get("learning_rate", 0.01),
+            epochs=spec.get("epochs", 40),
+            batch_size=spec.get("batch_size", 64),
+            hidden_dim=spec.get("hidden_dim", 8),
+            model_type=spec.get("model_type", "nn_mlp"),
+            forgetting_factor=spec.get("forgetting_factor", 0.995),
+            ar_delta=spec.get("ar_delta", 100.0),
+            seq_len=spec.get("seq_len", 24),
+            burn_in_rows=spec.get("burn_in_rows", 200),
+            max_train_rows=spec.get("max_train_rows"),
+            rnn_ridge=spec.get("rnn_ridge", 1e-3),
+            random_seed=spec.get("random_seed", 42),
+            early_stopping_patience=spec.get("early_stopping_patience", 5),
+            validation_fraction=spec.get("validation_fraction", 0.1),
+            optimizer=spec.get("optimizer", "sgd"),
+            precision=spec.get("precision"),
+            direct_horizon_steps=spec.get("direct_horizon_steps", 0),
+            encoder_epochs=spec.get("encoder_epochs", 0),
+            encoder_learning_rate=spec.get("encoder_learning_rate", 0.005),
+            bptt_steps=spec.get("bptt_steps", 12),
+            encoder_seconds=spec.get("encoder_seconds"),
+            defer_to_forecast=defer_to_forecast,
+            source_cache=source_cache,
+        )
+        return {"model_name": spec["model_name"], "result": res}
+    except Exception as exc:
+        return {
+            "model_name": spec["model_name"],
+            "status": "failed",
+            "error": str(exc),
+        }
+
+
 def main():
     args = parse_args()
+    if args.nice > 0:
+        os.nice(args.nice)
     specs = load_model_specs(args.spec_file)
     specs = filter_specs(
         specs,
@@ -35,42 +179,7 @@ def main():
         targets=parse_csv(args.targets),
         families=[x.lower() for x in parse_csv(args.families)],
     )
-    results = []
-    for spec in specs:
-        try:
-            res = run_online_training_step(
-                database=spec["database"],
-                table=spec["table"],
-                time_col=spec["time_col"],
-                target=spec["target"],
-                model_name=spec["model_name"],
-                model_path=spec["model_path"],
-                history_hours=spec.get("history_hours", 24 * 14),
-                lags=spec.get("lags"),
-                holdout_ratio=spec.get("holdout_ratio", 0.2),
-                min_new_rows=spec.get("min_new_rows", 30),
-                learning_rate=spec.get("learning_rate", 0.01),
-                epochs=spec.get("epochs", 40),
-                batch_size=spec.get("batch_size", 64),
-                hidden_dim=spec.get("hidden_dim", 8),
-                model_type=spec.get("model_type", "nn_mlp"),
-                forgetting_factor=spec.get("forgetting_factor", 0.995),
-                ar_delta=spec.get("ar_delta", 100.0),
-                seq_len=spec.get("seq_len", 24),
-                burn_in_rows=spec.get("burn_in_rows", 200),
-                max_train_rows=spec.get("max_train_rows"),
-                rnn_ridge=spec.get("rnn_ridge", 1e-3),
-                random_seed=spec.get("random_seed", 42),
-            )
-            results.append({"model_name": spec["model_name"], "result": res})
-        except Exception as exc:
-            results.append(
-                {
-                    "model_name": spec["model_name"],
-                    "status": "failed",
-                    "error": str(exc),
-                }
-            )
+    results = train_specs(specs)
     print(json.dumps(results, indent=2, default=str))
 
 
@@ -90,6 +90,12 @@ for unit in \
   systemctl --no-pager --full status "${unit}" 2>/dev/null | sed -n '1,16p' || true
 done
 
+METRICS_TEXTFILE="${AQPY_METRICS_TEXTFILE:-}"
+if [[ -n "${METRICS_TEXTFILE}" && -f "${METRICS_TEXTFILE}" ]]; then
+  print_header "Ingest Metrics (${METRICS_TEXTFILE})"
+  grep -v '^#' "${METRICS_TEXTFILE}" | grep -v '_bucket{' || true
+fi
+
 if [[ -n "${DB_PASSWORD}" && "${DB_PASSWORD}" != "change_me" ]] && have_cmd psql; then
   export PGPASSWORD="${DB_PASSWORD}"
 
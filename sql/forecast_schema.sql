@@ -14,6 +14,49 @@ CREATE TABLE IF NOT EXISTS predictions (
 CREATE INDEX IF NOT EXISTS idx_predictions_lookup
     ON predictions (target, model_name, predicted_for DESC);
 
+-- Retention deletes by predicted_for alone. Rows arrive roughly in predicted_for order, so a BRIN
+-- index covers that range scan for a few pages instead of a second B-tree.
+CREATE INDEX IF NOT EXISTS idx_predictions_predicted_for_brin
+    ON predictions USING brin (predicted_for);
+
+-- Upsert key: one row per (model_name, target, horizon_step, predicted_for). Tables that already
+-- hold append-only duplicates get it from compact_predictions.py instead. It also serves the
+-- dashboard series (model_name, target, horizon_step = 1 ORDER BY predicted_for) and the backfill
+-- window delete, and it contains predicted_for, so it carries over to partitions and hypertables.
+DO $$
+BEGIN
+    IF to_regclass('uq_predictions_key') IS NULL AND NOT EXISTS (SELECT 1 FROM predictions) THEN
+        CREATE UNIQUE INDEX uq_predictions_key
+            ON predictions (model_name, target, horizon_step, predicted_for);
+    END IF;
+END $$;
+
+-- Optional: partition predictions by predicted_for so retention drops whole ranges instead of
+-- deleting rows. Run once per database after the key exists; every statement in this file stays
+-- valid afterwards.
+--   python3 partition_predictions.py --mode native      # native RANGE partitions + DEFAULT
+--   python3 partition_predictions.py --mode timescale   # hypertable, needs the timescaledb extension
+-- The Timescale conversion is equivalent to:
+--   ALTER TABLE predictions DROP CONSTRAINT predictions_pkey;
+--   SELECT create_hypertable('predictions', 'predicted_for',
+--                            chunk_time_interval => interval '7 days', migrate_data => true);
+
+CREATE TABLE IF NOT EXISTS predictions_history (
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    generated_at TIMESTAMPTZ NOT NULL,
+    predicted_for TIMESTAMPTZ NOT NULL,
+    source_database TEXT NOT NULL,
+    source_table TEXT NOT NULL,
+    target TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    horizon_step INTEGER NOT NULL,
+    yhat DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_predictions_history_lookup
+    ON predictions_history (target, model_name, predicted_for DESC);
+
 CREATE TABLE IF NOT EXISTS model_registry (
     model_name TEXT NOT NULL,
     model_version TEXT NOT NULL,
@@ -25,3 +68,13 @@ CREATE TABLE IF NOT EXISTS model_registry (
     artifact_path TEXT NOT NULL,
     PRIMARY KEY (model_name, model_version)
 );
+
+CREATE TABLE IF NOT EXISTS forecast_state (
+    model_name TEXT PRIMARY KEY,
+    model_version TEXT NOT NULL,
+    source_database TEXT NOT NULL,
+    source_table TEXT NOT NULL,
+    horizon_steps INTEGER NOT NULL,
+    last_forecast_source_ts TIMESTAMPTZ NOT NULL,
+    last_forecast_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
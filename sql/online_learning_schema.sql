@@ -49,3 +49,44 @@ CREATE TABLE IF NOT EXISTS retention_runs (
     retention_days INTEGER NOT NULL,
     safety_hours INTEGER NOT NULL
 );
+
+CREATE TABLE IF NOT EXISTS job_runs (
+    id BIGSERIAL PRIMARY KEY,
+    started_at TIMESTAMPTZ NOT NULL,
+    finished_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    job_name TEXT NOT NULL,
+    model_name TEXT,
+    model_type TEXT,
+    source_database TEXT,
+    source_table TEXT,
+    status TEXT NOT NULL,
+    total_seconds DOUBLE PRECISION NOT NULL,
+    stages JSONB NOT NULL,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_runs_job_time
+    ON job_runs (job_name, started_at DESC);
+
+CREATE TABLE IF NOT EXISTS backtest_metrics (
+    id BIGSERIAL PRIMARY KEY,
+    run_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    model_name TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    model_type TEXT NOT NULL,
+    source_database TEXT NOT NULL,
+    source_table TEXT NOT NULL,
+    target TEXT NOT NULL,
+    horizon_step INTEGER NOT NULL,
+    n_origins INTEGER NOT NULL,
+    origin_start_ts TIMESTAMPTZ NOT NULL,
+    origin_end_ts TIMESTAMPTZ NOT NULL,
+    mae DOUBLE PRECISION NOT NULL,
+    rmse DOUBLE PRECISION NOT NULL,
+    baseline_mae DOUBLE PRECISION NOT NULL,
+    baseline_rmse DOUBLE PRECISION NOT NULL,
+    mae_improvement_pct DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_backtest_metrics_target_time
+    ON backtest_metrics (source_database, target, run_at DESC);
@@ -15,3 +15,7 @@ CREATE TABLE IF NOT EXISTS pi (
 );
 
 CREATE INDEX IF NOT EXISTS idx_pms_pi_t_desc ON pi (t DESC);
+
+-- Per-window quality counters, written when AQPY_PMS_PERSIST_QUALITY is enabled.
+ALTER TABLE pi ADD COLUMN IF NOT EXISTS frame_count INTEGER;
+ALTER TABLE pi ADD COLUMN IF NOT EXISTS checksum_failures INTEGER;
@@ -0,0 +1,44 @@
+import json
+import pathlib
+import tempfile
+import unittest
+
+from aqpy.forecast.artifacts import list_artifact_versions, write_artifact
+
+
+class TestArtifacts(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = pathlib.Path(self.tmp.name) / "bme_temperature_nn.json"
+
+    def test_current_symlink_points_at_newest_and_old_versions_are_pruned(self):
+        for i in range(5):
+            target = write_artifact(self.path, {"model_version": f"v{i}", "w": [i]}, keep_versions=2)
+        self.assertTrue(self.path.is_symlink())
+        self.assertEqual(self.path.resolve(), target.resolve())
+        self.assertEqual(json.loads(self.path.read_text())["model_version"], "v4")
+        self.assertEqual(
+            sorted(p.name for p in list_artifact_versions(self.path)),
+            ["bme_temperature_nn.json.v3", "bme_temperature_nn.json.v4"],
+        )
+        # No temp files or links are left behind.
+        self.assertEqual(len(list(pathlib.Path(self.tmp.name).iterdir())), 3)
+
+    def test_reader_keeps_its_version_across_a_swap(self):
+        write_artifact(self.path, {"model_version": "v1"}, keep_versions=1)
+        with open(self.path) as reader:
+            write_artifact(self.path, {"model_version": "v2"}, keep_versions=1)
+            self.assertEqual(json.load(reader)["model_version"], "v1")
+        self.assertEqual(json.loads(self.path.read_text())["model_version"], "v2")
+
+    def test_plain_file_from_before_versioning_is_kept_as_legacy(self):
+        self.path.write_text(json.dumps({"model_version": "old"}))
+        write_artifact(self.path, {"model_version": "v1"}, keep_versions=0)
+        legacy = self.path.with_name(self.path.name + ".legacy")
+        self.assertEqual(json.loads(legacy.read_text())["model_version"], "old")
+        self.assertEqual(json.loads(self.path.read_text())["model_version"], "v1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+import numpy as np
+
+from aqpy.forecast.adaptive_ar import fit_recursive_least_squares, recursive_predict as ar_recursive_predict
+from aqpy.forecast.backtest import forecast_origins, horizon_metrics, select_origins
+from aqpy.forecast.features import (
+    build_ar_feature_matrix,
+    build_feature_matrix,
+    build_feature_rows,
+    build_horizon_targets,
+    build_single_feature,
+)
+from aqpy.forecast.nn_model import direct_predict, recursive_predict, train_mlp_regressor
+from aqpy.forecast.nn_multi import build_multi_feature_matrix, recursive_predict as multi_recursive_predict
+from aqpy.forecast.nn_multi import train_mlp_multi
+from aqpy.forecast.rnn_lite import fit_gru_lite_head, recursive_predict as rnn_recursive_predict
+
+
+def _series(n=500, seed=11):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    return 12.0 + 2.0 * np.sin(t / 20.0) + rng.normal(0, 0.2, n)
+
+
+class TestBacktest(unittest.TestCase):
+    def setUp(self):
+        self.values = _series()
+        self.lags = [1, 2, 3, 6]
+        self.origins = select_origins(len(self.values), 16, 6, max_origins=40)
+
+    def test_select_origins_spacing(self):
+        origins = select_origins(100, 12, 6, max_origins=10)
+        self.assertEqual(origins[-1], 94)
+        self.assertGreaterEqual(origins[0], 12)
+        self.assertLessEqual(len(origins), 10)
+        self.assertEqual(len(select_origins(10, 12, 6, max_origins=10)), 0)
+
+    def test_batched_origins_match_per_origin_forecasts(self):
+        values, lags, origins = self.values, self.lags, self.origins
+        X, y = build_feature_matrix(values, lags)
+        nn = {"model_type": "nn_mlp", "lags": lags, **train_mlp_regressor(X, y, epochs=5, patience=0)}
+        X_ar, y_ar = build_ar_feature_matrix(values, lags)
+        ar = {"model_type": "adaptive_ar", "lags": lags, **fit_recursive_least_squares(X_ar, y_ar)}
+        rnn = {"model_type": "rnn_lite_gru", "lags": lags, **fit_gru_lite_head(values, seq_len=16, hidden_dim=4)}
+
+        cases = [
+            (nn, lambda o: recursive_predict(nn, values[:o], lags, 6)),
+            (ar, lambda o: ar_recursive_predict(ar, values[:o], lags, 6)),
+            (rnn, lambda o: rnn_recursive_predict(rnn, values[:o], 6)),
+        ]
+        for model, single in cases:
+            batch = forecast_origins(model, values, origins, 6)
+            self.assertEqual(batch.shape, (len(origins), 6))
+            for j in (0, len(origins) // 2, len(origins) - 1):
+                np.testing.assert_allclose(batch[j], single(origins[j]), rtol=1e-9, err_msg=model["model_type"])
+
+        np.testing.assert_allclose(build_feature_rows(values[:100], lags), build_single_feature(values[:100], lags))
+
+    def test_direct_and_multi_models(self):
+        values, lags, origins = self.values, self.lags, self.origins
+        X, _ = build_feature_matrix(values, lags)
+        Y = build_horizon_targets(values, max(lags), 6)
+        direct = {
+            "model_type": "nn_mlp",
+            "lags": lags,
+            "direct_horizon_steps": 6,
+            **train_mlp_regressor(X[: len(Y)], Y, epochs=5, patience=0),
+        }
+        batch = forecast_origins(direct, values, origins, 6)
+        np.testing.assert_allclose(batch[-1], direct_predict(direct, values[: origins[-1]], lags, 6), rtol=1e-9)
+        with self.assertRaises(ValueError):
+            forecast_origins(direct, values, origins, 7)
+
+        channels = np.stack([values, values[::-1]])
+        Xm, ym = build_multi_feature_matrix(channels, lags)
+        multi = {"model_type": "nn_mlp_multi", "lags": lags, **train_mlp_multi(Xm, ym, epochs=3, patience=0)}
+        batch = forecast_origins(multi, channels, origins, 6)
+        self.assertEqual(batch.shape, (2, len(origins), 6))
+        expected = multi_recursive_predict(multi, channels[:, : origins[3]], lags, 6)
+        np.testing.assert_allclose(batch[:, 3], expected, rtol=1e-9)
+
+    def test_horizon_metrics_against_persistence(self):
+        values = np.arange(30, dtype=float)
+        origins = np.array([10, 20])
+        perfect = np.stack([values[o : o + 3] for o in origins])
+        metrics = horizon_metrics(values, origins, perfect)
+        np.testing.assert_allclose(metrics["mae"], [0.0, 0.0, 0.0])
+        np.testing.assert_allclose(metrics["baseline_mae"], [1.0, 2.0, 3.0])
+        np.testing.assert_allclose(metrics["mae_improvement_pct"], [100.0, 100.0, 100.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
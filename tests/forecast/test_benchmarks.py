@@ -0,0 +1,92 @@
+import unittest
+
+from aqpy.common import db
+from benchmarks.batch_pipeline import CountingConnection, PipelineStats
+from benchmarks.forecast_hot_paths import compare_to_baseline, run_suite
+
+
+class _FakeCursor:
+    def __init__(self):
+        self.rowcount = -1
+        self.closed = False
+
+    def execute(self, query, params=None):
+        self.rowcount = 3 if query.startswith("DELETE") else -1
+
+    def executemany(self, query, params_seq):
+        self.rowcount = 1
+
+    def fetchall(self):
+        return [(1,), (2,)]
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.commits = 0
+
+    def cursor(self):
+        return _FakeCursor()
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        pass
+
+
+class TestForecastBenchmarks(unittest.TestCase):
+    def test_suite_runs_on_small_series(self):
+        report = run_suite(sizes=[150], repeat=1, epochs=2)
+        cases = {v["case"] for v in report["results"].values()}
+
+        self.assertIn("features.build_feature_matrix", cases)
+        self.assertIn("rnn_lite.fit_gru_lite_head", cases)
+        self.assertIn("artifact.roundtrip_nn", cases)
+        self.assertTrue(all(v["seconds_min"] >= 0 for v in report["results"].values()))
+
+    def test_compare_flags_regressions_beyond_tolerance(self):
+        baseline = {"results": {"a@1": {"seconds_min": 1.0}, "b@1": {"seconds_min": 1.0}}}
+        current = {"results": {"a@1": {"seconds_min": 1.5}, "b@1": {"seconds_min": 1.1}}}
+
+        comparison = compare_to_baseline(current, baseline, tolerance=0.25)
+
+        self.assertEqual([r["key"] for r in comparison["regressions"]], ["a@1"])
+        self.assertEqual(comparison["improvements"], [])
+
+
+class TestBatchPipelineHarness(unittest.TestCase):
+    def test_counting_connection_tracks_round_trips_and_rows_per_stage(self):
+        stats = PipelineStats()
+        stats.stage = "train_1"
+        conn = CountingConnection(_FakeConnection(), stats)
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT t FROM pi")
+            cur.fetchall()
+            cur.execute("DELETE FROM predictions")
+            cur.executemany("INSERT INTO predictions VALUES (%s)", [(1,), (2,), (3,), (4,)])
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(
+            stats.by_stage["train_1"],
+            {"round_trips": 7, "rows_read": 2, "rows_written": 7, "connections": 1},
+        )
+
+    def test_connection_factory_overrides_connect_db(self):
+        seen = []
+        previous = db.set_connection_factory(lambda database: seen.append(database) or "conn")
+        try:
+            self.assertEqual(db.connect_db("bme"), "conn")
+        finally:
+            db.set_connection_factory(previous)
+
+        self.assertEqual(seen, ["bme"])
+        self.assertIsNone(db._connection_factory)
+
+
+if __name__ == "__main__":
+    unittest.main()
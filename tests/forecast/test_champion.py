@@ -0,0 +1,86 @@
+import datetime as dt
+import unittest
+
+from aqpy.forecast.champion import assign_roles, challenger_due, select_champions
+
+
+def _spec(name, target, table="pi", database="pms", **extra):
+    return {"model_name": name, "database": database, "table": table, "target": target, **extra}
+
+
+class TestChampion(unittest.TestCase):
+    def setUp(self):
+        self.specs = [
+            _spec("nn_pm25", "pm25_st"),
+            _spec("ar_pm25", "pm25_st"),
+            _spec("rnn_pm25", "pm25_st"),
+            _spec("nn_pm10", "pm10_st"),
+            _spec("ar_pm10", "pm10_st"),
+        ]
+
+    def test_best_recent_improvement_wins_per_target(self):
+        scores = {
+            ("nn_pm25", "pm25_st"): 12.0,
+            ("ar_pm25", "pm25_st"): 30.0,
+            ("rnn_pm25", "pm25_st"): 5.0,
+            ("nn_pm10", "pm10_st"): 8.0,
+            ("ar_pm10", "pm10_st"): -2.0,
+        }
+        champions = select_champions(self.specs, scores)
+        self.assertEqual(champions[("pms", "pi", "pm25_st")], "ar_pm25")
+        self.assertEqual(champions[("pms", "pi", "pm10_st")], "nn_pm10")
+
+        roles = assign_roles(self.specs, scores)
+        self.assertEqual(
+            [name for name, role in roles.items() if role == "champion"], ["ar_pm25", "nn_pm10"]
+        )
+
+        # A challenger that overtakes takes over on the next plan.
+        scores[("rnn_pm25", "pm25_st")] = 31.0
+        self.assertEqual(assign_roles(self.specs, scores)["rnn_pm25"], "champion")
+        self.assertEqual(assign_roles(self.specs, scores)["ar_pm25"], "challenger")
+
+    def test_unscored_targets_keep_every_model_at_full_cadence(self):
+        roles = assign_roles(self.specs, {("nn_pm25", "pm25_st"): 1.0})
+        self.assertEqual(roles["ar_pm25"], "challenger")
+        self.assertEqual(roles["nn_pm10"], "champion")
+        self.assertEqual(roles["ar_pm10"], "champion")
+
+    def test_multi_target_model_is_champion_if_it_wins_any_target(self):
+        specs = self.specs + [
+            {
+                "model_name": "multi",
+                "database": "pms",
+                "table": "pi",
+                "targets": ["pm25_st", "pm10_st"],
+                "model_type": "nn_mlp_multi",
+            }
+        ]
+        scores = {
+            ("ar_pm25", "pm25_st"): 30.0,
+            ("nn_pm10", "pm10_st"): 8.0,
+            ("multi", "pm25_st"): 10.0,
+            ("multi", "pm10_st"): 9.0,
+        }
+        roles = assign_roles(specs, scores)
+        self.assertEqual(roles["multi"], "champion")
+        self.assertEqual(roles["nn_pm10"], "challenger")
+
+    def test_ensembles_are_not_ranked(self):
+        specs = self.specs + [
+            _spec("ens_pm25", "pm25_st", model_type="ensemble", members=["nn_pm25", "ar_pm25"])
+        ]
+        roles = assign_roles(specs, {("nn_pm25", "pm25_st"): 3.0, ("ar_pm25", "pm25_st"): 1.0})
+        self.assertEqual(roles["ens_pm25"], "ensemble")
+        self.assertEqual(roles["nn_pm25"], "champion")
+        self.assertEqual(roles["ar_pm25"], "challenger")
+
+    def test_challenger_due_after_interval_with_grace(self):
+        now = dt.datetime(2026, 1, 1, 12, 0, tzinfo=dt.timezone.utc)
+        self.assertTrue(challenger_due(None, now, 30))
+        self.assertFalse(challenger_due(now - dt.timedelta(minutes=20), now, 30))
+        self.assertTrue(challenger_due(now - dt.timedelta(minutes=29, seconds=45), now, 30))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import datetime as dt
+import unittest
+
+from aqpy.forecast.compaction import compaction_windows
+
+
+class TestCompactionWindows(unittest.TestCase):
+    def test_windows_cover_range_inclusively_without_overlap(self):
+        start = dt.datetime(2026, 1, 1, tzinfo=dt.timezone.utc)
+        end = start + dt.timedelta(hours=50)
+        windows = compaction_windows(start, end, chunk_hours=24)
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(windows[0][0], start)
+        for (_, hi), (lo, _) in zip(windows, windows[1:]):
+            self.assertEqual(hi, lo)
+        # Half-open windows must still include the newest row.
+        self.assertGreater(windows[-1][1], end)
+        self.assertLessEqual(windows[-1][1] - end, dt.timedelta(seconds=1))
+
+    def test_single_timestamp_gets_one_window(self):
+        ts = dt.datetime(2026, 1, 1, tzinfo=dt.timezone.utc)
+        self.assertEqual(len(compaction_windows(ts, ts, chunk_hours=6)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+
+import run_online_training_batch
+from aqpy.forecast.coordination import FORECAST_ACTIVE_REASON, MODEL_LOCKED_REASON, yield_to_forecast
+
+
+class _GateCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.probes += 1
+
+    def fetchone(self):
+        return (self.conn.active.pop(0) if self.conn.active else False,)
+
+
+class _GateConnection:
+    def __init__(self, active):
+        self.active = list(active)
+        self.probes = 0
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def cursor(self):
+        return _GateCursor(self)
+
+
+class TestCoordination(unittest.TestCase):
+    def test_training_waits_while_forecast_batch_runs(self):
+        sleeps = []
+        conn = _GateConnection([True, True, False])
+        waited = yield_to_forecast(conn, max_wait_seconds=60, poll_seconds=2.0, sleep=sleeps.append)
+        self.assertEqual(waited, 4.0)
+        self.assertEqual(sleeps, [2.0, 2.0])
+        # No read transaction stays open across a sleep.
+        self.assertEqual(conn.commits, 3)
+
+    def test_wait_is_capped(self):
+        sleeps = []
+        conn = _GateConnection([True] * 100)
+        waited = yield_to_forecast(conn, max_wait_seconds=5, poll_seconds=2.0, sleep=sleeps.append)
+        self.assertEqual(waited, 5.0)
+        self.assertEqual(sleeps, [2.0, 2.0, 1.0])
+
+    def test_locked_and_deferred_models_are_retried_once_at_the_end(self):
+        specs = [
+            {"model_name": name, "database": db, "table": "pi", "time_col": "t", "target": "temperature"}
+            for name, db in (("a", "bme"), ("b", "bme"), ("c", "pms"))
+        ]
+        first_reason = {"a": MODEL_LOCKED_REASON, "c": FORECAST_ACTIVE_REASON}
+        calls = []
+
+        def fake_train(spec, source_cache, defer_to_forecast=True):
+            name = spec["model_name"]
+            calls.append((name, defer_to_forecast))
+            if name in first_reason and defer_to_forecast:
+                return {"model_name": name, "result": {"status": "skipped", "reason": first_reason[name]}}
+            return {"model_name": name, "result": {"status": "trained"}}
+
+        with mock.patch.object(run_online_training_batch, "_train_spec", side_effect=fake_train), mock.patch.object(
+            run_online_training_batch, "wait_for_forecasts"
+        ) as wait:
+            results = run_online_training_batch.train_specs(specs)
+        # One batch-wide wait, only for the database whose forecast deferred a model.
+        wait.assert_called_once_with({"pms"})
+        self.assertEqual(
+            calls, [("a", True), ("b", True), ("c", True), ("a", False), ("c", False)]
+        )
+        self.assertEqual([r["result"]["status"] for r in results], ["trained"] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import datetime as dt
+import unittest
+
+import numpy as np
+
+from aqpy.forecast.dataset import (
+    TrainingDataset,
+    dataset_key,
+    load_multi_training_dataset,
+    load_training_dataset,
+    release_datasets,
+)
+from aqpy.forecast.features import build_ar_feature_matrix, build_feature_matrix
+from aqpy.forecast.model import mae, rmse, split_train_val
+from aqpy.forecast.rnn_lite import build_sequence_dataset
+
+
+def _dataset(n=300):
+    start = dt.datetime(2026, 2, 1, tzinfo=dt.timezone.utc)
+    timestamps = [start + dt.timedelta(seconds=30 * i) for i in range(n)]
+    values = 20.0 + np.sin(np.arange(n) / 15.0) + np.random.default_rng(3).normal(0, 0.1, n)
+    return TrainingDataset(timestamps, values)
+
+
+class TestTrainingDataset(unittest.TestCase):
+    def test_matrices_match_builders_and_are_cached(self):
+        ds = _dataset()
+        lags = [1, 2, 3, 6, 12]
+
+        X, y = ds.feature_matrix(lags)
+        X_ref, y_ref = build_feature_matrix(ds.values, lags)
+        np.testing.assert_allclose(X, X_ref)
+        np.testing.assert_allclose(y, y_ref)
+        self.assertIs(ds.feature_matrix(lags)[0], X)
+        self.assertFalse(X.flags.writeable)
+
+        X_ar, _ = ds.ar_feature_matrix(lags)
+        np.testing.assert_allclose(X_ar, build_ar_feature_matrix(ds.values, lags)[0])
+
+        X_seq, y_seq = ds.sequence_dataset(24)
+        np.testing.assert_allclose(X_seq, build_sequence_dataset(ds.values, 24)[0])
+        self.assertEqual(len(y_seq), len(ds) - 24)
+
+    def test_float32_matrix_is_built_directly_without_a_float64_copy(self):
+        ds = _dataset()
+        lags = [1, 2, 3, 6, 12]
+        X32, y32 = ds.feature_matrix(lags, dtype=np.float32)
+        self.assertEqual(X32.dtype, np.float32)
+        np.testing.assert_allclose(X32, build_feature_matrix(ds.values, lags)[0], rtol=1e-6)
+        self.assertEqual([k for k in ds._cache if k[0] == "features"], [("features", tuple(lags), "float32")])
+
+        X_ar, y_ar = ds.ar_feature_matrix(lags)
+        self.assertEqual(X_ar.dtype, np.float64)
+        self.assertEqual(X_ar.shape, (len(y32), len(lags)))
+
+    def test_baseline_matches_persistence_on_holdout(self):
+        ds = _dataset()
+        lags = [2, 3, 6]
+        X, y = ds.feature_matrix(lags)
+        _, X_holdout, _, y_holdout = split_train_val(X, y, train_ratio=0.8)
+
+        baseline = ds.baseline_metrics(max(lags), 0.2, lag=2)
+
+        self.assertAlmostEqual(baseline["baseline_mae"], mae(y_holdout, X_holdout[:, 0]))
+        self.assertAlmostEqual(baseline["baseline_rmse"], rmse(y_holdout, X_holdout[:, 0]))
+
+    def test_window_and_shared_cache(self):
+        ds = _dataset()
+        window = ds.window(100)
+        self.assertEqual(len(window), 100)
+        self.assertIs(ds.window(100), window)
+        self.assertIs(ds.window(None), ds)
+
+        key = dataset_key("bme", "pi", "t", "temperature", 336)
+        cache = {key: ds, ("latest", "bme", "pi", "t"): None}
+        loaded, fetched = load_training_dataset(None, "bme", "pi", "t", "temperature", 336, source_cache=cache)
+        self.assertIs(loaded, ds)
+        self.assertFalse(fetched)
+
+        release_datasets(cache)
+        self.assertEqual(list(cache), [("latest", "bme", "pi", "t")])
+
+    def test_multi_target_series_reuse_cached_datasets(self):
+        ds = _dataset(50)
+        # The second column is null at one timestamp, so that row is dropped for both targets.
+        other = TrainingDataset(ds.timestamps[:10] + ds.timestamps[11:], np.delete(ds.values, 10) + 1.0)
+        cache = {
+            dataset_key("pms", "pi", "t", "pm25_st", 336): ds,
+            dataset_key("pms", "pi", "t", "pm10_st", 336): other,
+        }
+        timestamps, values, rows_fetched = load_multi_training_dataset(
+            None, "pms", "pi", "t", ["pm25_st", "pm10_st"], 336, source_cache=cache
+        )
+        self.assertEqual(rows_fetched, 0)
+        self.assertEqual(values.shape, (2, 49))
+        self.assertNotIn(ds.timestamps[10], timestamps)
+        np.testing.assert_allclose(values[1], values[0] + 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+
+import numpy as np
+
+from aqpy.forecast.adaptive_ar import direct_predict as ar_direct_predict
+from aqpy.forecast.adaptive_ar import fit_recursive_least_squares, predict_batch as ar_predict_batch
+from aqpy.forecast.dataset import TrainingDataset
+from aqpy.forecast.features import (
+    build_ar_feature_matrix,
+    build_ar_single_feature,
+    build_feature_matrix,
+    build_horizon_targets,
+    build_single_feature,
+)
+from aqpy.forecast.model import (
+    direct_predict,
+    fit_direct_linear_regression,
+    fit_linear_regression,
+    mae,
+    predict,
+)
+from aqpy.forecast.nn_model import direct_predict as nn_direct_predict
+from aqpy.forecast.nn_model import predict_batch, train_mlp_regressor
+from aqpy.forecast.specs import validate_model_specs
+
+
+def _series(n=800, seed=5):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    return 15.0 + 4.0 * np.sin(t / 40.0) + rng.normal(0, 0.2, n)
+
+
+class TestDirectHorizon(unittest.TestCase):
+    def test_horizon_targets_align_with_feature_rows(self):
+        values = np.arange(20, dtype=float)
+        Y = build_horizon_targets(values, 3, 4)
+        X, y = build_feature_matrix(values, [1, 2, 3])
+        self.assertEqual(Y.shape, (14, 4))
+        np.testing.assert_array_equal(Y[:, 0], y[: len(Y)])
+        np.testing.assert_array_equal(Y[0], [3, 4, 5, 6])
+        with self.assertRaises(ValueError):
+            build_horizon_targets(values, 18, 4)
+
+    def test_linear_and_rls_columns_match_per_step_fits(self):
+        values = _series()
+        lags = [1, 2, 3, 6]
+        X, _ = build_feature_matrix(values, lags)
+        Y = build_horizon_targets(values, max(lags), 6)
+        X = X[: len(Y)]
+
+        intercept, weights = fit_direct_linear_regression(X, Y)
+        for h in (0, 5):
+            b, w = fit_linear_regression(X, Y[:, h])
+            self.assertAlmostEqual(intercept[h], b, places=8)
+            np.testing.assert_allclose(np.array(weights)[:, h], w, rtol=1e-8, atol=1e-10)
+        feat = build_single_feature(values, lags)
+        np.testing.assert_allclose(
+            direct_predict(values, lags, intercept, weights, 6), predict(intercept, weights, feat[None, :])[0]
+        )
+
+        X_ar, _ = build_ar_feature_matrix(values, lags)
+        X_ar = X_ar[: len(Y)]
+        multi = fit_recursive_least_squares(X_ar, Y)
+        self.assertEqual(np.shape(multi["theta"]), (len(lags), 6))
+        for h in (0, 3):
+            single = fit_recursive_least_squares(X_ar, Y[:, h])
+            np.testing.assert_allclose(np.array(multi["theta"])[:, h], single["theta"], rtol=1e-10)
+        feat = build_ar_single_feature(values, lags)
+        np.testing.assert_allclose(
+            ar_direct_predict(multi, values, lags, 4), ar_predict_batch(multi, feat[None, :])[0][:4]
+        )
+
+    def test_direct_mlp_beats_persistence_at_long_horizon(self):
+        values = _series(1200)
+        lags = [1, 2, 3, 6, 12]
+        X, _ = build_feature_matrix(values, lags)
+        Y = build_horizon_targets(values, max(lags), 12)
+        X = X[: len(Y)]
+        split = int(len(Y) * 0.8)
+
+        model = train_mlp_regressor(X[:split], Y[:split], epochs=30, optimizer="adam", patience=0)
+        self.assertEqual(len(model["y_mean"]), 12)
+        preds = predict_batch(model, X[split:])
+        self.assertEqual(preds.shape, (len(Y) - split, 12))
+        feat = build_single_feature(values, lags)
+        np.testing.assert_allclose(
+            nn_direct_predict(model, values, lags, 12), predict_batch(model, feat[None, :])[0]
+        )
+
+        dataset = TrainingDataset(range(len(values)), values)
+        baseline = dataset.horizon_baseline_metrics(max(lags), 12, 0.2)
+        self.assertLess(mae(Y[split:, -1], preds[:, -1]), baseline["baseline_horizon_mae"][-1])
+
+    def test_direct_spec_validation(self):
+        spec = {
+            "model_name": "aqpy_nn_temperature_direct",
+            "model_type": "nn_mlp",
+            "database": "bme",
+            "table": "pi",
+            "time_col": "t",
+            "target": "temperature",
+            "model_path": "models/bme_temperature_nn_direct.json",
+            "lags": [1, 2, 3],
+            "direct_horizon_steps": 12,
+        }
+        validate_model_specs([spec])
+        with self.assertRaises(ValueError):
+            validate_model_specs([{**spec, "forecast_horizon_steps": 24}])
+        with self.assertRaises(ValueError):
+            validate_model_specs([{**spec, "model_type": "rnn_lite_gru", "seq_len": 24}])
+
+
+if __name__ == "__main__":
+    unittest.main()
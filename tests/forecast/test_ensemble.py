@@ -0,0 +1,97 @@
+import datetime as dt
+import unittest
+
+import numpy as np
+
+from aqpy.forecast.ensemble import (
+    blend,
+    exp_gradient_update,
+    init_ensemble,
+    inverse_error_update,
+    inverse_error_weights,
+    pivot_realized,
+    update_weights,
+)
+
+
+def _realized(n=200, horizon=3, seed=5):
+    # Member 0 is accurate, member 1 is noisy and member 2 is biased.
+    rng = np.random.default_rng(seed)
+    start = dt.datetime(2026, 1, 1, tzinfo=dt.timezone.utc)
+    rows = []
+    for i in range(n):
+        ts = start + dt.timedelta(seconds=30 * i)
+        actual = 10.0 + np.sin(i / 15.0)
+        for step in range(1, horizon + 1):
+            rows.append(("a", step, ts, actual + rng.normal(0, 0.05 * step), actual))
+            rows.append(("b", step, ts, actual + rng.normal(0, 0.5), actual))
+            rows.append(("c", step, ts, actual + 0.8, actual))
+    return rows
+
+
+class TestEnsemble(unittest.TestCase):
+    def test_pivot_keeps_only_rows_every_member_forecast(self):
+        rows = _realized(n=10)
+        rows = [r for r in rows if not (r[0] == "b" and r[2] == rows[0][2])]
+        steps, preds, actual = pivot_realized(rows, ["a", "b", "c"], horizon_steps=2)
+        self.assertEqual(len(steps), 9 * 2)
+        self.assertEqual(preds.shape, (18, 3))
+        self.assertFalse(np.isnan(preds).any())
+        np.testing.assert_allclose(preds[:, 2] - actual, 0.8)
+
+    def test_batched_inverse_error_matches_sequential_ewma(self):
+        steps, preds, actual = pivot_realized(_realized(n=50), ["a", "b", "c"], horizon_steps=3)
+        prior = np.full((3, 3), 0.4)
+        batched = inverse_error_update(prior, steps, preds, actual, forgetting_factor=0.9)
+
+        sequential = prior.copy()
+        for s, p, y in zip(steps, preds, actual):
+            sequential[s] = 0.9 * sequential[s] + 0.1 * np.abs(p - y)
+        np.testing.assert_allclose(batched, sequential, rtol=1e-10)
+
+        # Without a prior the first update is the normalized weighted mean.
+        fresh = inverse_error_update(np.full((3, 3), np.nan), steps, preds, actual, 0.9)
+        self.assertTrue(np.all(fresh[:, 2] > 0.79) and np.all(fresh[:, 2] < 0.81))
+
+    def test_both_methods_shift_weight_to_the_accurate_member(self):
+        steps, preds, actual = pivot_realized(_realized(), ["a", "b", "c"], horizon_steps=3)
+        errors = inverse_error_update(np.full((3, 3), np.nan), steps, preds, actual, 0.98)
+        for weights in (
+            inverse_error_weights(errors),
+            exp_gradient_update(np.full((3, 3), 1 / 3), steps, preds, actual, learning_rate=1.0),
+        ):
+            np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+            self.assertTrue(np.all(weights[:, 0] > weights[:, 1]))
+            self.assertTrue(np.all(weights[:, 0] > weights[:, 2]))
+
+        blended = np.sum(inverse_error_weights(errors)[steps] * preds, axis=1)
+        self.assertLess(np.mean(np.abs(blended - actual)), np.mean(np.abs(preds - actual[:, None])))
+
+    def test_blend_renormalizes_over_available_members(self):
+        weights = np.array([[0.5, 0.25, 0.25], [0.2, 0.2, 0.6]])
+        member_preds = np.array([[1.0, 1.0], [np.nan, np.nan], [3.0, 3.0]])
+        out = blend(weights, member_preds, available=[True, False, True])
+        np.testing.assert_allclose(out, [(0.5 * 1 + 0.25 * 3) / 0.75, (0.2 * 1 + 0.6 * 3) / 0.8])
+
+    def test_every_weight_update_gets_a_new_model_version(self):
+        spec = {
+            "model_name": "ens",
+            "database": "pms",
+            "table": "pi",
+            "time_col": "t",
+            "target": "pm25_st",
+            "members": ["a", "b", "c"],
+        }
+        model = init_ensemble(spec, horizon_steps=3)
+        steps, preds, actual = pivot_realized(_realized(), ["a", "b", "c"], horizon_steps=3)
+        versions = {model["model_version"]}
+        for _ in range(3):
+            update_weights(model, steps, preds, actual)
+            versions.add(model["model_version"])
+        self.assertEqual(len(versions), 4)
+        self.assertEqual(model["n_updates"], 3)
+        self.assertTrue(model["model_version"].endswith("u3"))
+
+
+if __name__ == "__main__":
+    unittest.main()
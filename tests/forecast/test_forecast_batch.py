@@ -0,0 +1,116 @@
+import datetime as dt
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+import run_forecast_batch
+from aqpy.forecast.inference import UNCHANGED_REASON, forecast_is_current, latest_source_ts
+from run_forecast_batch import forecast_specs, summarize_forecasts
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.queries.append(query)
+
+    def fetchone(self):
+        return (self.conn.latest,)
+
+
+class _Conn:
+    def __init__(self, latest):
+        self.latest = latest
+        self.queries = []
+
+    def cursor(self):
+        return _Cursor(self)
+
+
+class TestChangeDrivenForecast(unittest.TestCase):
+    def setUp(self):
+        self.ts = dt.datetime(2026, 1, 1, 12, 0, tzinfo=dt.timezone.utc)
+        self.state = {"model_version": "v1", "horizon_steps": 12, "last_forecast_source_ts": self.ts}
+
+    def test_forecast_is_current_only_for_same_version_horizon_and_source_row(self):
+        self.assertTrue(forecast_is_current(self.state, "v1", 12, self.ts))
+        self.assertTrue(forecast_is_current(self.state, "v1", 6, self.ts))
+        self.assertFalse(forecast_is_current(self.state, "v1", 12, self.ts + dt.timedelta(seconds=30)))
+        self.assertFalse(forecast_is_current(self.state, "v2", 12, self.ts))
+        self.assertFalse(forecast_is_current(self.state, "v1", 24, self.ts))
+        self.assertFalse(forecast_is_current(None, "v1", 12, self.ts))
+        self.assertFalse(forecast_is_current(self.state, "v1", 12, None))
+
+    def test_latest_source_ts_is_probed_once_per_table(self):
+        conn = _Conn(self.ts)
+        cache = {}
+        for _ in range(3):
+            self.assertEqual(latest_source_ts(conn, "pms", "pi", "t", cache), self.ts)
+        latest_source_ts(conn, "bme", "pi", "t", cache)
+        self.assertEqual(len(conn.queries), 2)
+
+    def test_summary_counts_skips_by_reason(self):
+        results = [
+            {"model_name": "a", "result": {"inserted": 12, "model_name": "a"}},
+            {"model_name": "b", "result": {"status": "skipped", "reason": "no new source rows since last forecast"}},
+            {"model_name": "c", "result": {"status": "skipped", "reason": "no new source rows since last forecast"}},
+            {"model_name": "d", "status": "skipped", "role": "challenger", "reason": "challenger not due"},
+            {"model_name": "e", "status": "failed", "error": "boom"},
+        ]
+        summary = summarize_forecasts(results)
+        self.assertEqual(summary["forecast"], 1)
+        self.assertEqual(summary["inserted"], 12)
+        self.assertEqual(summary["skipped"], 3)
+        self.assertEqual(summary["failed"], 1)
+        self.assertEqual(
+            summary["skip_reasons"],
+            {"no new source rows since last forecast": 2, "challenger not due": 1},
+        )
+
+    def test_retrained_member_refreshes_unchanged_siblings_before_the_blend(self):
+        # Only "a" was retrained and no source row arrived, so "b" first skips as unchanged.
+        with tempfile.TemporaryDirectory() as tmp:
+            specs = []
+            for name in ("a", "b", "solo"):
+                path = pathlib.Path(tmp) / f"{name}.json"
+                path.write_text("{}")
+                specs.append({"model_name": name, "model_type": "nn_mlp", "database": "pms", "model_path": str(path)})
+            specs.append({"model_name": "ens", "model_type": "ensemble", "database": "pms", "members": ["a", "b"]})
+            calls = []
+            blended = {}
+
+            def fake_inference(model_path, horizon_steps, database_override, skip_unchanged, source_cache):
+                name = pathlib.Path(model_path).stem
+                calls.append((name, skip_unchanged))
+                if skip_unchanged and name != "a":
+                    return {"status": "skipped", "reason": UNCHANGED_REASON, "model_name": name}
+                return {"model_name": name, "inserted": 12, "forecast": [name]}
+
+            def fake_ensemble(spec, member_forecasts, horizon_steps):
+                blended.update(member_forecasts)
+                return {"model_name": spec["model_name"], "inserted": 12}
+
+            with mock.patch.object(run_forecast_batch, "run_inference", side_effect=fake_inference), mock.patch.object(
+                run_forecast_batch, "run_ensemble", side_effect=fake_ensemble
+            ), mock.patch.object(run_forecast_batch, "open_forecast_gates", return_value=[]):
+                results = forecast_specs(specs, horizon_steps=12)
+
+        self.assertEqual(sorted(blended), ["a", "b"])
+        self.assertIn(("b", False), calls)
+        # A model outside the ensemble keeps its unchanged skip.
+        self.assertNotIn(("solo", False), calls)
+        summary = summarize_forecasts(results)
+        self.assertEqual(summary["forecast"], 3)
+        self.assertEqual(summary["skip_reasons"], {UNCHANGED_REASON: 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+
+from aqpy.forecast.adaptive_ar import (
+    fit_recursive_least_squares,
+    recursive_predict as ar_recursive_predict,
+    recursive_predict_batch as ar_recursive_predict_batch,
+)
+from aqpy.forecast.features import (
+    build_ar_feature_matrix,
+    build_ar_single_feature,
+    build_feature_matrix,
+    build_single_feature,
+)
+from aqpy.forecast.model import fit_linear_regression, recursive_predict, recursive_predict_batch
+
+
+def _series(n=600, seed=8):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    return 30.0 + 5.0 * np.sin(t / 25.0) + rng.normal(0, 0.5, n)
+
+
+def _feed_back(values, horizon_steps, step):
+    history = list(values)
+    preds = []
+    for _ in range(horizon_steps):
+        pred = step(history)
+        history.append(pred)
+        preds.append(pred)
+    return preds
+
+
+class TestHorizonResponse(unittest.TestCase):
+    def test_linear_closed_form_matches_recursive_feeding(self):
+        values = _series()
+        lags = [1, 2, 3, 6]
+        X, y = build_feature_matrix(values, lags)
+        intercept, weights = fit_linear_regression(X, y)
+
+        def step(history):
+            return float(intercept + np.dot(weights, build_single_feature(history, lags)))
+
+        for origin in (12, 300, len(values)):
+            expected = _feed_back(values[:origin], 24, step)
+            np.testing.assert_allclose(recursive_predict(values[:origin], lags, intercept, weights, 24), expected, rtol=1e-9)
+
+        # Short histories fall back to feeding features back in.
+        np.testing.assert_allclose(recursive_predict(values[:8], lags, intercept, weights, 5), _feed_back(values[:8], 5, step))
+
+        windows = np.lib.stride_tricks.sliding_window_view(values, 12)[100:110]
+        batch = recursive_predict_batch(windows, lags, intercept, weights, 12)
+        self.assertEqual(batch.shape, (10, 12))
+        np.testing.assert_allclose(batch[3], recursive_predict(values[: 100 + 3 + 12], lags, intercept, weights, 12), rtol=1e-12)
+
+    def test_ar_closed_form_matches_recursive_feeding(self):
+        values = _series()
+        lags = [1, 2, 5]
+        X, y = build_ar_feature_matrix(values, lags)
+        model = fit_recursive_least_squares(X, y, forgetting_factor=0.99)
+        theta = np.array(model["theta"])
+
+        expected = _feed_back(values, 36, lambda history: float(build_ar_single_feature(history, lags) @ theta))
+        np.testing.assert_allclose(ar_recursive_predict(model, values, lags, 36), expected, rtol=1e-9)
+
+        windows = np.lib.stride_tricks.sliding_window_view(values, 5)
+        batch = ar_recursive_predict_batch(model, windows, lags, 6)
+        self.assertEqual(batch.shape, (len(values) - 4, 6))
+        np.testing.assert_allclose(batch[40], ar_recursive_predict(model, values[:45], lags, 6), rtol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
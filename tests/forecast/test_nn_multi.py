@@ -0,0 +1,103 @@
+import unittest
+
+import numpy as np
+
+from aqpy.forecast.features import build_feature_matrix
+from aqpy.forecast.nn_model import PARAM_KEYS, predict_batch, recursive_predict, train_mlp_regressor
+from aqpy.forecast.nn_multi import (
+    build_multi_feature_matrix,
+    member_model,
+    predict_batch as multi_predict_batch,
+    recursive_predict as multi_recursive_predict,
+    train_mlp_multi,
+)
+from aqpy.forecast.specs import filter_specs, validate_model_specs
+
+
+def _channels(n=600, k=3, seed=4):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    return [
+        10.0 * (i + 1) + (i + 2) * np.sin(t / (30.0 + 10 * i)) + rng.normal(0, 0.3, n)
+        for i in range(k)
+    ]
+
+
+class TestNNMulti(unittest.TestCase):
+    def test_members_match_independent_single_target_training(self):
+        lags = [1, 2, 3, 6]
+        channels = _channels()
+        X, y = build_multi_feature_matrix(channels, lags)
+        self.assertEqual(X.shape[0], 3)
+
+        for optimizer, patience in (("sgd", 0), ("adam", 3)):
+            multi = train_mlp_multi(X, y, epochs=15, optimizer=optimizer, patience=patience)
+            for i, values in enumerate(channels):
+                X_i, y_i = build_feature_matrix(values, lags)
+                single = train_mlp_regressor(X_i, y_i, epochs=15, optimizer=optimizer, patience=patience)
+                member = member_model(multi, i)
+                np.testing.assert_allclose(member["w1"], single["w1"], rtol=1e-10, atol=1e-12)
+                self.assertEqual(multi["epochs_run"][i], single["epochs_run"])
+                np.testing.assert_allclose(multi_predict_batch(multi, X)[i], predict_batch(single, X_i), rtol=1e-10)
+                self.assertEqual(multi["optimizer_state"]["step"][i], single["optimizer_state"]["step"])
+
+    def test_adam_resume_keeps_each_targets_own_step_count(self):
+        lags = [1, 2, 3, 6]
+        channels = _channels()
+        X, y = build_multi_feature_matrix(channels, lags)
+        first = train_mlp_multi(X, y, epochs=15, optimizer="adam", patience=3)
+        # The targets stop early at different epochs, so a shared step would mis-scale some of them.
+        self.assertGreater(len(set(first["optimizer_state"]["step"])), 1)
+
+        init = {k: first[k] for k in PARAM_KEYS}
+        resumed = train_mlp_multi(
+            X, y, epochs=2, optimizer="adam", patience=0, init=init, optimizer_state=first["optimizer_state"]
+        )
+        for i, values in enumerate(channels):
+            X_i, y_i = build_feature_matrix(values, lags)
+            saved = first["optimizer_state"]
+            state = {
+                "step": saved["step"][i],
+                "m": {k: saved["m"][k][i] for k in PARAM_KEYS},
+                "v": {k: saved["v"][k][i] for k in PARAM_KEYS},
+            }
+            single = train_mlp_regressor(
+                X_i, y_i, epochs=2, optimizer="adam", patience=0, init=member_model(first, i), optimizer_state=state
+            )
+            np.testing.assert_allclose(member_model(resumed, i)["w1"], single["w1"], rtol=1e-10, atol=1e-12)
+            self.assertEqual(resumed["optimizer_state"]["step"][i], single["optimizer_state"]["step"])
+
+    def test_recursive_predict_matches_member_models(self):
+        lags = [1, 2, 3]
+        channels = _channels(300, k=2)
+        X, y = build_multi_feature_matrix(channels, lags)
+        multi = train_mlp_multi(X, y, epochs=5, patience=0)
+
+        preds = multi_recursive_predict(multi, channels, lags, horizon_steps=6)
+        for i, values in enumerate(channels):
+            expected = recursive_predict(member_model(multi, i), values, lags, 6)
+            np.testing.assert_allclose(preds[i], expected, rtol=1e-10)
+
+    def test_multi_spec_validation_and_target_filter(self):
+        spec = {
+            "model_name": "aqpy_nn_multi_pms",
+            "model_type": "nn_mlp_multi",
+            "database": "pms",
+            "table": "pi",
+            "time_col": "t",
+            "targets": ["pm25_st", "pm10_st"],
+            "model_path": "models/pms_multi_nn.json",
+            "lags": [1, 2, 3],
+        }
+        validate_model_specs([spec])
+        self.assertEqual(filter_specs([spec], targets=["pm10_st"]), [spec])
+        self.assertEqual(filter_specs([spec], families=["nn"]), [])
+        self.assertEqual(filter_specs([spec], families=["nn_multi"]), [spec])
+
+        for bad_targets in (["pm25_st"], ["pm25_st", "pm25_st"], ["pm25_st", "bad-col"]):
+            with self.assertRaises(ValueError):
+                validate_model_specs([{**spec, "targets": bad_targets}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,7 @@ import unittest
 import numpy as np
 
 from aqpy.forecast.nn_model import predict_batch, train_mlp_regressor
+from aqpy.forecast.online_training import probe_new_rows
 from aqpy.forecast.retention import compute_delete_cutoff
 
 
@@ -25,6 +26,59 @@ class TestNNOnline(unittest.TestCase):
         self.assertEqual(len(preds), 10)
         self.assertTrue(np.isfinite(preds).all())
 
+    def test_early_stopping_ends_warm_start_before_epoch_budget(self):
+        rng = np.random.default_rng(11)
+        X = rng.normal(size=(400, 4))
+        y = 0.5 * X[:, 0] - 0.2 * X[:, 1] + 2.0
+        cold = train_mlp_regressor(X, y, hidden_dim=6, learning_rate=0.05, epochs=200, seed=11)
+        init = {k: np.array(cold[k]) for k in ("w1", "b1", "w2", "b2")}
+        warm = train_mlp_regressor(
+            X, y, hidden_dim=6, learning_rate=0.05, epochs=200, seed=11, init=init, patience=3
+        )
+
+        self.assertTrue(warm["stopped_early"])
+        self.assertLess(warm["epochs_run"], 200)
+        self.assertIsNotNone(warm["val_loss"])
+        self.assertEqual(init["w1"].tolist(), cold["w1"])
+
+        full = train_mlp_regressor(X, y, hidden_dim=6, epochs=7, seed=11, patience=0)
+        self.assertEqual(full["epochs_run"], 7)
+        self.assertIsNone(full["val_loss"])
+
+    def test_validation_slice_only_picks_epochs_then_refits_on_all_rows(self):
+        rng = np.random.default_rng(3)
+        X = rng.normal(size=(300, 4))
+        y = 0.5 * X[:, 0] - 0.2 * X[:, 1] + 0.1 * rng.normal(size=300)
+        model = train_mlp_regressor(X, y, learning_rate=0.05, epochs=60, seed=3, patience=3)
+        self.assertGreater(model["refit_epochs"], 0)
+        self.assertLessEqual(model["refit_epochs"], model["epochs_run"])
+
+        full = train_mlp_regressor(X, y, learning_rate=0.05, epochs=model["refit_epochs"], seed=3, patience=0)
+        np.testing.assert_allclose(model["w1"], full["w1"])
+        self.assertEqual(model["optimizer_state"]["step"], full["optimizer_state"]["step"])
+
+    def test_optimizers_train_and_resume_from_saved_state(self):
+        rng = np.random.default_rng(5)
+        X = rng.normal(size=(200, 3))
+        y = X[:, 0] - 0.5 * X[:, 2]
+        for optimizer in ("sgd", "momentum", "adam"):
+            model = train_mlp_regressor(X, y, epochs=5, optimizer=optimizer, patience=0)
+            state = model["optimizer_state"]
+            self.assertEqual(model["optimizer"], optimizer)
+            self.assertEqual(state["step"], 5 * int(np.ceil(200 / 64)))
+            self.assertEqual("m" in state, optimizer != "sgd")
+            self.assertEqual("v" in state, optimizer == "adam")
+
+            init = {k: np.array(model[k]) for k in ("w1", "b1", "w2", "b2")}
+            resumed = train_mlp_regressor(
+                X, y, epochs=2, optimizer=optimizer, optimizer_state=state, init=init, patience=0
+            )
+            self.assertEqual(resumed["optimizer_state"]["step"], state["step"] + 2 * int(np.ceil(200 / 64)))
+            self.assertTrue(np.isfinite(predict_batch(resumed, X[:5])).all())
+
+        with self.assertRaises(ValueError):
+            train_mlp_regressor(X, y, epochs=1, optimizer="rmsprop")
+
     def test_compute_delete_cutoff_uses_retention_and_training_watermark(self):
         now_utc = dt.datetime(2026, 2, 22, tzinfo=dt.timezone.utc)
         min_last_seen = now_utc - dt.timedelta(days=9)
@@ -40,6 +94,40 @@ class TestNNOnline(unittest.TestCase):
         )
         self.assertEqual(cutoff, expected)
 
+    def test_probe_new_rows_shares_watermark_and_bounded_probe(self):
+        last_seen = dt.datetime(2026, 2, 22, tzinfo=dt.timezone.utc)
+        queries = []
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, query, params=None):
+                queries.append((query, params))
+                self.row = (last_seen + dt.timedelta(minutes=5),) if "MAX" in query else (30,)
+
+            def fetchone(self):
+                return self.row
+
+        class Conn:
+            def cursor(self):
+                return Cursor()
+
+        cache = {}
+        for _ in range(3):
+            self.assertEqual(probe_new_rows(Conn(), "bme", "pi", "t", last_seen, 30, cache), 30)
+        # An up-to-date model never issues the probe, only the shared watermark read.
+        later = last_seen + dt.timedelta(minutes=5)
+        self.assertEqual(probe_new_rows(Conn(), "bme", "pi", "t", later, 30, cache), 0)
+
+        self.assertEqual(len(queries), 2)
+        self.assertIn("MAX(t)", queries[0][0])
+        self.assertIn("LIMIT", queries[1][0])
+        self.assertEqual(queries[1][1], (last_seen, 30))
+
 
 if __name__ == "__main__":
     unittest.main()
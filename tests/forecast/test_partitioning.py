@@ -0,0 +1,46 @@
+import datetime as dt
+import unittest
+
+from aqpy.forecast.partitioning import (
+    parse_partition_bound,
+    partition_floor,
+    partition_name,
+    partition_windows,
+)
+
+
+UTC = dt.timezone.utc
+
+
+class TestPartitioning(unittest.TestCase):
+    def test_weekly_windows_are_aligned_and_contiguous(self):
+        start = dt.datetime(2026, 10, 21, 15, 30, tzinfo=UTC)  # a Wednesday
+        end = start + dt.timedelta(days=14)
+        windows = partition_windows(start, end, interval_days=7)
+        self.assertEqual(windows[0][0], dt.datetime(2026, 10, 19, tzinfo=UTC))
+        self.assertEqual(windows[0][0].weekday(), 0)
+        for (_, hi), (lo, _) in zip(windows, windows[1:]):
+            self.assertEqual(hi, lo)
+        self.assertLessEqual(windows[-1][0], end)
+        self.assertGreater(windows[-1][1], end)
+        self.assertEqual(partition_name("predictions", windows[0][0]), "predictions_p20261019")
+
+    def test_floor_is_idempotent_on_boundaries(self):
+        ts = dt.datetime(2026, 10, 20, tzinfo=UTC)
+        self.assertEqual(partition_floor(ts, 1), ts)
+        self.assertEqual(partition_floor(partition_floor(ts, 7), 7), partition_floor(ts, 7))
+
+    def test_parse_partition_bounds(self):
+        lo, hi = parse_partition_bound(
+            "FOR VALUES FROM ('2026-10-26 00:00:00+00') TO ('2026-11-02 00:00:00+00')"
+        )
+        self.assertEqual(lo, dt.datetime(2026, 10, 26, tzinfo=UTC))
+        self.assertEqual(hi - lo, dt.timedelta(days=7))
+        self.assertEqual(
+            parse_partition_bound("FOR VALUES FROM (MINVALUE) TO ('2026-10-26 00:00:00+00')")[0], None
+        )
+        self.assertIsNone(parse_partition_bound("DEFAULT"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from aqpy.forecast.adaptive_ar import fit_recursive_least_squares
+from aqpy.forecast.features import build_ar_feature_matrix, build_feature_matrix
+from aqpy.forecast.model import mae, split_train_val
+from aqpy.forecast.nn_model import predict_batch, train_mlp_regressor
+from aqpy.forecast.precision import resolve_precision
+from aqpy.forecast.rnn_lite import (
+    build_sequence_dataset,
+    encode_batch,
+    encode_sequence,
+    fit_gru_lite_head,
+    init_gru_encoder,
+    predict_batch as rnn_predict_batch,
+)
+
+
+def _series(n=1500, seed=2):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    return 20.0 + 3.0 * np.sin(t / 60.0) + rng.normal(0, 0.2, n)
+
+
+class TestForecastPrecision(unittest.TestCase):
+    def test_resolve_precision_from_env(self):
+        with mock.patch.dict(os.environ, {"AQPY_FORECAST_PRECISION": "FLOAT32"}):
+            self.assertEqual(resolve_precision(), "float32")
+            self.assertEqual(resolve_precision("float64"), "float64")
+        with self.assertRaises(ValueError):
+            resolve_precision("float16")
+
+    def test_nn_float32_matches_float64_holdout_accuracy(self):
+        values = _series()
+        lags = [1, 2, 3, 6, 12]
+        X, y = build_feature_matrix(values, lags)
+        X_train, X_holdout, y_train, y_holdout = split_train_val(X, y, train_ratio=0.8)
+        X32, y32 = build_feature_matrix(values, lags, dtype=np.float32)
+        self.assertEqual(X32.dtype, np.float32)
+
+        m64 = train_mlp_regressor(X_train, y_train, epochs=20, optimizer="momentum", patience=0)
+        m32 = train_mlp_regressor(
+            X32[: len(X_train)],
+            y32[: len(y_train)],
+            epochs=20,
+            optimizer="momentum",
+            patience=0,
+            dtype=np.float32,
+        )
+
+        self.assertEqual(m64["precision"], "float64")
+        self.assertEqual(m32["precision"], "float32")
+        mae64 = mae(y_holdout, predict_batch(m64, X_holdout))
+        mae32 = mae(y_holdout, predict_batch(m32, X_holdout))
+        self.assertLess(abs(mae32 - mae64) / mae64, 0.05)
+
+        # The same float32 weights evaluated in float64 give near-identical predictions.
+        preds32 = predict_batch(m32, X_holdout)
+        preds_as64 = predict_batch({**m32, "precision": "float64"}, X_holdout)
+        np.testing.assert_allclose(preds32, preds_as64, rtol=1e-5)
+
+    def test_rnn_float32_parity_and_batched_encoder(self):
+        values = _series(400)
+        m64 = fit_gru_lite_head(values, seq_len=16, hidden_dim=8, seed=3)
+        m32 = fit_gru_lite_head(values, seq_len=16, hidden_dim=8, seed=3, dtype=np.float32)
+        self.assertEqual(m32["precision"], "float32")
+
+        X_seq, _ = build_sequence_dataset(values, 16)
+        np.testing.assert_allclose(rnn_predict_batch(m32, X_seq), rnn_predict_batch(m64, X_seq), rtol=1e-4)
+
+        encoder = init_gru_encoder(hidden_dim=4, seed=1)
+        H = encode_batch(encoder, X_seq[:5])
+        for i in range(5):
+            np.testing.assert_allclose(H[i], encode_sequence(encoder, X_seq[i]), rtol=1e-12)
+
+    def test_rls_stays_float64_on_float32_features(self):
+        values = _series(300)
+        X32, y32 = build_ar_feature_matrix(values, [1, 2, 3], dtype=np.float32)
+        X64, y64 = build_ar_feature_matrix(values, [1, 2, 3])
+
+        m32 = fit_recursive_least_squares(X32, y32)
+        m64 = fit_recursive_least_squares(X64, y64)
+
+        self.assertEqual(m32["precision"], "float64")
+        np.testing.assert_allclose(m32["theta"], m64["theta"], rtol=1e-4, atol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
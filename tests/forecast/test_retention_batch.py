@@ -27,6 +27,8 @@ class TestRetentionBatchSourceSelection(unittest.TestCase):
                 ("pms", "pi", "t"),
                 ("bme", "predictions", "predicted_for"),
                 ("pms", "predictions", "predicted_for"),
+                ("bme", "predictions_history", "predicted_for"),
+                ("pms", "predictions_history", "predicted_for"),
             },
         )
         for source in sources:
@@ -34,7 +36,7 @@ class TestRetentionBatchSourceSelection(unittest.TestCase):
                 self.assertTrue(source["use_training_watermark"])
                 self.assertEqual(source["retention_days"], 180)
                 self.assertEqual(source["safety_hours"], 24)
-            if source["table"] == "predictions":
+            if source["table"].startswith("predictions"):
                 self.assertFalse(source["use_training_watermark"])
                 self.assertEqual(source["retention_days"], 180)
                 self.assertEqual(source["safety_hours"], 0)
@@ -3,9 +3,13 @@ import unittest
 import numpy as np
 
 from aqpy.forecast.rnn_lite import (
+    ENCODER_KEYS,
     build_sequence_dataset,
+    encoder_gradients,
     fit_gru_lite_head,
+    init_gru_encoder,
     recursive_predict,
+    train_gru_encoder,
 )
 
 
@@ -25,6 +29,44 @@ class TestRNNLiteGRU(unittest.TestCase):
         self.assertEqual(len(preds), 6)
         self.assertTrue(np.isfinite(np.array(preds)).all())
 
+    def test_encoder_gradients_match_finite_differences(self):
+        rng = np.random.default_rng(0)
+        encoder = init_gru_encoder(hidden_dim=4, seed=3)
+        X_seq = rng.normal(size=(6, 8))
+        y = rng.normal(size=6)
+        head_w = rng.normal(size=4)
+        loss, grads = encoder_gradients(encoder, head_w, 0.3, X_seq, y, bptt_steps=8)
+        eps = 1e-6
+        for key in ENCODER_KEYS:
+            for idx in np.ndindex(encoder[key].shape):
+                bumped = dict(encoder)
+                bumped[key] = encoder[key].copy()
+                bumped[key][idx] += eps
+                loss_eps, _ = encoder_gradients(bumped, head_w, 0.3, X_seq, y, bptt_steps=8)
+                self.assertAlmostEqual((loss_eps - loss) / eps, grads[key][idx], places=4)
+
+    def test_encoder_update_lowers_loss_and_respects_budget(self):
+        x = np.linspace(0, 20 * np.pi, 800)
+        vals = np.sin(x) + 0.3 * np.sin(3.1 * x)
+        frozen = fit_gru_lite_head(vals, seq_len=24, hidden_dim=4, ridge=0.01)
+        trained = fit_gru_lite_head(
+            vals, seq_len=24, hidden_dim=4, ridge=0.01, encoder_epochs=3, encoder_seconds=0
+        )
+        self.assertTrue(trained["encoder_updated"])
+        self.assertEqual(trained["encoder_epochs_run"], 3)
+        self.assertLess(trained["train_loss"], frozen["train_loss"])
+
+        # A fake clock that advances one second per call: the budget stops training after 3 minibatches.
+        ticks = iter(range(1000))
+        X_seq, y = build_sequence_dataset(vals, seq_len=24)
+        encoder = init_gru_encoder(hidden_dim=4)
+        _, stats = train_gru_encoder(
+            encoder, X_seq, y, head_w=np.zeros(4), epochs=5, max_seconds=4, clock=lambda: next(ticks)
+        )
+        self.assertTrue(stats["encoder_budget_hit"])
+        self.assertEqual(stats["encoder_steps"], 3)
+        self.assertEqual(stats["encoder_epochs_run"], 0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,64 @@
+import types
+import unittest
+
+from aqpy.common.db import ensure_schema, reset_schema_cache
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.queries.append(query)
+
+    def fetchone(self):
+        return (list(self.conn.missing) or None,)
+
+
+class _FakeConnection:
+    def __init__(self, dbname, missing=()):
+        self.info = types.SimpleNamespace(host="localhost", port=5432, dbname=dbname)
+        self.missing = missing
+        self.queries = []
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+
+class TestSchemaCache(unittest.TestCase):
+    def setUp(self):
+        reset_schema_cache()
+        self.addCleanup(reset_schema_cache)
+        self.created = []
+
+    def _create(self, conn):
+        self.created.append(conn.info.dbname)
+        return "created"
+
+    def test_existing_schema_is_checked_once_and_never_created(self):
+        conn = _FakeConnection("bme")
+        for _ in range(3):
+            self.assertTrue(ensure_schema(conn, "predictions", ["predictions"], self._create))
+        # A fresh connection to the same database reuses the verification.
+        other = _FakeConnection("bme")
+        self.assertTrue(ensure_schema(other, "predictions", ["predictions"], self._create))
+        self.assertEqual(len(conn.queries), 1)
+        self.assertEqual(other.queries, [])
+        self.assertEqual(self.created, [])
+
+    def test_missing_relation_creates_once_per_database(self):
+        bme = _FakeConnection("bme", missing=["forecast_state"])
+        pms = _FakeConnection("pms", missing=["forecast_state"])
+        for conn in (bme, bme, pms):
+            self.assertEqual(ensure_schema(conn, "forecast_state", ["forecast_state"], self._create), "created")
+        self.assertEqual(self.created, ["bme", "pms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
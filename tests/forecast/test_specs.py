@@ -3,7 +3,7 @@ import unittest
 from collections import defaultdict
 from pathlib import Path
 
-from aqpy.forecast.specs import filter_specs, load_model_specs
+from aqpy.forecast.specs import filter_specs, load_model_specs, validate_model_specs
 
 
 def write_specs(payload):
@@ -124,6 +124,75 @@ class TestModelSpecsValidation(unittest.TestCase):
         finally:
             td.cleanup()
 
+    def test_invalid_validation_fraction_rejected(self):
+        td, path = write_specs(
+            """
+[
+  {
+    "model_name": "bad_val",
+    "model_type": "nn_mlp",
+    "database": "bme",
+    "table": "pi",
+    "time_col": "t",
+    "target": "temperature",
+    "model_path": "models/bad_val.json",
+    "lags": [1, 2, 3],
+    "validation_fraction": 1.0
+  }
+]
+"""
+        )
+        try:
+            with self.assertRaises(ValueError):
+                load_model_specs(path)
+        finally:
+            td.cleanup()
+
+    def test_unknown_optimizer_rejected(self):
+        td, path = write_specs(
+            """
+[
+  {
+    "model_name": "bad_opt",
+    "model_type": "nn_mlp",
+    "database": "bme",
+    "table": "pi",
+    "time_col": "t",
+    "target": "temperature",
+    "model_path": "models/bad_opt.json",
+    "lags": [1, 2, 3],
+    "optimizer": "rmsprop"
+  }
+]
+"""
+        )
+        try:
+            with self.assertRaises(ValueError):
+                load_model_specs(path)
+        finally:
+            td.cleanup()
+
+    def test_ensemble_members_must_forecast_its_target(self):
+        base = {"database": "bme", "table": "pi", "time_col": "t", "lags": [1, 2, 3]}
+        specs = [
+            {**base, "model_name": "nn_t", "model_type": "nn_mlp", "target": "temperature",
+             "model_path": "models/nn_t.json"},
+            {**base, "model_name": "ar_t", "model_type": "adaptive_ar", "target": "temperature",
+             "model_path": "models/ar_t.json"},
+            {**base, "model_name": "ar_h", "model_type": "adaptive_ar", "target": "humidity",
+             "model_path": "models/ar_h.json"},
+            {"database": "bme", "table": "pi", "time_col": "t", "model_name": "ens_t",
+             "model_type": "ensemble", "target": "temperature", "members": ["nn_t", "ar_t"],
+             "model_path": "models/ens_t.json"},
+        ]
+        validate_model_specs(specs)
+        self.assertEqual([s["model_name"] for s in filter_specs(specs, families=["ensemble"])], ["ens_t"])
+
+        for members in (["nn_t", "ar_h"], ["nn_t", "missing"], ["nn_t"]):
+            specs[-1]["members"] = members
+            with self.assertRaises(ValueError):
+                validate_model_specs(specs)
+
     def test_filter_specs_by_target_and_family(self):
         specs = [
             {
@@ -0,0 +1,54 @@
+import time
+import unittest
+
+from aqpy.forecast.timing import StageTimer
+
+
+class FailingConn:
+    def __init__(self):
+        self.rollbacks = 0
+
+    def cursor(self):
+        raise RuntimeError("connection closed")
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class TestStageTimer(unittest.TestCase):
+    def test_stages_accumulate_seconds_and_rows(self):
+        timer = StageTimer("inference", model_name="aqpy_nn_temperature")
+        with timer.stage("fetch", rows=50):
+            time.sleep(0.01)
+        with timer.stage("fetch"):
+            pass
+
+        @timer.timed("predict")
+        def predict():
+            return [1.0, 2.0]
+
+        self.assertEqual(predict(), [1.0, 2.0])
+        summary = timer.summary()
+
+        self.assertEqual(set(summary["stages"]), {"fetch", "predict"})
+        self.assertEqual(summary["stages"]["fetch"]["rows"], 50)
+        self.assertGreaterEqual(summary["stages"]["fetch"]["seconds"], 0.01)
+        self.assertIsNone(summary["stages"]["predict"]["rows"])
+        self.assertGreaterEqual(summary["total_seconds"], summary["stages"]["fetch"]["seconds"])
+
+    def test_finish_attaches_timings_even_when_recording_fails(self):
+        timer = StageTimer("retention")
+        conn = FailingConn()
+        with timer.stage("delete", rows=3):
+            pass
+
+        result = timer.finish(conn, {"status": "ok"})
+
+        self.assertEqual(result["status"], "ok")
+        self.assertFalse(result["timings"]["recorded"])
+        self.assertEqual(result["timings"]["stages"]["delete"]["rows"], 3)
+        self.assertEqual(conn.rollbacks, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
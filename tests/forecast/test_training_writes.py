@@ -0,0 +1,72 @@
+import unittest
+
+from aqpy.forecast.online_repository import write_training_outputs
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.statements.append(" ".join(query.split())[:40])
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+STATE = {
+    "model_name": "m",
+    "model_version": "v1",
+    "artifact_path": "/tmp/m.json",
+    "last_seen_ts": None,
+    "source_database": "bme",
+    "source_table": "pi",
+    "source_time_col": "t",
+    "source_target_col": "temperature",
+}
+REGISTRY = {
+    "model_name": "m",
+    "model_version": "v1",
+    "trained_at": None,
+    "database": "bme",
+    "table": "pi",
+    "target": "temperature",
+    "metrics": {},
+    "artifact_path": "/tmp/m.json",
+}
+
+
+class TestTrainingWrites(unittest.TestCase):
+    def test_state_metrics_and_registry_share_one_commit(self):
+        conn = _FakeConnection()
+        write_training_outputs(conn, STATE, [{}, {}], REGISTRY, async_commit=False)
+        self.assertEqual(conn.commits, 1)
+        self.assertEqual(
+            [s.split()[2] for s in conn.statements],
+            ["online_training_state", "online_training_metrics", "online_training_metrics", "model_registry"],
+        )
+
+    def test_async_commit_is_scoped_to_the_transaction(self):
+        conn = _FakeConnection()
+        write_training_outputs(conn, STATE, [{}], REGISTRY, async_commit=True)
+        self.assertEqual(conn.statements[0], "SET LOCAL synchronous_commit = off")
+        self.assertEqual(conn.commits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,8 @@ class TestIngestConfig(unittest.TestCase):
             "AQPY_SERIAL_BAUD": "115200",
             "AQPY_PMS_STARTUP_DELAY": "12",
             "AQPY_PMS_AVG_TIME": "7",
+            "AQPY_PMS_AGG_METHOD": "Median",
+            "AQPY_PMS_PERSIST_QUALITY": "true",
             "AQPY_SLEEP_SECONDS": "22",
             "AQPY_BME_I2C_PORT": "3",
             "AQPY_BME_I2C_ADDR": "0x77",
@@ -25,6 +27,8 @@ class TestIngestConfig(unittest.TestCase):
         self.assertEqual(cfg.serial_baud, 115200)
         self.assertEqual(cfg.pms_startup_delay, 12)
         self.assertEqual(cfg.pms_avg_time, 7)
+        self.assertEqual(cfg.pms_agg_method, "median")
+        self.assertTrue(cfg.pms_persist_quality)
         self.assertEqual(cfg.sleep_seconds, 22)
         self.assertEqual(cfg.bme_i2c_port, 3)
         self.assertEqual(cfg.bme_i2c_addr, 0x77)
@@ -32,6 +36,11 @@ class TestIngestConfig(unittest.TestCase):
         self.assertEqual(cfg.db_name_bme, "bmedb")
         self.assertEqual(cfg.log_level, "DEBUG")
 
+    def test_unknown_pms_agg_method_fails_at_load(self):
+        with patch.dict("os.environ", {"AQPY_PMS_AGG_METHOD": "meen"}, clear=False):
+            with self.assertRaisesRegex(ValueError, "AQPY_PMS_AGG_METHOD"):
+                load_config()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,61 @@
+import tempfile
+import unittest
+import urllib.request
+from pathlib import Path
+
+from aqpy.ingest.metrics import MetricsRegistry, start_http_server, write_textfile
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_render_counters_gauges_and_histograms(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.inc("aqpy_ingest_task_runs_total", task="pms", status="ok")
+        registry.inc("aqpy_ingest_task_runs_total", task="pms", status="ok")
+        registry.set("aqpy_pms_frame_rate_hz", 2.5)
+        registry.observe("aqpy_ingest_task_seconds", 0.05, task="bme")
+        registry.observe("aqpy_ingest_task_seconds", 0.5, task="bme")
+
+        text = registry.render()
+
+        self.assertIn("# TYPE aqpy_ingest_task_runs_total counter", text)
+        self.assertIn('aqpy_ingest_task_runs_total{status="ok",task="pms"} 2.0', text)
+        self.assertIn("aqpy_pms_frame_rate_hz 2.5", text)
+        self.assertIn("# TYPE aqpy_ingest_task_seconds histogram", text)
+        self.assertIn('aqpy_ingest_task_seconds_bucket{task="bme",le="0.1"} 1', text)
+        self.assertIn('aqpy_ingest_task_seconds_bucket{task="bme",le="1.0"} 2', text)
+        self.assertIn('aqpy_ingest_task_seconds_bucket{task="bme",le="+Inf"} 2', text)
+        self.assertIn('aqpy_ingest_task_seconds_count{task="bme"} 2', text)
+
+    def test_metric_kind_conflict_rejected(self):
+        registry = MetricsRegistry()
+        registry.inc("aqpy_pms_frames_total")
+        with self.assertRaises(ValueError):
+            registry.set("aqpy_pms_frames_total", 1)
+
+    def test_write_textfile_replaces_target_without_leftovers(self):
+        registry = MetricsRegistry()
+        registry.inc("aqpy_ingest_cycles_total")
+        with tempfile.TemporaryDirectory() as td:
+            path = Path(td) / "aqpy_ingest.prom"
+            path.write_text("stale\n")
+            write_textfile(registry, path)
+
+            self.assertIn("aqpy_ingest_cycles_total 1.0", path.read_text())
+            self.assertEqual([p.name for p in Path(td).iterdir()], ["aqpy_ingest.prom"])
+
+    def test_http_endpoint_serves_metrics(self):
+        registry = MetricsRegistry()
+        registry.inc("aqpy_ingest_cycles_total")
+        server = start_http_server(registry, 0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+                body = resp.read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn("aqpy_ingest_cycles_total 1.0", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
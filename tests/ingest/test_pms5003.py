@@ -1,7 +1,9 @@
+import random
 import struct
 import unittest
 
-from aqpy.ingest.pms5003 import PMS5003
+from aqpy.ingest.aggregation import PMSWindowAggregator
+from aqpy.ingest.pms5003 import PMS5003, PMSFrameParser
 
 
 class FakeSerial:
@@ -95,6 +97,171 @@ class TestPMS5003(unittest.TestCase):
         ):
             pms.averaged_read(avg_time=0.01)
 
+    def test_read_pulls_waiting_bytes_in_chunks(self):
+        frame = build_frame([28, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13])
+        serial = FakeSerial()
+        pms = PMS5003(serial, startup_delay=0)
+        reads = []
+        original_read = serial.read
+
+        def tracking_read(n=1):
+            reads.append(n)
+            return original_read(n)
+
+        serial.read = tracking_read
+        serial.feed(b"\x00\x11" + frame + frame)
+        pms.timeout = 0.1
+
+        self.assertEqual(pms.read()["pm_st"], [1, 2, 3])
+        self.assertEqual(pms.read()["pm_st"], [1, 2, 3])
+        self.assertEqual(reads, [len(frame) * 2 + 2])
+
+    def test_drain_buffer_discards_partial_frame(self):
+        frame = build_frame([28, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13])
+        serial = FakeSerial()
+        pms = PMS5003(serial, startup_delay=0)
+        pms.parser.feed(frame[:10])
+        serial.feed(b"\x01" * 100)
+
+        pms.drain_buffer()
+
+        self.assertEqual(serial.in_waiting, 0)
+        self.assertEqual(len(pms.parser.buffer), 0)
+
+    def test_averaged_read_trimmed_mean_ignores_glitched_frame(self):
+        serial = FakeSerial()
+        pms = PMS5003(serial, startup_delay=0)
+        samples = [
+            {"pm_st": [10, 20, 30], "pm_en": [10, 20, 30], "hist": [1, 2, 3, 4, 5, 6]}
+            for _ in range(9)
+        ]
+        samples.insert(4, {"pm_st": [9000, 9000, 9000], "pm_en": [0, 0, 0], "hist": [0] * 6})
+        feed = iter(samples)
+
+        def fake_read():
+            try:
+                return next(feed)
+            except StopIteration:
+                raise RuntimeError("valid PMS5003 frame not found before timeout")
+
+        pms.read = fake_read
+        data = pms.averaged_read(avg_time=0.05)
+
+        self.assertEqual(data["pm_st"], [10, 20, 30])
+        self.assertEqual(data["pm_en"], [10, 20, 30])
+        self.assertEqual(data["hist"], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(data["frame_count"], 10)
+
+    def test_averaged_read_reports_checksum_failures_in_window(self):
+        good = build_frame([28, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13])
+        bad = bytearray(good)
+        bad[12] ^= 0x01
+        serial = FakeSerial()
+        pms = PMS5003(serial, startup_delay=0, aggregate_method="mean")
+        serial.feed(good + bytes(bad) + good)
+        pms.timeout = 0.01
+
+        data = pms.averaged_read(avg_time=0.05)
+
+        self.assertEqual(data["pm_st"], [1, 2, 3])
+        self.assertEqual(data["frame_count"], 2)
+        self.assertEqual(data["checksum_failures"], 1)
+
+    def test_unknown_aggregate_method_rejected(self):
+        with self.assertRaises(ValueError):
+            PMS5003(FakeSerial(), startup_delay=0, aggregate_method="mode")
+
+
+class TestPMSWindowAggregator(unittest.TestCase):
+    def test_statistics_mean_median_trimmed(self):
+        agg = PMSWindowAggregator(capacity=2, trim_fraction=0.2)
+        for v in (1, 2, 3, 4, 100):
+            agg.add({"pm_st": [v, v, v], "pm_en": [v, v, v], "hist": [v] * 6})
+
+        stats = agg.statistics()
+
+        self.assertEqual(stats["frame_count"], 5)
+        self.assertAlmostEqual(stats["mean"][0], 22.0)
+        self.assertAlmostEqual(stats["median"][0], 3.0)
+        self.assertAlmostEqual(stats["trimmed_mean"][0], 3.0)
+
+    def test_reset_reuses_buffer(self):
+        agg = PMSWindowAggregator(capacity=4)
+        agg.add({"pm_st": [5, 5, 5], "pm_en": [5, 5, 5], "hist": [5] * 6})
+        buffer = agg.frames
+        agg.reset()
+        agg.add({"pm_st": [7, 7, 7], "pm_en": [7, 7, 7], "hist": [7] * 6})
+
+        self.assertIs(agg.frames, buffer)
+        self.assertEqual(agg.summarize("median")["pm_st"], [7, 7, 7])
+
+
+class TestPMSFrameParser(unittest.TestCase):
+    def test_frame_split_across_chunks(self):
+        frame = build_frame([28, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13])
+        parser = PMSFrameParser()
+        collected = []
+        for b in frame:
+            parser.feed(bytes([b]))
+            collected.extend(parser.frames())
+
+        self.assertEqual(collected, [(1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12)])
+        self.assertEqual(len(parser.buffer), 0)
+
+    def test_corrupted_checksum_is_counted_and_skipped(self):
+        good = build_frame([28, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13])
+        bad = bytearray(good)
+        bad[10] ^= 0xFF
+        parser = PMSFrameParser()
+        parser.feed(bytes(bad) + good)
+
+        frames = list(parser.frames())
+
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(parser.checksum_failures, 1)
+        self.assertEqual(parser.frames_parsed, 1)
+
+    def test_header_inside_truncated_frame_is_resynchronized(self):
+        good = build_frame([28, 0x424D, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13])
+        parser = PMSFrameParser()
+        parser.feed(good[:20] + good)
+
+        frames = list(parser.frames())
+
+        self.assertEqual(frames, [(0x424D, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12)])
+
+    def test_fuzzed_stream_yields_only_valid_frames(self):
+        rng = random.Random(1234)
+        expected = []
+        stream = bytearray()
+        for _ in range(200):
+            words = [28] + [rng.randrange(0, 0x10000) for _ in range(13)]
+            frame = bytearray(build_frame(words))
+            roll = rng.random()
+            if roll < 0.2:
+                frame[rng.randrange(2, len(frame))] ^= 1 << rng.randrange(8)
+            elif roll < 0.3:
+                frame = frame[: rng.randrange(1, len(frame))]
+            else:
+                expected.append(tuple(words[1:13]))
+            stream.extend(bytes(rng.randrange(256) for _ in range(rng.randrange(0, 8))))
+            stream.extend(frame)
+
+        parser = PMSFrameParser()
+        collected = []
+        pos = 0
+        while pos < len(stream):
+            step = rng.randrange(1, 64)
+            parser.feed(stream[pos : pos + step])
+            collected.extend(parser.frames())
+            pos += step
+
+        # Random noise can occasionally form a valid frame; every expected frame must survive in order.
+        it = iter(collected)
+        self.assertTrue(all(any(frame == got for got in it) for frame in expected))
+        self.assertLessEqual(len(collected) - len(expected), 2)
+        self.assertLess(len(parser.buffer), 32)
+
 
 if __name__ == "__main__":
     unittest.main()
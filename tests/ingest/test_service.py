@@ -1,8 +1,16 @@
+import tempfile
 import unittest
+from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
-from aqpy.ingest.service import AQIngestService, build_default_service
+from aqpy.ingest.metrics import MetricsRegistry
+from aqpy.ingest.service import (
+    AQIngestService,
+    InstrumentedRepository,
+    PMSIngestTask,
+    build_default_service,
+)
 
 
 class FakeRepository:
@@ -67,6 +75,59 @@ class TestAQIngestService(unittest.TestCase):
         self.assertEqual(t2.successes, 2)
         _sleep.assert_called_once_with(1)
 
+    @patch("aqpy.ingest.service.time.sleep", return_value=None)
+    def test_run_forever_records_task_metrics_and_writes_textfile(self, _sleep):
+        t1 = FakeTask("pms", fail_first=True)
+        t2 = FakeTask("bme")
+        with tempfile.TemporaryDirectory() as td:
+            path = Path(td) / "aqpy_ingest.prom"
+            svc = AQIngestService(
+                tasks=[t1, t2],
+                repository=FakeRepository(),
+                sleep_seconds=1,
+                metrics_textfile=str(path),
+            )
+
+            svc.run_forever(max_cycles=2)
+            text = path.read_text()
+
+        self.assertIn('aqpy_ingest_task_runs_total{status="error",task="pms"} 1.0', text)
+        self.assertIn('aqpy_ingest_task_runs_total{status="ok",task="pms"} 1.0', text)
+        self.assertIn('aqpy_ingest_task_runs_total{status="ok",task="bme"} 2.0', text)
+        self.assertIn("aqpy_ingest_cycle_seconds_count 2", text)
+        self.assertIn("aqpy_ingest_cycles_total 2.0", text)
+
+    def test_pms_task_records_frame_counters_and_repository_latency(self):
+        metrics = MetricsRegistry()
+        sensor = MagicMock()
+        sensor.averaged_read.return_value = {
+            "pm_st": [1, 2, 3],
+            "pm_en": [1, 2, 3],
+            "hist": [1, 2, 3, 4, 5, 6],
+            "frame_count": 20,
+            "checksum_failures": 2,
+        }
+        repo = MagicMock()
+        repo.insert_pms_sample.side_effect = [None, RuntimeError("db down")]
+        task = PMSIngestTask(
+            name="pms",
+            particle_sensor=sensor,
+            repository=InstrumentedRepository(repository=repo, metrics=metrics),
+            pms_avg_time=10,
+            metrics=metrics,
+        )
+
+        task.run_once()
+        with self.assertRaises(RuntimeError):
+            task.run_once()
+        text = metrics.render()
+
+        self.assertIn("aqpy_pms_frames_total 40.0", text)
+        self.assertIn("aqpy_pms_checksum_failures_total 4.0", text)
+        self.assertIn("aqpy_pms_frame_rate_hz 2.0", text)
+        self.assertIn('aqpy_ingest_repository_seconds_count{call="insert_pms_sample"} 2', text)
+        self.assertIn('aqpy_ingest_repository_errors_total{call="insert_pms_sample"} 1.0', text)
+
     def test_shutdown_closes_all_dependencies(self):
         t1 = FakeTask("pms")
         t2 = FakeTask("bme")
@@ -101,11 +162,16 @@ class TestAQIngestService(unittest.TestCase):
             serial_baud=9600,
             pms_startup_delay=1,
             pms_avg_time=10,
+            pms_agg_method="trimmed_mean",
+            pms_persist_quality=False,
             sleep_seconds=30,
             bme_i2c_port=1,
             bme_i2c_addr=0x76,
             db_name_pms="pms",
             db_name_bme="bme",
+            metrics_textfile="",
+            metrics_port=0,
+            metrics_host="127.0.0.1",
         )
         serial_cls.return_value = object()
         pms = MagicMock()
@@ -142,11 +208,16 @@ class TestAQIngestService(unittest.TestCase):
             serial_baud=9600,
             pms_startup_delay=1,
             pms_avg_time=10,
+            pms_agg_method="trimmed_mean",
+            pms_persist_quality=False,
             sleep_seconds=30,
             bme_i2c_port=1,
             bme_i2c_addr=0x76,
             db_name_pms="pms",
             db_name_bme="bme",
+            metrics_textfile="",
+            metrics_port=0,
+            metrics_host="127.0.0.1",
         )
         serial_cls.return_value = object()
         pms = MagicMock()
@@ -178,11 +249,16 @@ class TestAQIngestService(unittest.TestCase):
             serial_baud=9600,
             pms_startup_delay=1,
             pms_avg_time=10,
+            pms_agg_method="trimmed_mean",
+            pms_persist_quality=False,
             sleep_seconds=30,
             bme_i2c_port=1,
             bme_i2c_addr=0x76,
             db_name_pms="pms",
             db_name_bme="bme",
+            metrics_textfile="",
+            metrics_port=0,
+            metrics_host="127.0.0.1",
         )
         serial_conn = MagicMock()
         serial_cls.return_value = serial_conn
@@ -219,11 +295,16 @@ class TestAQIngestService(unittest.TestCase):
             serial_baud=9600,
             pms_startup_delay=1,
             pms_avg_time=10,
+            pms_agg_method="trimmed_mean",
+            pms_persist_quality=False,
             sleep_seconds=30,
             bme_i2c_port=1,
             bme_i2c_addr=0x76,
             db_name_pms="pms",
             db_name_bme="bme",
+            metrics_textfile="",
+            metrics_port=0,
+            metrics_host="127.0.0.1",
         )
         serial_conn = MagicMock()
         serial_cls.return_value = serial_conn
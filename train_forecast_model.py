@@ -20,6 +20,12 @@ def parse_args():
         "--model-path",
         default="models/bme_temperature_model.json",
     )
+    parser.add_argument(
+        "--direct-horizon-steps",
+        type=int,
+        default=0,
+        help="Fit one output per horizon step instead of a one-step model fed back recursively.",
+    )
     parser.add_argument("--register", action="store_true")
     return parser.parse_args()
 
@@ -37,6 +43,7 @@ def main():
         model_name=args.model_name,
         model_path=args.model_path,
         register=args.register,
+        direct_horizon_steps=args.direct_horizon_steps,
     )
     print(f"Model written: {args.model_path}")
     print(json.dumps(payload["metrics"], indent=2))